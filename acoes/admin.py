@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Acao, Tarefa
+from .models import Acao, Tarefa, VarreduraStatus
 
 
 class TarefaInline(admin.TabularInline):
@@ -96,3 +96,20 @@ class TarefaAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         # Atualizar status automaticamente após salvar
         obj.verificar_status_automatico()
+
+
+
+@admin.register(VarreduraStatus)
+class VarreduraStatusAdmin(admin.ModelAdmin):
+    """Execuções da varredura de prazos vencidos (somente leitura)"""
+
+    list_display = [
+        'executada_em', 'data_referencia', 'tarefas', 'acoes', 'obrigacoes', 'instrumentos', 'duracao'
+    ]
+    date_hierarchy = 'executada_em'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
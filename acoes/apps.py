@@ -5,3 +5,7 @@ class AcoesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'acoes'
     verbose_name = 'Ações e Tarefas'
+
+    def ready(self):
+        # Invalidação do cache do calendário
+        from . import signals  # noqa: F401
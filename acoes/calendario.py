@@ -0,0 +1,107 @@
+"""
+Feed de tarefas do FullCalendar (tarefas_json)
+
+- Apenas a janela visível: o FullCalendar envia ?start=&end= e a consulta
+  busca as tarefas que se sobrepõem a ela (data_inicio < end e
+  data_fim >= start), apoiada no índice (data_inicio, data_fim).
+- Uma consulta com os campos do responsável e da ação (values), sem
+  carregar um objeto por linha.
+- O JSON é gerado em streaming e guardado em cache por janela, sob a
+  versão do calendário (VersaoCalendario): uma linha no banco, lida pela
+  chave primária e incrementada pelos sinais de acoes/signals.py a cada
+  gravação de tarefa, ação ou responsável e a cada tarefas_alteradas. Vale
+  em todos os processos; a próxima leitura após uma alteração regenera a
+  janela. Alterações com queryset.update() precisam enviar
+  tarefas_alteradas, como as demais em lote; as que não enviam aparecem
+  quando o cache expira (ACOES_CALENDARIO_CACHE_TIMEOUT).
+"""
+
+import json
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tarefa, VersaoCalendario
+
+CORES_STATUS = {
+    'a_iniciar': '#f57c00',       # laranja
+    'em_andamento': '#1976d2',    # azul
+    'atrasado': '#c62828',        # vermelho
+    'em_validacao': '#6a1b9a',    # roxo
+    'finalizado': '#2e7d32',      # verde
+}
+
+CAMPOS = (
+    'id', 'nome', 'status', 'data_inicio', 'data_fim', 'acao__nome',
+    'responsavel__first_name', 'responsavel__last_name', 'responsavel__username',
+)
+
+
+def ler_data(valor):
+    """Data de um parâmetro do FullCalendar ("2024-05-01" ou "2024-05-01T00:00:00-03:00")"""
+    try:
+        return date.fromisoformat((valor or '')[:10])
+    except ValueError:
+        return None
+
+
+def chave_janela(inicio, fim):
+    return f'acoes:calendario:{inicio.isoformat()}:{fim.isoformat()}:{VersaoCalendario.atual()}'
+
+
+def serializar_evento(tarefa, nomes_status):
+    nome = ' '.join(filter(None, [tarefa['responsavel__first_name'], tarefa['responsavel__last_name']]))
+    return {
+        "id": tarefa['id'],
+        "title": tarefa['nome'],
+        "start": tarefa['data_inicio'].isoformat(),
+        "end": tarefa['data_fim'].isoformat(),
+        "color": CORES_STATUS.get(tarefa['status'], '#607d8b'),
+        "extendedProps": {
+            "responsavel": nome or tarefa['responsavel__username'],
+            "acao": tarefa['acao__nome'],
+            "status": nomes_status.get(tarefa['status'], tarefa['status']),
+        }
+    }
+
+
+def eventos_da_janela(inicio, fim):
+    """Tarefas que se sobrepõem a [inicio, fim)"""
+    return (
+        Tarefa.objects.filter(data_inicio__lt=fim, data_fim__gte=inicio)
+        .order_by('data_inicio', 'id')
+        .values(*CAMPOS)
+    )
+
+
+def gerar_json(inicio, fim, chave=None, lote=500):
+    """
+    Gera o JSON da janela em pedaços; ao final, guarda o resultado em cache
+
+    Se o cliente desistir no meio, nada é guardado.
+    """
+    nomes_status = dict(Tarefa.STATUS_CHOICES)
+    pedacos = ['[']
+    yield '['
+
+    separador = ''
+    eventos = []
+    for tarefa in eventos_da_janela(inicio, fim).iterator(chunk_size=lote):
+        eventos.append(serializar_evento(tarefa, nomes_status))
+        if len(eventos) >= lote:
+            pedaco = separador + json.dumps(eventos, ensure_ascii=False)[1:-1]
+            separador = ','
+            eventos = []
+            pedacos.append(pedaco)
+            yield pedaco
+    if eventos:
+        pedaco = separador + json.dumps(eventos, ensure_ascii=False)[1:-1]
+        pedacos.append(pedaco)
+        yield pedaco
+
+    pedacos.append(']')
+    yield ']'
+
+    if chave:
+        cache.set(chave, ''.join(pedacos), settings.ACOES_CALENDARIO_CACHE_TIMEOUT)
@@ -0,0 +1,208 @@
+"""
+Cronograma das tarefas (Gantt) e caminho crítico
+
+O grafo de uma ação ou de um instrumento é carregado em duas consultas
+(tarefas e dependências de tarefas_predecessoras) e calculado em memória,
+em tempo linear no número de tarefas + dependências:
+
+- ordem topológica (Kahn); dependências circulares geram CicloDependencias
+- início/fim mais cedo: a tarefa começa na data planejada ou no dia
+  seguinte ao fim da última predecessora, o que for mais tarde
+- início/fim mais tarde: sem atrasar o fim do cronograma
+- folga (dias) e caminho crítico (tarefas sem folga)
+
+Durações em dias corridos, contando início e fim (data_fim - data_inicio + 1).
+Dependências com tarefas fora do grafo (outra ação) são ignoradas.
+
+Uso:
+    from acoes.cronograma import carregar_grafo, calcular_cronograma
+    cronograma = calcular_cronograma(*carregar_grafo(acao_id=10))
+    cronograma['caminho_critico']  # [ids, na ordem]
+"""
+
+from collections import deque
+from datetime import timedelta
+
+from .models import Tarefa
+
+CAMPOS = ('id', 'nome', 'status', 'percentual_cumprido', 'data_inicio', 'data_fim', 'acao_id')
+
+
+class CicloDependencias(ValueError):
+    """As predecessoras formam um ciclo (não há ordem possível)"""
+
+    def __init__(self, tarefa_ids):
+        self.tarefa_ids = sorted(tarefa_ids)
+        super().__init__(f'Dependências circulares entre as tarefas {self.tarefa_ids}')
+
+
+def carregar_grafo(acao_id=None, instrumento_id=None, diretorias=None):
+    """
+    Tarefas ({id: dados}) e dependências ([(predecessora, tarefa)])
+
+    diretorias: ids visíveis ao usuário (None = todas).
+    """
+    tarefas = Tarefa.objects.all()
+    if acao_id is not None:
+        tarefas = tarefas.filter(acao_id=acao_id)
+    if instrumento_id is not None:
+        tarefas = tarefas.filter(acao__obrigacao__instrumento_id=instrumento_id)
+    if diretorias is not None:
+        tarefas = tarefas.filter(acao__obrigacao__instrumento__diretoria_id__in=diretorias)
+
+    nos = {tarefa['id']: tarefa for tarefa in tarefas.values(*CAMPOS)}
+
+    # from_tarefa depende de to_tarefa (a predecessora)
+    Dependencia = Tarefa.tarefas_predecessoras.through
+    arestas = [
+        (predecessora, tarefa)
+        for tarefa, predecessora in Dependencia.objects.filter(
+            from_tarefa_id__in=tarefas.values('pk'),
+        ).values_list('from_tarefa_id', 'to_tarefa_id')
+        if predecessora in nos
+    ]
+    return nos, arestas
+
+
+def ordem_topologica(nos, arestas):
+    """Ids em ordem de dependência; CicloDependencias se não houver"""
+    sucessoras = {pk: [] for pk in nos}
+    pendentes = dict.fromkeys(nos, 0)
+    for predecessora, tarefa in arestas:
+        sucessoras[predecessora].append(tarefa)
+        pendentes[tarefa] += 1
+
+    fila = deque(sorted(pk for pk, n in pendentes.items() if n == 0))
+    ordem = []
+    while fila:
+        pk = fila.popleft()
+        ordem.append(pk)
+        for sucessora in sucessoras[pk]:
+            pendentes[sucessora] -= 1
+            if pendentes[sucessora] == 0:
+                fila.append(sucessora)
+
+    if len(ordem) < len(nos):
+        raise CicloDependencias(pk for pk, n in pendentes.items() if n > 0)
+    return ordem, sucessoras
+
+
+def calcular_cronograma(nos, arestas):
+    """
+    Datas mais cedo/mais tarde, folga e caminho crítico
+
+    Retorna {'inicio', 'fim', 'ordem', 'tarefas': {id: {...}},
+    'caminho_critico'}. As datas são offsets em dias a partir de 'inicio'.
+    """
+    if not nos:
+        return {'inicio': None, 'fim': None, 'ordem': [], 'tarefas': {}, 'caminho_critico': []}
+
+    ordem, sucessoras = ordem_topologica(nos, arestas)
+    predecessoras = {pk: [] for pk in nos}
+    for predecessora, tarefa in arestas:
+        predecessoras[tarefa].append(predecessora)
+
+    inicio = min(tarefa['data_inicio'] for tarefa in nos.values())
+    base = inicio.toordinal()
+    planejado, duracao = {}, {}
+    for pk, tarefa in nos.items():
+        planejado[pk] = tarefa['data_inicio'].toordinal() - base
+        duracao[pk] = max(tarefa['data_fim'].toordinal() - tarefa['data_inicio'].toordinal() + 1, 1)
+
+    # Passada para frente: início/fim mais cedo (fim exclusivo)
+    cedo_inicio, cedo_fim = {}, {}
+    for pk in ordem:
+        valor = planejado[pk]
+        for p in predecessoras[pk]:
+            if cedo_fim[p] > valor:
+                valor = cedo_fim[p]
+        cedo_inicio[pk] = valor
+        cedo_fim[pk] = valor + duracao[pk]
+    fim = max(cedo_fim.values())
+
+    # Passada para trás: início/fim mais tarde
+    tarde_inicio, tarde_fim = {}, {}
+    for pk in reversed(ordem):
+        valor = fim
+        for s in sucessoras[pk]:
+            if tarde_inicio[s] < valor:
+                valor = tarde_inicio[s]
+        tarde_fim[pk] = valor
+        tarde_inicio[pk] = valor - duracao[pk]
+
+    tarefas = {
+        pk: {
+            'duracao': duracao[pk],
+            'cedo_inicio': cedo_inicio[pk],
+            'cedo_fim': cedo_fim[pk],
+            'tarde_inicio': tarde_inicio[pk],
+            'tarde_fim': tarde_fim[pk],
+            'folga': tarde_inicio[pk] - cedo_inicio[pk],
+            'predecessoras': predecessoras[pk],
+        }
+        for pk in ordem
+    }
+
+    # Caminho crítico: da tarefa crítica que termina por último, volta pelas
+    # predecessoras críticas que a empurram (fim mais cedo = início dela)
+    caminho = []
+    atual = max((pk for pk in ordem if tarefas[pk]['folga'] == 0), key=cedo_fim.get)
+    while atual is not None:
+        caminho.append(atual)
+        atual = next(
+            (
+                p for p in predecessoras[atual]
+                if tarefas[p]['folga'] == 0 and cedo_fim[p] == cedo_inicio[atual]
+            ),
+            None,
+        )
+    caminho.reverse()
+
+    return {
+        'inicio': inicio,
+        'fim': inicio + timedelta(days=fim - 1),
+        'ordem': ordem,
+        'tarefas': tarefas,
+        'caminho_critico': caminho,
+    }
+
+
+def gantt(nos, arestas):
+    """Cronograma no formato da resposta JSON (datas ISO, lista em ordem topológica)"""
+    cronograma = calcular_cronograma(nos, arestas)
+    inicio = cronograma['inicio']
+    datas = {}
+
+    def data(offset):
+        # Poucas datas distintas: cada uma é formatada uma vez
+        if offset not in datas:
+            datas[offset] = (inicio + timedelta(days=offset)).isoformat()
+        return datas[offset]
+
+    tarefas = []
+    for pk in cronograma['ordem']:
+        calculo = cronograma['tarefas'][pk]
+        tarefa = nos[pk]
+        tarefas.append({
+            'id': pk,
+            'nome': tarefa['nome'],
+            'acao': tarefa['acao_id'],
+            'status': tarefa['status'],
+            'percentual': tarefa['percentual_cumprido'],
+            'inicio': tarefa['data_inicio'].isoformat(),
+            'fim': tarefa['data_fim'].isoformat(),
+            'cedo_inicio': data(calculo['cedo_inicio']),
+            'cedo_fim': data(calculo['cedo_fim'] - 1),
+            'tarde_inicio': data(calculo['tarde_inicio']),
+            'tarde_fim': data(calculo['tarde_fim'] - 1),
+            'folga': calculo['folga'],
+            'critica': calculo['folga'] == 0,
+            'predecessoras': calculo['predecessoras'],
+        })
+
+    return {
+        'inicio': inicio.isoformat() if inicio else None,
+        'fim': cronograma['fim'].isoformat() if cronograma['fim'] else None,
+        'caminho_critico': cronograma['caminho_critico'],
+        'tarefas': tarefas,
+    }
@@ -3,6 +3,17 @@ from django import forms
 from .models import Acao, Tarefa, ChecklistItem
 from usuarios.models import Usuario
 from django.forms import inlineformset_factory
+from core.widgets import SelectAssincrono, SelectMultiploAssincrono
+
+
+# Relações com selects assíncronos (core/widgets.py): o formulário só
+# renderiza as opções escolhidas, e não todas as tarefas/usuários do sistema
+WIDGETS_RELACOES_TAREFA = {
+    'acao': SelectAssincrono('acoes', relacionados=['obrigacao']),
+    'responsavel': SelectAssincrono('usuarios', relacionados=['subunidade__diretoria']),
+    'executores': SelectMultiploAssincrono('usuarios', relacionados=['subunidade__diretoria']),
+    'tarefas_predecessoras': SelectMultiploAssincrono('tarefas', relacionados=['acao']),
+}
 
 
 class AcaoForm(forms.ModelForm):
@@ -17,6 +28,11 @@ class AcaoForm(forms.ModelForm):
         widgets = {
             'descricao': forms.Textarea(attrs={'rows': 3}),
             'observacoes': forms.Textarea(attrs={'rows': 3}),
+            'instrumento': SelectAssincrono('instrumentos', relacionados=['tipo_instrumento']),
+            'obrigacao': SelectAssincrono(
+                'obrigacoes', filtros={'instrumento': '#id_instrumento'}, relacionados=['instrumento']
+            ),
+            'responsavel': SelectAssincrono('usuarios'),
         }
 
     def __init__(self, *args, **kwargs):
@@ -78,11 +94,8 @@ class TarefaForm(forms.ModelForm):
                     'maxlength': '10'
                 }
             ),
-            # Widget para seleção múltipla de executores
-            'executores': forms.SelectMultiple(attrs={
-                'class': 'form-control',
-                'size': '5'
-            }),
+            # Ação, responsável, executores e predecessoras
+            **WIDGETS_RELACOES_TAREFA,
         }
 
     def __init__(self, *args, **kwargs):
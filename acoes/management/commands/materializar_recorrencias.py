@@ -0,0 +1,54 @@
+# ===== COMANDO PARA GERAR AS OCORRÊNCIAS DE AÇÕES PERIÓDICAS =====
+"""
+Gera as ocorrências das ações periódicas dentro do horizonte
+(ver acoes/recorrencia.py)
+
+Uso:
+    python manage.py materializar_recorrencias
+    python manage.py materializar_recorrencias --horizonte 180 --sem-tarefas
+
+Em produção a geração é agendada pelo Celery beat uma vez por dia
+(acoes/migrations/0011_agendar_recorrencias.py). Pode ser repetida: as
+ocorrências já existentes não são duplicadas. Usa a mesma trava da tarefa
+agendada: se ela estiver rodando, o comando não faz nada.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from acoes.recorrencia import materializar_recorrencias
+from alertas.tasks import trava
+
+
+class Command(BaseCommand):
+    help = 'Gera as ocorrências das ações periódicas dentro do horizonte'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizonte',
+            type=int,
+            default=None,
+            help='Dias à frente (padrão: ACOES_RECORRENCIA_HORIZONTE_DIAS)',
+        )
+
+        parser.add_argument(
+            '--sem-tarefas',
+            action='store_true',
+            help='Não copia as tarefas da ação modelo',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔁 Gerando ocorrências de ações periódicas...'))
+
+        with trava('acoes:recorrencias', settings.ACOES_VARREDURA_TRAVA_TIMEOUT) as obtida:
+            if not obtida:
+                self.stdout.write(self.style.WARNING('⚠️  Outra execução em andamento, nada foi gerado'))
+                return
+            criadas = materializar_recorrencias(
+                horizonte_dias=options['horizonte'],
+                copiar_tarefas=False if options['sem_tarefas'] else None,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {criadas["acoes"]} ocorrências criadas ({criadas["tarefas"]} tarefas)'
+        ))
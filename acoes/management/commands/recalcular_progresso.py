@@ -0,0 +1,39 @@
+# ===== COMANDO PARA RECALCULAR O PROGRESSO =====
+"""
+Recalcula os percentuais de ações, obrigações e instrumentos e o status
+das ações (ver acoes/rollups.py)
+
+Uso:
+    python manage.py recalcular_progresso
+    python manage.py recalcular_progresso --lote 500
+
+No dia a dia os valores são mantidos a cada alteração (acoes/signals.py);
+este comando serve para reparos: carga inicial, importações feitas com
+queryset.update() ou tarefas movidas entre ações.
+"""
+
+from django.core.management.base import BaseCommand
+
+from acoes.rollups import recalcular_tudo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o progresso de ações, obrigações e instrumentos a partir das tarefas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Registros por lote (padrão: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔄 Recalculando progresso...'))
+
+        processados = recalcular_tudo(lote=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {processados["acoes"]} ações, {processados["obrigacoes"]} obrigações '
+            f'e {processados["instrumentos"]} instrumentos recalculados'
+        ))
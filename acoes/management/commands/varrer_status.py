@@ -0,0 +1,39 @@
+# ===== COMANDO PARA A VARREDURA DE PRAZOS VENCIDOS =====
+"""
+Marca como atrasados, vencidos ou encerrados os registros com prazo vencido
+(ver acoes/varredura.py)
+
+Uso:
+    python manage.py varrer_status
+    python manage.py varrer_status --lote 500
+
+Em produção a varredura é agendada pelo Celery beat a cada 5 minutos
+(acoes/migrations/0009_agendar_varredura_status.py).
+"""
+
+from django.core.management.base import BaseCommand
+
+from acoes.varredura import varrer_status
+
+
+class Command(BaseCommand):
+    help = 'Aplica as transições de status de prazos vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Registros por UPDATE (padrão: ACOES_VARREDURA_LOTE)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('⏰ Varrendo prazos vencidos...'))
+
+        contagens = varrer_status(lote=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {contagens["tarefas"]} tarefas e {contagens["acoes"]} ações atrasadas, '
+            f'{contagens["obrigacoes"]} obrigações vencidas, '
+            f'{contagens["instrumentos"]} instrumentos encerrados'
+        ))
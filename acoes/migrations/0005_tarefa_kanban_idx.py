@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0004_checklistitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['status', '-data_cadastro', '-id'], name='acoes_tarefa_kanban_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0005_tarefa_kanban_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Incrementada a cada gravação', verbose_name='Versão'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0006_tarefa_versao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['data_inicio', 'data_fim'], name='acoes_tarefa_periodo_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0007_tarefa_periodo_idx'),
+        ('core', '0002_subunidade'),
+        ('instrumentos', '0003_percentual_cumprido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VarreduraStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('executada_em', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Executada em')),
+                ('data_referencia', models.DateField(verbose_name='Data de Referência')),
+                ('duracao', models.FloatField(verbose_name='Duração (s)')),
+                ('tarefas', models.PositiveIntegerField(default=0, verbose_name='Tarefas Atrasadas')),
+                ('acoes', models.PositiveIntegerField(default=0, verbose_name='Ações Atrasadas')),
+                ('obrigacoes', models.PositiveIntegerField(default=0, verbose_name='Obrigações Vencidas')),
+                ('instrumentos', models.PositiveIntegerField(default=0, verbose_name='Instrumentos Encerrados')),
+            ],
+            options={
+                'verbose_name': 'Varredura de Status',
+                'verbose_name_plural': 'Varreduras de Status',
+                'ordering': ['-executada_em'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='acao',
+            index=models.Index(condition=models.Q(('status__in', ['a_iniciar', 'em_andamento'])), fields=['data_fim_prevista'], name='acoes_acao_prazo_aberto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('status__in', ['a_iniciar', 'em_andamento'])), fields=['data_fim'], name='acoes_tarefa_prazo_aberto_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Registra a varredura de prazos vencidos no DatabaseScheduler do django_celery_beat
+
+import json
+
+from django.conf import settings
+from django.db import migrations
+
+
+TAREFAS = [
+    {
+        'name': 'acoes: varredura de prazos vencidos',
+        'task': 'acoes.tasks.varrer_status',
+        'crontab': {'minute': '*/5', 'hour': '*'},
+        'kwargs': {},
+        'description': 'Marca tarefas/ações atrasadas, obrigações vencidas e instrumentos encerrados',
+    },
+]
+
+
+def agendar(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    for tarefa in TAREFAS:
+        crontab, _ = CrontabSchedule.objects.get_or_create(
+            minute=tarefa['crontab']['minute'],
+            hour=tarefa['crontab']['hour'],
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*',
+            timezone=settings.TIME_ZONE,
+        )
+        PeriodicTask.objects.update_or_create(
+            name=tarefa['name'],
+            defaults={
+                'task': tarefa['task'],
+                'crontab': crontab,
+                'kwargs': json.dumps(tarefa['kwargs']),
+                'description': tarefa['description'],
+                'enabled': True,
+            },
+        )
+
+
+def desagendar(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(name__in=[t['name'] for t in TAREFAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0008_varredura_status'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(agendar, desagendar),
+    ]
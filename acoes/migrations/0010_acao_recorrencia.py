@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0009_agendar_varredura_status'),
+        ('core', '0002_subunidade'),
+        ('instrumentos', '0004_obrigacao_prazo_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='acao',
+            name='acao_origem',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocorrencias', to='acoes.acao', verbose_name='Ação de Origem'),
+        ),
+        migrations.AddField(
+            model_name='acao',
+            name='periodo',
+            field=models.CharField(blank=True, editable=False, max_length=7, verbose_name='Período'),
+        ),
+        migrations.AddConstraint(
+            model_name='acao',
+            constraint=models.UniqueConstraint(fields=('acao_origem', 'periodo'), name='acoes_acao_ocorrencia_unica'),
+        ),
+    ]
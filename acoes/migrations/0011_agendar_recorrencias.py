@@ -0,0 +1,59 @@
+# Registra a geração das ocorrências de ações periódicas no DatabaseScheduler do django_celery_beat
+
+import json
+
+from django.conf import settings
+from django.db import migrations
+
+
+TAREFAS = [
+    {
+        'name': 'acoes: ocorrências de ações periódicas',
+        'task': 'acoes.tasks.materializar_recorrencias',
+        'crontab': {'minute': '30', 'hour': '0'},
+        'kwargs': {},
+        'description': 'Gera as ocorrências das ações periódicas no horizonte (ACOES_RECORRENCIA_HORIZONTE_DIAS)',
+    },
+]
+
+
+def agendar(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    for tarefa in TAREFAS:
+        crontab, _ = CrontabSchedule.objects.get_or_create(
+            minute=tarefa['crontab']['minute'],
+            hour=tarefa['crontab']['hour'],
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*',
+            timezone=settings.TIME_ZONE,
+        )
+        PeriodicTask.objects.update_or_create(
+            name=tarefa['name'],
+            defaults={
+                'task': tarefa['task'],
+                'crontab': crontab,
+                'kwargs': json.dumps(tarefa['kwargs']),
+                'description': tarefa['description'],
+                'enabled': True,
+            },
+        )
+
+
+def desagendar(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(name__in=[t['name'] for t in TAREFAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0010_acao_recorrencia'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(agendar, desagendar),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0011_agendar_recorrencias'),
+        ('core', '0002_subunidade'),
+        ('instrumentos', '0005_obrigacao_titulo_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='acao',
+            index=models.Index(fields=['nome'], name='acoes_acao_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['nome'], name='acoes_tarefa_nome_idx'),
+        ),
+    ]
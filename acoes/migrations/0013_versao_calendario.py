@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acoes', '0012_nome_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.PositiveBigIntegerField(default=0, verbose_name='Versão')),
+                ('atualizada_em', models.DateTimeField(auto_now=True, verbose_name='Atualizada em')),
+            ],
+            options={
+                'verbose_name': 'Versão do Calendário',
+                'verbose_name_plural': 'Versões do Calendário',
+            },
+        ),
+    ]
@@ -67,6 +67,19 @@ class Acao(models.Model):
     data_fim_prevista = models.DateField('Data de Fim Prevista', null=True, blank=True)
     data_fim_real = models.DateField('Data de Fim Real', null=True, blank=True)
 
+    # Recorrência (acoes/recorrencia.py): ocorrências geradas a partir de
+    # uma ação periódica apontam para ela e guardam o período (AAAA-MM)
+    acao_origem = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        verbose_name='Ação de Origem',
+        related_name='ocorrencias',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    periodo = models.CharField('Período', max_length=7, blank=True, editable=False)
+
     # Alertas
     dias_antecedencia_alerta = models.IntegerField(
         'Dias de Antecedência para Alerta',
@@ -85,25 +98,41 @@ class Acao(models.Model):
         verbose_name = 'Ação'
         verbose_name_plural = 'Ações'
         ordering = ['data_fim_prevista', 'nome']
+        constraints = [
+            # Uma ocorrência por período: a geração pode ser repetida sem duplicar
+            models.UniqueConstraint(fields=['acao_origem', 'periodo'], name='acoes_acao_ocorrencia_unica'),
+        ]
+        indexes = [
+            # Varredura de prazos (acoes/varredura.py): só as ações em aberto
+            models.Index(
+                fields=['data_fim_prevista'],
+                condition=models.Q(status__in=['a_iniciar', 'em_andamento']),
+                name='acoes_acao_prazo_aberto_idx',
+            ),
+            # Autocomplete de ações (core/autocomplete.py): ordem por nome
+            models.Index(fields=['nome'], name='acoes_acao_nome_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} - {self.obrigacao.titulo}"
 
     def atualizar_percentual(self):
         """Atualiza o percentual com base nas tarefas"""
-        tarefas = self.tarefas.all()
-        if tarefas.exists():
-            total_percentual = sum(t.percentual_cumprido for t in tarefas)
-            self.percentual_cumprido = total_percentual // tarefas.count()
+        agregado = self.tarefas.aggregate(total=models.Count('id'), soma=models.Sum('percentual_cumprido'))
+        if agregado['total']:
+            self.percentual_cumprido = agregado['soma'] // agregado['total']
             self.save()
 
     def verificar_status_automatico(self):
         """Atualiza o status com base nas tarefas e datas"""
         from django.utils import timezone
         hoje = timezone.now().date()
-        tarefas = self.tarefas.all()
+        contagem = self.tarefas.aggregate(
+            total=models.Count('id'),
+            finalizadas=models.Count('id', filter=models.Q(status='finalizado')),
+        )
 
-        if tarefas.exists() and all(t.status == 'finalizado' for t in tarefas):
+        if contagem['total'] and contagem['total'] == contagem['finalizadas']:
             self.status = 'finalizado'
             if not self.data_fim_real:
                 self.data_fim_real = hoje
@@ -177,6 +206,14 @@ class Tarefa(models.Model):
         help_text='Percentual de conclusão da tarefa (0-100)'
     )
     
+    # Controle de concorrência (ver acoes/transicoes.py)
+    versao = models.PositiveIntegerField(
+        'Versão',
+        default=1,
+        editable=False,
+        help_text='Incrementada a cada gravação'
+    )
+    
     # Datas (para Gráfico de Gantt)
     data_inicio = models.DateField('Data de Início')
     data_fim = models.DateField('Data de Fim')
@@ -215,10 +252,38 @@ class Tarefa(models.Model):
         verbose_name = 'Tarefa'
         verbose_name_plural = 'Tarefas'
         ordering = ['data_inicio', 'prioridade', 'nome']
+        indexes = [
+            # Colunas do Kanban: keyset em (data_cadastro, id) por status
+            models.Index(fields=['status', '-data_cadastro', '-id'], name='acoes_tarefa_kanban_idx'),
+            # Calendário: sobreposição com a janela visível
+            models.Index(fields=['data_inicio', 'data_fim'], name='acoes_tarefa_periodo_idx'),
+            # Varredura de prazos (acoes/varredura.py): só as tarefas em aberto
+            models.Index(
+                fields=['data_fim'],
+                condition=models.Q(status__in=['a_iniciar', 'em_andamento']),
+                name='acoes_tarefa_prazo_aberto_idx',
+            ),
+            # Autocomplete de tarefas (predecessoras): ordem por nome
+            models.Index(fields=['nome'], name='acoes_tarefa_nome_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nome} - {self.acao.nome}"
     
+    def save(self, *args, **kwargs):
+        # Nova versão a cada gravação, incrementada no próprio UPDATE: uma
+        # instância desatualizada não reutiliza a versão de outra gravação
+        if self.pk and not self._state.adding:
+            self.versao = models.F('versao') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'versao'}
+        super().save(*args, **kwargs)
+        if isinstance(self.versao, models.expressions.Combinable):
+            # Sem reler a linha a cada gravação: a versão vira campo adiado
+            # e só é lida do banco se for acessada (ex.: resposta do Kanban)
+            del self.__dict__['versao']
+    
     def verificar_status_automatico(self):
         """Atualiza o status com base nas datas e percentual"""
         from django.utils import timezone
@@ -237,10 +302,8 @@ class Tarefa(models.Model):
         elif self.data_inicio <= hoje <= self.data_fim and self.status == 'a_iniciar':
             self.status = 'em_andamento'
         
+        # Percentual/status da ação e acima: acoes/signals.py (post_save)
         self.save()
-        
-        # Atualizar percentual da ação
-        self.acao.atualizar_percentual()
     
     def esta_atrasada(self):
         """Verifica se a tarefa está atrasada"""
@@ -271,3 +334,59 @@ class ChecklistItem(models.Model):
 
     def __str__(self):
         return self.nome
+
+
+class VarreduraStatus(models.Model):
+    """Execução da varredura de prazos vencidos (acoes/varredura.py)"""
+
+    executada_em = models.DateTimeField('Executada em', auto_now_add=True, db_index=True)
+    data_referencia = models.DateField('Data de Referência')
+    duracao = models.FloatField('Duração (s)')
+    tarefas = models.PositiveIntegerField('Tarefas Atrasadas', default=0)
+    acoes = models.PositiveIntegerField('Ações Atrasadas', default=0)
+    obrigacoes = models.PositiveIntegerField('Obrigações Vencidas', default=0)
+    instrumentos = models.PositiveIntegerField('Instrumentos Encerrados', default=0)
+
+    class Meta:
+        verbose_name = 'Varredura de Status'
+        verbose_name_plural = 'Varreduras de Status'
+        ordering = ['-executada_em']
+
+    def __str__(self):
+        return f"Varredura de {self.executada_em:%d/%m/%Y %H:%M}"
+
+
+class VersaoCalendario(models.Model):
+    """
+    Versão do feed do calendário (acoes/calendario.py), numa linha só
+
+    Incrementada após cada gravação de tarefa, ação ou nome de responsável
+    e a cada tarefas_alteradas (acoes/signals.py). A leitura é uma consulta
+    pela chave primária, qualquer que seja o total de tarefas.
+    """
+
+    versao = models.PositiveBigIntegerField('Versão', default=0)
+    atualizada_em = models.DateTimeField('Atualizada em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Versão do Calendário'
+        verbose_name_plural = 'Versões do Calendário'
+
+    def __str__(self):
+        return f"Calendário v{self.versao}"
+
+    @classmethod
+    def atual(cls):
+        return cls.objects.filter(pk=1).values_list('versao', flat=True).first() or 0
+
+    @classmethod
+    def incrementar(cls):
+        from django.utils import timezone
+
+        def somar():
+            return cls.objects.filter(pk=1).update(versao=models.F('versao') + 1, atualizada_em=timezone.now())
+
+        # A linha é criada na primeira gravação; se outro processo a criou
+        # antes, o incremento é refeito sobre ela
+        if not somar() and not cls.objects.get_or_create(pk=1, defaults={'versao': 1})[1]:
+            somar()
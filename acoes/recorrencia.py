@@ -0,0 +1,229 @@
+"""
+Ocorrências de ações periódicas (Acao.periodicidade)
+
+Uma ação com periodicidade diferente de "única" (e sem acao_origem) é o
+modelo: ela mesma é a primeira ocorrência, e as seguintes são novas ações
+com acao_origem = modelo e periodo = "AAAA-MM" do início, deslocadas de
+1, 2, 3, 4, 6 ou 12 meses a partir de data_inicio e com a mesma duração.
+
+- Horizonte móvel: só são geradas ocorrências que começam até hoje +
+  ACOES_RECORRENCIA_HORIZONTE_DIAS e que ainda não terminaram (períodos
+  já encerrados não são preenchidos retroativamente), nem além do fim da
+  vigência do instrumento. Execuções periódicas estendem o horizonte aos
+  poucos, sem encher as tabelas de ocorrências distantes.
+- Idempotente: as ocorrências existentes são lidas por (modelo, período)
+  e a restrição acoes_acao_ocorrencia_unica impede duplicatas. A inserção
+  ignora as que outra execução criou no meio do caminho (ignore_conflicts)
+  e as criadas são relidas do banco; a tarefa Celery e o comando ainda
+  rodam sob a mesma trava (alertas.tasks.trava), uma execução por vez.
+- Com copiar_tarefas, as tarefas do modelo (executores, predecessoras e
+  checklist) são copiadas para cada ocorrência, com as datas deslocadas.
+
+Tudo é gravado com bulk_create, algumas consultas por execução
+independentemente do número de ocorrências.
+
+Uso:
+    from acoes.recorrencia import materializar_recorrencias
+    materializar_recorrencias()  # {'acoes': 12, 'tarefas': 48}
+"""
+
+import calendar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Acao, ChecklistItem, Tarefa
+from .rollups import recalcular_hierarquia
+from .signals import enviar_tarefas_alteradas
+
+MESES_POR_PERIODICIDADE = {
+    'mensal': 1,
+    'bimestral': 2,
+    'trimestral': 3,
+    'quadrimestral': 4,
+    'semestral': 6,
+    'anual': 12,
+}
+
+CAMPOS_COPIADOS = (
+    'descricao', 'instrumento_id', 'obrigacao_id', 'tipo_acao_id', 'responsavel_id',
+    'dias_antecedencia_alerta',
+)
+
+
+def somar_meses(data, meses):
+    """Mesma data n meses depois (último dia do mês quando não existir)"""
+    mes = data.month - 1 + meses
+    ano, mes = data.year + mes // 12, mes % 12 + 1
+    return data.replace(year=ano, month=mes, day=min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def ocorrencias_previstas(modelo, hoje, limite):
+    """[(periodo, inicio, fim)] do modelo dentro do horizonte"""
+    passo = MESES_POR_PERIODICIDADE[modelo.periodicidade]
+    duracao = (modelo.data_fim_prevista or modelo.data_inicio) - modelo.data_inicio
+    fim_vigencia = modelo.obrigacao.instrumento.data_fim
+
+    previstas = []
+    k = 1
+    while True:
+        inicio = somar_meses(modelo.data_inicio, k * passo)
+        if inicio > limite or inicio > fim_vigencia:
+            break
+        if inicio + duracao >= hoje:
+            previstas.append((inicio.strftime('%Y-%m'), inicio, inicio + duracao))
+        k += 1
+    return previstas
+
+
+def copiar_tarefas_dos_modelos(novas, modelos_por_id):
+    """Copia as tarefas dos modelos para as ocorrências criadas; retorna os ids"""
+    modelo_ids = {acao.acao_origem_id for acao in novas}
+    tarefas_modelo = list(Tarefa.objects.filter(acao_id__in=modelo_ids).order_by('pk'))
+    if not tarefas_modelo:
+        return []
+
+    tarefa_ids = [tarefa.pk for tarefa in tarefas_modelo]
+    executores = list(
+        Tarefa.executores.through.objects.filter(tarefa_id__in=tarefa_ids)
+        .values_list('tarefa_id', 'usuario_id')
+    )
+    predecessoras = list(
+        Tarefa.tarefas_predecessoras.through.objects.filter(
+            from_tarefa_id__in=tarefa_ids, to_tarefa_id__in=tarefa_ids
+        ).values_list('from_tarefa_id', 'to_tarefa_id')
+    )
+    checklist = list(
+        ChecklistItem.objects.filter(tarefa_id__in=tarefa_ids).values_list('tarefa_id', 'nome')
+    )
+
+    por_modelo = {}
+    for tarefa in tarefas_modelo:
+        por_modelo.setdefault(tarefa.acao_id, []).append(tarefa)
+
+    # (ocorrência, tarefa do modelo) -> tarefa nova
+    copias = {}
+    for acao in novas:
+        deslocamento = acao.data_inicio - modelos_por_id[acao.acao_origem_id].data_inicio
+        for tarefa in por_modelo.get(acao.acao_origem_id, []):
+            copias[acao.pk, tarefa.pk] = Tarefa(
+                nome=tarefa.nome,
+                descricao=tarefa.descricao,
+                acao_id=acao.pk,
+                responsavel_id=tarefa.responsavel_id,
+                prioridade=tarefa.prioridade,
+                data_inicio=tarefa.data_inicio + deslocamento,
+                data_fim=tarefa.data_fim + deslocamento,
+                observacoes=tarefa.observacoes,
+            )
+    Tarefa.objects.bulk_create(copias.values())
+
+    acao_do_modelo = {}
+    for acao_id, tarefa_id in copias:
+        acao_do_modelo.setdefault(tarefa_id, []).append(acao_id)
+
+    Tarefa.executores.through.objects.bulk_create([
+        Tarefa.executores.through(tarefa_id=copias[acao_id, tarefa_id].pk, usuario_id=usuario_id)
+        for tarefa_id, usuario_id in executores
+        for acao_id in acao_do_modelo.get(tarefa_id, ())
+    ])
+    Tarefa.tarefas_predecessoras.through.objects.bulk_create([
+        Tarefa.tarefas_predecessoras.through(
+            from_tarefa_id=copias[acao_id, de].pk, to_tarefa_id=copias[acao_id, para].pk
+        )
+        for de, para in predecessoras
+        for acao_id in acao_do_modelo.get(de, ())
+    ])
+    ChecklistItem.objects.bulk_create([
+        ChecklistItem(tarefa_id=copias[acao_id, tarefa_id].pk, nome=nome)
+        for tarefa_id, nome in checklist
+        for acao_id in acao_do_modelo.get(tarefa_id, ())
+    ])
+    return [tarefa.pk for tarefa in copias.values()]
+
+
+def ocorrencias_inseridas(novas):
+    """
+    Ocorrências do bulk_create(ignore_conflicts=True), relidas do banco
+
+    O INSERT não devolve os ids e descarta em silêncio as que outra
+    execução criou antes. Das chaves (modelo, período) tentadas, ficam as
+    que ainda não têm tarefas: as da outra execução foram gravadas junto
+    com as suas cópias, na mesma transação.
+    """
+    chaves = {(acao.acao_origem_id, acao.periodo) for acao in novas}
+    return [
+        acao
+        for acao in Acao.objects.filter(
+            acao_origem_id__in={modelo_id for modelo_id, _ in chaves},
+            periodo__in={periodo for _, periodo in chaves},
+        )
+        .exclude(Exists(Tarefa.objects.filter(acao_id=OuterRef('pk'))))
+        .only('acao_origem_id', 'periodo', 'data_inicio', 'obrigacao_id')
+        .order_by('pk')
+        if (acao.acao_origem_id, acao.periodo) in chaves
+    ]
+
+
+def materializar_recorrencias(hoje=None, horizonte_dias=None, copiar_tarefas=None):
+    """Gera as ocorrências que faltam no horizonte; retorna quantas foram criadas"""
+    hoje = hoje or timezone.localdate()
+    if horizonte_dias is None:
+        horizonte_dias = settings.ACOES_RECORRENCIA_HORIZONTE_DIAS
+    if copiar_tarefas is None:
+        copiar_tarefas = settings.ACOES_RECORRENCIA_COPIAR_TAREFAS
+    limite = hoje + timedelta(days=horizonte_dias)
+
+    modelos = list(
+        Acao.objects.filter(
+            acao_origem__isnull=True,
+            periodicidade__in=MESES_POR_PERIODICIDADE,
+            data_inicio__isnull=False,
+            data_inicio__lte=limite,
+        ).select_related('obrigacao__instrumento')
+    )
+    if not modelos:
+        return {'acoes': 0, 'tarefas': 0}
+    modelos_por_id = {modelo.pk: modelo for modelo in modelos}
+
+    with transaction.atomic():
+        existentes = set(
+            Acao.objects.filter(acao_origem__in=modelos_por_id).values_list('acao_origem_id', 'periodo')
+        )
+
+        novas = [
+            Acao(
+                nome=f'{modelo.nome} - {inicio:%m/%Y}'[:200],
+                acao_origem_id=modelo.pk,
+                periodo=periodo,
+                periodicidade='unica',
+                data_inicio=inicio,
+                data_fim_prevista=fim if modelo.data_fim_prevista else None,
+                **{campo: getattr(modelo, campo) for campo in CAMPOS_COPIADOS},
+            )
+            for modelo in modelos
+            for periodo, inicio, fim in ocorrencias_previstas(modelo, hoje, limite)
+            if (modelo.pk, periodo) not in existentes
+        ]
+        if not novas:
+            return {'acoes': 0, 'tarefas': 0}
+        Acao.objects.bulk_create(novas, ignore_conflicts=True)
+        novas = ocorrencias_inseridas(novas)
+        if not novas:
+            return {'acoes': 0, 'tarefas': 0}
+
+        tarefa_ids = copiar_tarefas_dos_modelos(novas, modelos_por_id) if copiar_tarefas else []
+
+        obrigacao_ids = {acao.obrigacao_id for acao in novas}
+        recalcular_hierarquia(obrigacao_ids=obrigacao_ids, hoje=hoje)
+        enviar_tarefas_alteradas(
+            Tarefa,
+            tarefa_ids=tarefa_ids,
+            acao_ids={acao.pk for acao in novas},
+            obrigacao_ids=obrigacao_ids,
+        )
+
+    return {'acoes': len(novas), 'tarefas': len(tarefa_ids)}
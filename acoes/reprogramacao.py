@@ -0,0 +1,157 @@
+"""
+Reprogramação das sucessoras quando uma tarefa muda de datas
+
+A nova data de uma tarefa é propagada pelas tarefas_predecessoras numa
+única passada em ordem topológica: cada sucessora passa a começar no dia
+seguinte ao fim da predecessora mais tardia, mantendo a duração. Tarefas
+só são empurradas para frente (folgas existentes absorvem o atraso) e as
+finalizadas não se movem. Uma tarefa atrasada cujo novo fim não passou
+volta a em_andamento (já começou) ou a_iniciar, como se a varredura de
+prazos (acoes/varredura.py) nunca a tivesse marcado.
+
+Consultas: uma por nível de dependência para descobrir as sucessoras,
+uma para as dependências delas e uma para as datas. A aplicação é um
+único bulk_update, seguido do sinal tarefas_alteradas.
+
+Uso:
+    from acoes.reprogramacao import calcular_reprogramacao, aplicar_reprogramacao
+    calcular_reprogramacao(10, data_fim=date(2025, 3, 20))  # prévia
+    aplicar_reprogramacao(10, data_fim=date(2025, 3, 20))   # grava
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cronograma import ordem_topologica
+from .models import Tarefa
+from .signals import enviar_tarefas_alteradas
+
+Dependencia = Tarefa.tarefas_predecessoras.through
+
+
+def sucessoras_alcancaveis(tarefa_id):
+    """Ids de todas as sucessoras (diretas e indiretas) da tarefa"""
+    alcancadas = set()
+    fronteira = {tarefa_id}
+    while fronteira:
+        fronteira = set(
+            Dependencia.objects.filter(to_tarefa_id__in=fronteira)
+            .values_list('from_tarefa_id', flat=True)
+        ) - alcancadas - {tarefa_id}
+        alcancadas |= fronteira
+    return alcancadas
+
+
+def novo_status(status, nova_inicio, nova_fim, hoje):
+    """Status após a reprogramação: atrasada com prazo reaberto volta ao fluxo"""
+    if status != 'atrasado' or nova_fim < hoje:
+        return status
+    return 'em_andamento' if nova_inicio <= hoje else 'a_iniciar'
+
+
+def calcular_reprogramacao(tarefa_id, data_fim, data_inicio=None, hoje=None):
+    """
+    Novas datas (e status) da tarefa e das sucessoras afetadas
+
+    Retorna [{'id', 'nome', 'status', 'data_inicio', 'data_fim', 'acao_id',
+    'nova_data_inicio', 'nova_data_fim', 'novo_status', 'dias'}], a tarefa
+    alterada primeiro e as sucessoras em ordem de dependência (só as que
+    mudam).
+    Tarefa.DoesNotExist se a tarefa não existir; CicloDependencias se as
+    dependências forem circulares.
+    """
+    hoje = hoje or timezone.localdate()
+    sucessoras = sucessoras_alcancaveis(tarefa_id)
+    grafo = sucessoras | {tarefa_id}
+
+    # Dependências do grafo (inclusive com tarefas de fora, que também
+    # limitam o início das sucessoras)
+    arestas = list(
+        Dependencia.objects.filter(from_tarefa_id__in=grafo)
+        .values_list('to_tarefa_id', 'from_tarefa_id')
+    )
+    ids = grafo | {predecessora for predecessora, _ in arestas}
+    tarefas = {
+        tarefa['id']: tarefa
+        for tarefa in Tarefa.objects.filter(pk__in=ids)
+        .values('id', 'nome', 'status', 'data_inicio', 'data_fim', 'acao_id')
+    }
+    if tarefa_id not in tarefas:
+        raise Tarefa.DoesNotExist(f'Tarefa {tarefa_id} não encontrada')
+
+    origem = tarefas[tarefa_id]
+    novas = {tarefa_id: (data_inicio or origem['data_inicio'], data_fim)}
+
+    ordem, _ = ordem_topologica(
+        dict.fromkeys(grafo),
+        [(p, s) for p, s in arestas if p in grafo],
+    )
+    predecessoras = {}
+    for predecessora, sucessora in arestas:
+        predecessoras.setdefault(sucessora, []).append(predecessora)
+
+    for pk in ordem:
+        if pk == tarefa_id or pk not in tarefas:
+            continue
+        tarefa = tarefas[pk]
+        if tarefa['status'] == 'finalizado':
+            continue
+        limite = max(
+            novas.get(p, (None, tarefas[p]['data_fim']))[1]
+            for p in predecessoras.get(pk, ())
+            if p in tarefas
+        ) + timedelta(days=1)
+        if tarefa['data_inicio'] < limite:
+            deslocamento = limite - tarefa['data_inicio']
+            novas[pk] = (limite, tarefa['data_fim'] + deslocamento)
+
+    afetadas = []
+    for pk in [tarefa_id] + [pk for pk in ordem if pk != tarefa_id]:
+        if pk not in novas:
+            continue
+        tarefa = tarefas[pk]
+        nova_inicio, nova_fim = novas[pk]
+        if (nova_inicio, nova_fim) == (tarefa['data_inicio'], tarefa['data_fim']):
+            continue
+        afetadas.append({
+            **tarefa,
+            'nova_data_inicio': nova_inicio,
+            'nova_data_fim': nova_fim,
+            'novo_status': novo_status(tarefa['status'], nova_inicio, nova_fim, hoje),
+            'dias': (nova_fim - tarefa['data_fim']).days,
+        })
+    return afetadas
+
+
+def aplicar_reprogramacao(tarefa_id, data_fim, data_inicio=None, hoje=None):
+    """Grava as novas datas e status com um único bulk_update; retorna as afetadas"""
+    with transaction.atomic():
+        afetadas = calcular_reprogramacao(tarefa_id, data_fim, data_inicio, hoje)
+        if not afetadas:
+            return afetadas
+
+        agora = timezone.now()
+        Tarefa.objects.bulk_update(
+            [
+                Tarefa(
+                    pk=item['id'],
+                    data_inicio=item['nova_data_inicio'],
+                    data_fim=item['nova_data_fim'],
+                    status=item['novo_status'],
+                    versao=F('versao') + 1,
+                    data_atualizacao=agora,
+                )
+                for item in afetadas
+            ],
+            ['data_inicio', 'data_fim', 'status', 'versao', 'data_atualizacao'],
+        )
+
+        enviar_tarefas_alteradas(
+            Tarefa,
+            tarefa_ids=[item['id'] for item in afetadas],
+            acao_ids={item['acao_id'] for item in afetadas},
+        )
+    return afetadas
@@ -0,0 +1,172 @@
+"""
+Recalculo em lote de ações, obrigações e instrumentos a partir das tarefas
+
+Mesmas regras de Acao.atualizar_percentual/verificar_status_automatico,
+mas com uma consulta de agregação por nível e um bulk_update, em vez de
+consultas por registro.
+
+Não é um cálculo por diferença: cada nível reagrega todos os filhos dos
+registros recebidos (uma ação soma todas as suas tarefas a cada gravação
+de uma delas) e devolve os pais dos que mudaram. O custo de uma alteração
+é o de uma agregação sobre os irmãos em cada nível, não o da árvore
+inteira (recalcular_hierarquia sobe todos os níveis):
+
+    Tarefa -> Acao -> Obrigacao -> Instrumento
+
+Percentuais: ação = média das tarefas; obrigação = 100 se cumprida,
+senão média das ações; instrumento = média das obrigações. Status: só o
+das ações muda, pelas regras de Acao.verificar_status_automatico; o
+cumprimento da obrigação continua sendo marcado por quem a cumpre.
+
+Chamado pelos sinais de Tarefa/Acao/Obrigacao (acoes/signals.py), uma vez
+por lote nas transições de status (acoes/transicoes.py) e, para tudo,
+pelo comando recalcular_progresso.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from instrumentos.models import Instrumento, Obrigacao
+
+from .models import Acao
+
+
+def recalcular_acoes(acao_ids, hoje=None):
+    """
+    Percentual e status das ações a partir das tarefas
+
+    Retorna os ids das obrigações das ações alteradas.
+    """
+    hoje = hoje or timezone.now().date()
+    acoes = list(
+        Acao.objects.filter(pk__in=acao_ids).annotate(
+            total_tarefas=Count('tarefas'),
+            tarefas_finalizadas=Count('tarefas', filter=Q(tarefas__status='finalizado')),
+            soma_percentual=Sum('tarefas__percentual_cumprido'),
+        )
+    )
+
+    alteradas = []
+    for acao in acoes:
+        antes = (acao.percentual_cumprido, acao.status, acao.data_fim_real)
+
+        if acao.total_tarefas:
+            acao.percentual_cumprido = acao.soma_percentual // acao.total_tarefas
+
+        if acao.total_tarefas and acao.tarefas_finalizadas == acao.total_tarefas:
+            acao.status = 'finalizado'
+            if not acao.data_fim_real:
+                acao.data_fim_real = hoje
+        elif acao.data_fim_prevista and acao.data_fim_prevista < hoje and acao.status != 'finalizado':
+            acao.status = 'atrasado'
+        elif acao.data_inicio and acao.data_inicio <= hoje and acao.status == 'a_iniciar':
+            acao.status = 'em_andamento'
+
+        if (acao.percentual_cumprido, acao.status, acao.data_fim_real) != antes:
+            acao.data_atualizacao = timezone.now()
+            alteradas.append(acao)
+
+    Acao.objects.bulk_update(
+        alteradas, ['percentual_cumprido', 'status', 'data_fim_real', 'data_atualizacao']
+    )
+    return {acao.obrigacao_id for acao in alteradas}
+
+
+def recalcular_obrigacoes(obrigacao_ids):
+    """
+    Percentual das obrigações (100 se cumprida, senão média das ações)
+
+    Retorna os ids dos instrumentos das obrigações alteradas.
+    """
+    obrigacoes = list(
+        Obrigacao.objects.filter(pk__in=obrigacao_ids)
+        .only('instrumento_id', 'cumprida', 'percentual_cumprido')
+        .annotate(
+            total_acoes=Count('acoes'),
+            soma_percentual=Sum('acoes__percentual_cumprido'),
+        )
+    )
+
+    alteradas = []
+    for obrigacao in obrigacoes:
+        if obrigacao.cumprida:
+            percentual = 100
+        elif obrigacao.total_acoes:
+            percentual = obrigacao.soma_percentual // obrigacao.total_acoes
+        else:
+            percentual = 0
+
+        if percentual != obrigacao.percentual_cumprido:
+            obrigacao.percentual_cumprido = percentual
+            obrigacao.data_atualizacao = timezone.now()
+            alteradas.append(obrigacao)
+
+    Obrigacao.objects.bulk_update(alteradas, ['percentual_cumprido', 'data_atualizacao'])
+    return {obrigacao.instrumento_id for obrigacao in alteradas}
+
+
+def recalcular_instrumentos(instrumento_ids):
+    """Percentual dos instrumentos (média das obrigações). Retorna os ids alterados."""
+    instrumentos = list(
+        Instrumento.objects.filter(pk__in=instrumento_ids)
+        .only('percentual_cumprido')
+        .annotate(
+            total_obrigacoes=Count('obrigacoes'),
+            soma_percentual=Sum('obrigacoes__percentual_cumprido'),
+        )
+    )
+
+    alterados = []
+    for instrumento in instrumentos:
+        percentual = (
+            instrumento.soma_percentual // instrumento.total_obrigacoes
+            if instrumento.total_obrigacoes else 0
+        )
+        if percentual != instrumento.percentual_cumprido:
+            instrumento.percentual_cumprido = percentual
+            alterados.append(instrumento)
+
+    Instrumento.objects.bulk_update(alterados, ['percentual_cumprido'])
+    return {instrumento.pk for instrumento in alterados}
+
+
+def recalcular_hierarquia(acao_ids=(), obrigacao_ids=(), instrumento_ids=(), hoje=None):
+    """
+    Recalcula a partir das ações (e/ou obrigações, instrumentos) até o
+    instrumento. Retorna os ids das obrigações recalculadas.
+    """
+    hoje = hoje or timezone.now().date()
+    obrigacao_ids = set(obrigacao_ids)
+    if acao_ids:
+        obrigacao_ids |= recalcular_acoes(acao_ids, hoje)
+    instrumento_ids = set(instrumento_ids)
+    if obrigacao_ids:
+        instrumento_ids |= recalcular_obrigacoes(obrigacao_ids)
+    if instrumento_ids:
+        recalcular_instrumentos(instrumento_ids)
+    return obrigacao_ids
+
+
+def recalcular_tudo(lote=1000, hoje=None):
+    """
+    Recalcula a árvore inteira, nível a nível, em lotes de ids (reparo)
+
+    Duas a três consultas por lote e por nível. Retorna quantos registros
+    de cada nível foram processados.
+    """
+    hoje = hoje or timezone.now().date()
+    niveis = (
+        ('acoes', Acao, lambda ids: recalcular_acoes(ids, hoje)),
+        ('obrigacoes', Obrigacao, recalcular_obrigacoes),
+        ('instrumentos', Instrumento, recalcular_instrumentos),
+    )
+
+    processados = {}
+    for nome, modelo, recalcular in niveis:
+        ids = list(modelo.objects.order_by('pk').values_list('pk', flat=True))
+        for inicio in range(0, len(ids), lote):
+            with transaction.atomic():
+                recalcular(ids[inicio:inicio + lote])
+        processados[nome] = len(ids)
+    return processados
@@ -0,0 +1,104 @@
+"""
+Sinais de alterações em lote de tarefas
+
+queryset.update() e bulk_update() não disparam post_save. Quem altera
+tarefas (ou obrigações) em lote envia tarefas_alteradas uma única vez, após o commit, para
+que alertas (alertas/signals.py) e dashboards (dashboards/signals.py)
+reajam como fariam a um save() por tarefa.
+
+Argumentos: tarefa_ids, acao_ids e obrigacao_ids (conjuntos de ids
+afetados; ações e obrigações incluem as recalculadas pelos rollups).
+
+Também incrementa a versão do calendário (VersaoCalendario, usada no
+cache de acoes/calendario.py) a cada gravação de tarefa, ação ou nome de
+usuário e mantém os percentuais/status de ações, obrigações e instrumentos
+(acoes/rollups.py) a cada save()/delete().
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from instrumentos.models import Obrigacao
+from .models import Acao, Tarefa, VersaoCalendario
+from .rollups import recalcular_hierarquia, recalcular_instrumentos
+
+tarefas_alteradas = Signal()
+
+
+def enviar_tarefas_alteradas(sender, tarefa_ids, acao_ids=(), obrigacao_ids=()):
+    """Envia tarefas_alteradas após o commit da transação corrente"""
+    tarefa_ids, acao_ids, obrigacao_ids = set(tarefa_ids), set(acao_ids), set(obrigacao_ids)
+    if not (tarefa_ids or obrigacao_ids):
+        return
+    transaction.on_commit(lambda: tarefas_alteradas.send(
+        sender=sender,
+        tarefa_ids=tarefa_ids,
+        acao_ids=acao_ids,
+        obrigacao_ids=obrigacao_ids,
+    ))
+
+
+# ===== VERSÃO DO CALENDÁRIO =====
+# Incrementada após o commit: a linha da versão não fica travada durante a
+# transação de quem grava
+
+CAMPOS_USUARIO_CALENDARIO = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Tarefa)
+@receiver(post_delete, sender=Tarefa)
+@receiver(post_save, sender=Acao)
+@receiver(post_delete, sender=Acao)
+@receiver(tarefas_alteradas)
+def invalidar_calendario(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(VersaoCalendario.incrementar)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidar_calendario_do_usuario(sender, raw=False, created=False, update_fields=None, **kwargs):
+    # Logins (last_login) e usuários novos não mudam nenhum evento
+    if raw or created or (update_fields is not None and not CAMPOS_USUARIO_CALENDARIO & set(update_fields)):
+        return
+    transaction.on_commit(VersaoCalendario.incrementar)
+
+
+# ===== ROLLUPS (TAREFA -> AÇÃO -> OBRIGAÇÃO -> INSTRUMENTO) =====
+# Exclusões em cascata (ex.: de uma obrigação inteira) são recalculadas
+# uma única vez, pelo receptor do registro excluído originalmente (origin).
+# Tarefas movidas para outra ação só atualizam a ação nova; o comando
+# recalcular_progresso corrige a anterior.
+
+def excluido_em_cascata(origin, model):
+    return getattr(origin, 'model', type(origin)) is not model
+
+
+@receiver(post_save, sender=Tarefa)
+@receiver(post_delete, sender=Tarefa)
+def recalcular_acao_da_tarefa(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or (origin is not None and excluido_em_cascata(origin, Tarefa)):
+        return
+    recalcular_hierarquia(acao_ids=[instance.acao_id])
+
+
+@receiver(post_save, sender=Acao)
+@receiver(post_delete, sender=Acao)
+def recalcular_obrigacao_da_acao(sender, instance, raw=False, origin=None, **kwargs):
+    # O status da própria ação é o que foi gravado: só os níveis acima mudam
+    if raw or (origin is not None and excluido_em_cascata(origin, Acao)):
+        return
+    recalcular_hierarquia(obrigacao_ids=[instance.obrigacao_id])
+
+
+@receiver(post_save, sender=Obrigacao)
+def recalcular_obrigacao(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recalcular_hierarquia(obrigacao_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Obrigacao)
+def recalcular_instrumento_da_obrigacao(sender, instance, origin=None, **kwargs):
+    if not excluido_em_cascata(origin, Obrigacao):
+        recalcular_instrumentos([instance.instrumento_id])
@@ -0,0 +1,36 @@
+# ===== AÇÕES - TAREFAS CELERY =====
+"""
+Tarefas Celery de ações e tarefas
+
+- varrer_status: marca como atrasados/vencidos/encerrados os registros
+  com prazo vencido (acoes/varredura.py), agendada a cada 5 minutos no
+  DatabaseScheduler (ver acoes/migrations/0009_agendar_varredura_status.py)
+- materializar_recorrencias: gera as ocorrências das ações periódicas no
+  horizonte (acoes/recorrencia.py), agendada uma vez por dia
+  (ver acoes/migrations/0011_agendar_recorrencias.py)
+"""
+
+from celery import shared_task
+from django.conf import settings
+
+from alertas.tasks import trava
+from .recorrencia import materializar_recorrencias as materializar
+from .varredura import varrer_status as varrer
+
+
+@shared_task(ignore_result=True)
+def varrer_status():
+    """Aplica as transições de prazo vencido"""
+    with trava('acoes:varredura', settings.ACOES_VARREDURA_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True}
+        return varrer()
+
+
+@shared_task(ignore_result=True)
+def materializar_recorrencias():
+    """Gera as ocorrências das ações periódicas que faltam no horizonte"""
+    with trava('acoes:recorrencias', settings.ACOES_VARREDURA_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True}
+        return materializar()
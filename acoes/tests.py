@@ -1,3 +1,714 @@
+import json
+from datetime import date, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from alertas.tasks import trava
+from core.models import Diretoria, TipoAcao, TipoInstrumento, TipoObrigacao
+from instrumentos.models import Instrumento, Obrigacao
+
+from .cronograma import CicloDependencias, calcular_cronograma, carregar_grafo
+from .models import Acao, ChecklistItem, Tarefa, VarreduraStatus, VersaoCalendario
+from .recorrencia import materializar_recorrencias, ocorrencias_previstas, somar_meses
+from .reprogramacao import aplicar_reprogramacao, calcular_reprogramacao
+from .rollups import recalcular_tudo
+from .transicoes import aplicar_transicoes
+from .varredura import varrer_status
+
+HOJE = date(2025, 3, 10)
+
+
+def sem_savepoints(consultas):
+    """Consultas capturadas, sem os SAVEPOINTs das transações do TestCase"""
+    return [c for c in consultas.captured_queries if 'SAVEPOINT' not in c['sql']]
+
+
+def criar_estrutura(sufixo='1', inicio=date(2025, 1, 1), fim=date(2026, 12, 31), **campos_acao):
+    """Diretoria, usuário, instrumento, obrigação e ação para os testes"""
+    diretoria = Diretoria.objects.create(nome=f'Diretoria {sufixo}', sigla=f'D{sufixo}')
+    usuario = get_user_model().objects.create_user(
+        f'usuario{sufixo}', password='x', perfil=1, diretoria=diretoria
+    )
+    instrumento = Instrumento.objects.create(
+        numero=f'I-{sufixo}',
+        tipo_instrumento=TipoInstrumento.objects.get_or_create(nome='Contrato')[0],
+        diretoria=diretoria,
+        objeto='Objeto',
+        data_assinatura=inicio,
+        data_inicio=inicio,
+        data_fim=fim,
+    )
+    obrigacao = Obrigacao.objects.create(
+        titulo=f'Obrigação {sufixo}',
+        descricao='',
+        instrumento=instrumento,
+        tipo_obrigacao=TipoObrigacao.objects.get_or_create(nome='Relatório')[0],
+    )
+    acao = Acao.objects.create(**{
+        'nome': f'Ação {sufixo}',
+        'descricao': '',
+        'instrumento': instrumento,
+        'obrigacao': obrigacao,
+        'tipo_acao': TipoAcao.objects.get_or_create(nome='Entrega')[0],
+        'responsavel': usuario,
+        **campos_acao,
+    })
+    return SimpleNamespace(
+        diretoria=diretoria, usuario=usuario, instrumento=instrumento, obrigacao=obrigacao, acao=acao
+    )
+
+
+def criar_tarefa(acao, nome, inicio, fim, **campos):
+    return Tarefa.objects.create(
+        nome=nome, acao=acao, responsavel=acao.responsavel, data_inicio=inicio, data_fim=fim, **campos
+    )
+
+
+class VarreduraStatusTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura(data_fim_prevista=HOJE - timedelta(days=1), status='em_andamento')
+        acao = self.dados.acao
+        self.vencida = criar_tarefa(acao, 'vencida', HOJE - timedelta(days=10), HOJE - timedelta(days=1))
+        self.em_validacao = criar_tarefa(
+            acao, 'validação', HOJE - timedelta(days=10), HOJE - timedelta(days=1), status='em_validacao'
+        )
+        self.no_prazo = criar_tarefa(acao, 'no prazo', HOJE, HOJE + timedelta(days=5))
+        # Os rollups (acoes/signals.py) usam a data real; fixa o estado inicial
+        Acao.objects.filter(pk=acao.pk).update(status='em_andamento')
+        Obrigacao.objects.filter(pk=self.dados.obrigacao.pk).update(
+            status='pendente', data_vencimento=HOJE - timedelta(days=1)
+        )
+        Instrumento.objects.filter(pk=self.dados.instrumento.pk).update(data_fim=HOJE - timedelta(days=1))
+
+    def status(self, objeto):
+        objeto.refresh_from_db(fields=['status'])
+        return objeto.status
+
+    def test_aplica_as_transicoes_de_prazo(self):
+        contagens = varrer_status(hoje=HOJE)
+
+        self.assertEqual(contagens, {'tarefas': 1, 'acoes': 1, 'obrigacoes': 1, 'instrumentos': 1})
+        self.assertEqual(self.status(self.vencida), 'atrasado')
+        self.assertEqual(self.status(self.em_validacao), 'em_validacao')
+        self.assertEqual(self.status(self.no_prazo), 'a_iniciar')
+        self.assertEqual(self.status(self.dados.acao), 'atrasado')
+        self.assertEqual(self.status(self.dados.obrigacao), 'vencida')
+        self.assertEqual(self.status(self.dados.instrumento), 'encerrado')
+
+    def test_versao_da_tarefa_avanca(self):
+        versao = self.vencida.versao
+        varrer_status(hoje=HOJE)
+        self.vencida.refresh_from_db(fields=['versao'])
+        self.assertEqual(self.vencida.versao, versao + 1)
+
+    def test_segunda_execucao_nao_altera_nada(self):
+        varrer_status(hoje=HOJE, lote=1)
+        with CaptureQueriesContext(connection) as consultas:
+            contagens = varrer_status(hoje=HOJE)
+        # Uma leitura por nível + registro e limpeza do histórico
+        self.assertEqual(len(sem_savepoints(consultas)), 4 + 2)
+        self.assertEqual(set(contagens.values()), {0})
+        self.assertEqual(VarreduraStatus.objects.count(), 2)
+
+
+class CalendarioCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dados = criar_estrutura()
+        self.tarefa = criar_tarefa(self.dados.acao, 'Relatório', HOJE, HOJE + timedelta(days=2))
+        self.client.force_login(self.dados.usuario)
+        self.url = reverse('tarefas_json') + '?start=2025-03-01&end=2025-04-01'
+        # Os callbacks após o commit também agendariam alertas e dashboards no broker
+        for alvo in ('alertas.tasks.reavaliar_notificacoes.apply_async', 'dashboards.snapshots.agendar_atualizacao'):
+            patcher = mock.patch(alvo)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def eventos(self):
+        resposta = self.client.get(self.url)
+        if resposta.streaming:
+            return json.loads(b''.join(resposta.streaming_content))
+        return json.loads(resposta.content)
+
+    def test_janela_em_cache(self):
+        self.eventos()
+        with self.assertNumQueries(3):  # sessão, usuário e versão do calendário
+            self.assertEqual([e['title'] for e in self.eventos()], ['Relatório'])
+
+    def test_gravacao_troca_a_versao(self):
+        self.eventos()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tarefa.nome = 'Parecer'
+            self.tarefa.save()
+        self.assertEqual([e['title'] for e in self.eventos()], ['Parecer'])
+
+    def test_alteracao_em_lote_troca_a_versao(self):
+        self.eventos()
+        self.tarefa.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_transicoes([(self.tarefa.pk, 'em_validacao', self.tarefa.versao)])
+        self.assertEqual(self.eventos()[0]['extendedProps']['status'], 'Em Validação')
+
+    def test_exclusao_e_alteracao_da_acao(self):
+        outra = criar_tarefa(self.dados.acao, 'Outra', HOJE, HOJE)
+        self.eventos()
+        with self.captureOnCommitCallbacks(execute=True):
+            outra.delete()
+        self.assertEqual(len(self.eventos()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dados.acao.nome = 'Renomeada'
+            self.dados.acao.save()
+        self.assertEqual(self.eventos()[0]['extendedProps']['acao'], 'Renomeada')
+
+    def test_so_o_nome_do_responsavel_troca_a_versao(self):
+        self.eventos()
+        versao = VersaoCalendario.atual()
+        usuario = self.dados.usuario
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.save(update_fields=['last_login'])
+        self.assertEqual(VersaoCalendario.atual(), versao)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.first_name = 'Ana'
+            usuario.save(update_fields=['first_name'])
+        self.assertEqual(self.eventos()[0]['extendedProps']['responsavel'], 'Ana')
+
+
+class ListagemTarefasTests(TestCase):
+    """Consultas da página de tarefas e dos filtros (regressão de N+1)"""
+
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.admin = get_user_model().objects.create_user('admin', password='x', perfil=0)
+        self.client.force_login(self.admin)
+
+    def criar_tarefas(self, quantidade, prefixo):
+        for indice in range(quantidade):
+            tarefa = criar_tarefa(self.dados.acao, f'{prefixo}{indice}', HOJE, HOJE + timedelta(days=indice))
+            ChecklistItem.objects.create(tarefa=tarefa, nome='Item')
+
+    def consultas(self, **parametros):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(reverse('tarefa_list'), parametros).status_code, 200)
+        return len(sem_savepoints(consultas))
+
+    def test_consultas_nao_crescem_com_as_tarefas(self):
+        # Sessão, usuário, contagem, página e checklist
+        self.criar_tarefas(2, 'A')
+        self.assertEqual(self.consultas(), 5)
+        self.criar_tarefas(15, 'B')
+        self.assertEqual(self.consultas(), 5)
+
+    def test_filtros_buscam_so_as_opcoes_escolhidas(self):
+        self.criar_tarefas(3, 'A')
+        criar_estrutura('2')
+        # Mais uma consulta por filtro, qualquer que seja o total de instrumentos
+        self.assertEqual(
+            self.consultas(instrumento=self.dados.instrumento.pk, obrigacao=self.dados.obrigacao.pk), 7
+        )
+        contexto = self.client.get(reverse('tarefa_list'), {'instrumento': self.dados.instrumento.pk}).context
+        self.assertEqual([opcao['id'] for opcao in contexto['instrumentos']], [self.dados.instrumento.pk])
+        self.assertEqual(contexto['obrigacoes'], [])
+
+
+class KanbanColunaTests(TestCase):
+    """Cards de uma coluna do Kanban, paginados por (data_cadastro, id)"""
+
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.tarefas = [
+            criar_tarefa(self.dados.acao, f'T{indice}', HOJE, HOJE + timedelta(days=indice))
+            for indice in range(5)
+        ]
+        criar_tarefa(self.dados.acao, 'finalizada', HOJE, HOJE, status='finalizado')
+        ChecklistItem.objects.create(tarefa=self.tarefas[0], nome='Feito', concluido=True)
+        ChecklistItem.objects.create(tarefa=self.tarefas[0], nome='Pendente')
+        self.client.force_login(self.dados.usuario)
+
+    def coluna(self, status='a_iniciar', **parametros):
+        resposta = self.client.get(reverse('tarefa_kanban_coluna', args=[status]), parametros)
+        return resposta.status_code, resposta.json()
+
+    def percorrer(self, limite):
+        ids, parametros = [], {'limite': limite}
+        while True:
+            _, dados = self.coluna(**parametros)
+            self.assertLessEqual(len(dados['tarefas']), limite)
+            ids += [card['id'] for card in dados['tarefas']]
+            if not dados['proximo']:
+                return ids
+            parametros['antes'] = dados['proximo']
+
+    def test_paginas_percorrem_a_coluna_sem_repetir(self):
+        self.assertEqual(self.percorrer(2), [tarefa.pk for tarefa in reversed(self.tarefas)])
+
+    def test_empate_na_data_de_cadastro_desempata_pelo_id(self):
+        Tarefa.objects.update(data_cadastro=timezone.now())
+        self.assertEqual(self.percorrer(2), [tarefa.pk for tarefa in reversed(self.tarefas)])
+
+    def test_uma_consulta_por_pagina(self):
+        # Sessão, usuário e a página (checklist anotado, sem consulta por card)
+        with self.assertNumQueries(3):
+            _, dados = self.coluna(limite=10)
+        card = next(card for card in dados['tarefas'] if card['id'] == self.tarefas[0].pk)
+        self.assertEqual((card['checklist_total'], card['checklist_concluidos']), (2, 1))
+        self.assertIsNone(dados['proximo'])
+
+    def test_status_invalido_e_cursor_invalido(self):
+        self.assertEqual(self.coluna('inexistente')[0], 400)
+        # Cursor ilegível: volta à primeira página
+        _, dados = self.coluna(antes='lixo', limite=2)
+        self.assertEqual([card['id'] for card in dados['tarefas']], [self.tarefas[4].pk, self.tarefas[3].pk])
+
+
+class TransicoesTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.a = criar_tarefa(self.dados.acao, 'A', HOJE, HOJE + timedelta(days=5))
+        self.b = criar_tarefa(self.dados.acao, 'B', HOJE, HOJE + timedelta(days=5))
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+
+    def test_lote_aplicado_em_um_update(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = aplicar_transicoes([
+                (self.a.pk, 'finalizado', self.a.versao), (self.b.pk, 'finalizado', self.b.versao),
+            ])
+        self.assertEqual(
+            [(item['id'], item['versao']) for item in resultado['aplicadas']],
+            [(self.a.pk, self.a.versao + 1), (self.b.pk, self.b.versao + 1)],
+        )
+        updates = [c for c in sem_savepoints(consultas) if c['sql'].startswith('UPDATE "acoes_tarefa"')]
+        self.assertEqual(len(updates), 1)
+
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.status, 'finalizado')
+        self.assertIsNotNone(self.a.data_conclusao)
+        # Rollups: todas as tarefas finalizadas encerram a ação
+        self.dados.acao.refresh_from_db()
+        self.assertEqual(self.dados.acao.status, 'finalizado')
+
+    def test_versao_desatualizada_volta_como_conflito(self):
+        aplicar_transicoes([(self.a.pk, 'em_andamento', self.a.versao)])
+        resultado = aplicar_transicoes([
+            (self.a.pk, 'finalizado', self.a.versao),
+            (self.b.pk, 'em_andamento', self.b.versao),
+            (0, 'finalizado', 1),
+        ])
+        self.assertEqual(
+            resultado['conflitos'], [{'id': self.a.pk, 'status': 'em_andamento', 'versao': self.a.versao + 1}]
+        )
+        self.assertEqual([item['id'] for item in resultado['aplicadas']], [self.b.pk])
+        self.assertEqual(resultado['nao_encontradas'], [0])
+
+    def test_rollup_uma_vez_por_lote(self):
+        with mock.patch('acoes.transicoes.recalcular_hierarquia', return_value=set()) as recalcular:
+            aplicar_transicoes([
+                (self.a.pk, 'em_andamento', self.a.versao), (self.b.pk, 'em_andamento', self.b.versao),
+            ])
+        recalcular.assert_called_once()
+        self.assertEqual(recalcular.call_args.args[0], {self.dados.acao.pk})
+
+    def test_status_invalido(self):
+        with self.assertRaises(ValueError):
+            aplicar_transicoes([(self.a.pk, 'arquivado', self.a.versao)])
+
+    def test_gravar_incrementa_a_versao_sem_reler_a_linha(self):
+        versao = self.a.versao
+        with CaptureQueriesContext(connection) as consultas:
+            self.a.save(update_fields=['nome'])
+        releituras = [c for c in sem_savepoints(consultas) if c['sql'].startswith('SELECT "acoes_tarefa"."versao"')]
+        self.assertEqual(releituras, [])
+        # Lida só quando acessada
+        with self.assertNumQueries(1):
+            self.assertEqual(self.a.versao, versao + 1)
+
+    def test_endpoint_responde_409_no_conflito(self):
+        self.client.force_login(self.dados.usuario)
+        url = reverse('tarefa_update_status', args=[self.a.pk])
+
+        def mover(status):
+            corpo = json.dumps({'status': status, 'versao': self.a.versao})
+            return self.client.post(url, corpo, content_type='application/json')
+
+        self.assertEqual(mover('em_andamento').json()['tarefa']['versao'], self.a.versao + 1)
+        resposta = mover('finalizado')
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['tarefa']['status'], 'em_andamento')
+
+    def test_endpoint_em_lote(self):
+        self.client.force_login(self.dados.usuario)
+        movimentos = [{'id': self.a.pk, 'status': 'em_andamento', 'versao': self.a.versao}]
+        resposta = self.client.post(
+            reverse('tarefa_transicoes_status'), json.dumps({'movimentos': movimentos}),
+            content_type='application/json',
+        )
+        self.assertTrue(resposta.json()['success'])
+        resposta = self.client.post(
+            reverse('tarefa_transicoes_status'), json.dumps({'movimentos': [{'id': self.a.pk}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+
+def no_do_grafo(pk, inicio, fim):
+    return {
+        'id': pk, 'nome': f'T{pk}', 'status': 'a_iniciar', 'percentual_cumprido': 0,
+        'data_inicio': inicio, 'data_fim': fim, 'acao_id': 1,
+    }
+
+
+class CronogramaTests(TestCase):
+    def test_datas_folga_e_caminho_critico(self):
+        nos = {
+            1: no_do_grafo(1, date(2025, 3, 1), date(2025, 3, 3)),
+            2: no_do_grafo(2, date(2025, 3, 1), date(2025, 3, 2)),
+            3: no_do_grafo(3, date(2025, 3, 1), date(2025, 3, 2)),
+        }
+        cronograma = calcular_cronograma(nos, [(1, 2)])
+
+        self.assertEqual(cronograma['ordem'], [1, 3, 2])
+        self.assertEqual(cronograma['fim'], date(2025, 3, 5))
+        self.assertEqual(cronograma['caminho_critico'], [1, 2])
+        # A sucessora começa no dia seguinte ao fim da predecessora
+        self.assertEqual(cronograma['tarefas'][2]['cedo_inicio'], 3)
+        self.assertEqual(cronograma['tarefas'][3]['folga'], 3)
+
+    def test_ciclo(self):
+        nos = {pk: no_do_grafo(pk, date(2025, 3, 1), date(2025, 3, 2)) for pk in (1, 2, 3, 4)}
+        with self.assertRaises(CicloDependencias) as contexto:
+            calcular_cronograma(nos, [(1, 2), (2, 3), (3, 2), (1, 4)])
+        self.assertEqual(contexto.exception.tarefa_ids, [2, 3])
+
+    def test_grafo_vazio(self):
+        self.assertEqual(calcular_cronograma({}, [])['caminho_critico'], [])
+
+    def test_carrega_em_duas_consultas_sem_dependencias_externas(self):
+        dados = criar_estrutura()
+        outra = criar_estrutura('2')
+        a = criar_tarefa(dados.acao, 'A', HOJE, HOJE)
+        b = criar_tarefa(dados.acao, 'B', HOJE, HOJE)
+        externa = criar_tarefa(outra.acao, 'X', HOJE, HOJE)
+        b.tarefas_predecessoras.add(a, externa)
+
+        with self.assertNumQueries(2):
+            nos, arestas = carregar_grafo(acao_id=dados.acao.pk)
+        self.assertEqual(set(nos), {a.pk, b.pk})
+        self.assertEqual(arestas, [(a.pk, b.pk)])
+
+        self.assertEqual(carregar_grafo(acao_id=dados.acao.pk, diretorias=[outra.diretoria.pk]), ({}, []))
+
+    def test_endpoint_gantt(self):
+        dados = criar_estrutura()
+        a = criar_tarefa(dados.acao, 'A', HOJE, HOJE + timedelta(days=2))
+        b = criar_tarefa(dados.acao, 'B', HOJE, HOJE)
+        b.tarefas_predecessoras.add(a)
+        self.client.force_login(dados.usuario)
+        url = reverse('tarefas_gantt_json')
+
+        resposta = self.client.get(url, {'acao': dados.acao.pk}).json()
+        self.assertEqual(resposta['caminho_critico'], [a.pk, b.pk])
+        self.assertEqual(resposta['tarefas'][1]['cedo_inicio'], (HOJE + timedelta(days=3)).isoformat())
+
+        a.tarefas_predecessoras.add(b)
+        resposta = self.client.get(url, {'acao': dados.acao.pk})
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['ciclo'], sorted([a.pk, b.pk]))
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+def dia(n):
+    return HOJE + timedelta(days=n)
+
+
+class ReprogramacaoTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+        acao = self.dados.acao
+        self.a = criar_tarefa(acao, 'A', dia(0), dia(2))
+        self.b = criar_tarefa(acao, 'B', dia(3), dia(4))
+        self.c = criar_tarefa(acao, 'C', dia(5), dia(5))
+        self.com_folga = criar_tarefa(acao, 'Folga', dia(10), dia(11))
+        self.finalizada = criar_tarefa(acao, 'Finalizada', dia(3), dia(3), status='finalizado')
+        self.b.tarefas_predecessoras.add(self.a)
+        self.c.tarefas_predecessoras.add(self.b)
+        self.com_folga.tarefas_predecessoras.add(self.a)
+        self.finalizada.tarefas_predecessoras.add(self.a)
+
+    def test_previa_empurra_so_quem_precisa(self):
+        afetadas = calcular_reprogramacao(self.a.pk, data_fim=dia(4))
+        self.assertEqual(
+            [(item['id'], item['nova_data_inicio'], item['nova_data_fim'], item['dias']) for item in afetadas],
+            [
+                (self.a.pk, HOJE, dia(4), 2),
+                (self.b.pk, dia(5), dia(6), 2),
+                (self.c.pk, dia(7), dia(7), 2),
+            ],
+        )
+        self.b.refresh_from_db()
+        self.assertEqual(self.b.data_inicio, dia(3))
+
+    def test_aplica_com_um_update(self):
+        versao = Tarefa.objects.get(pk=self.c.pk).versao
+        with CaptureQueriesContext(connection) as consultas:
+            aplicar_reprogramacao(self.a.pk, data_fim=dia(4))
+        updates = [c for c in sem_savepoints(consultas) if c['sql'].startswith('UPDATE "acoes_tarefa"')]
+        self.assertEqual(len(updates), 1)
+
+        self.c.refresh_from_db()
+        self.assertEqual((self.c.data_inicio, self.c.versao), (dia(7), versao + 1))
+        self.com_folga.refresh_from_db()
+        self.assertEqual(self.com_folga.data_inicio, dia(10))
+
+    def test_atrasadas_com_prazo_reaberto_voltam_ao_fluxo(self):
+        Tarefa.objects.filter(pk__in=[self.a.pk, self.b.pk, self.c.pk]).update(status='atrasado')
+        afetadas = aplicar_reprogramacao(self.a.pk, data_fim=dia(4), hoje=dia(5))
+        self.assertEqual(
+            [(item['id'], item['novo_status']) for item in afetadas],
+            [(self.a.pk, 'atrasado'), (self.b.pk, 'em_andamento'), (self.c.pk, 'a_iniciar')],
+        )
+        # Novo fim ainda no passado: continua atrasada; as demais voltam pelo início
+        self.assertEqual(
+            dict(Tarefa.objects.filter(pk__in=[self.a.pk, self.b.pk, self.c.pk]).values_list('pk', 'status')),
+            {self.a.pk: 'atrasado', self.b.pk: 'em_andamento', self.c.pk: 'a_iniciar'},
+        )
+        self.finalizada.refresh_from_db()
+        self.assertEqual(self.finalizada.status, 'finalizado')
+
+    def test_predecessora_de_fora_limita_a_sucessora(self):
+        outra = criar_tarefa(self.dados.acao, 'Outra', HOJE, dia(8))
+        self.c.tarefas_predecessoras.add(outra)
+        afetadas = calcular_reprogramacao(self.a.pk, data_fim=dia(3))
+        self.assertEqual(afetadas[-1]['id'], self.c.pk)
+        self.assertEqual(afetadas[-1]['nova_data_inicio'], dia(9))
+
+    def test_endpoint(self):
+        self.client.force_login(self.dados.usuario)
+        url = reverse('tarefa_reprogramar', args=[self.a.pk])
+
+        previa = self.client.get(url, {'data_fim': (dia(4)).isoformat()}).json()
+        self.assertFalse(previa['aplicada'])
+        self.assertEqual(len(previa['tarefas']), 3)
+
+        resposta = self.client.post(
+            url, json.dumps({'data_fim': (dia(4)).isoformat()}), content_type='application/json'
+        )
+        self.assertTrue(resposta.json()['aplicada'])
+        self.b.refresh_from_db()
+        self.assertEqual(self.b.data_inicio, dia(5))
+
+        self.assertEqual(self.client.get(url, {'data_fim': dia(-1).isoformat()}).status_code, 400)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.a = criar_tarefa(self.dados.acao, 'A', HOJE, HOJE + timedelta(days=5), percentual_cumprido=50)
+        self.b = criar_tarefa(self.dados.acao, 'B', HOJE, HOJE + timedelta(days=5))
+
+    def percentuais(self):
+        return (
+            Acao.objects.get(pk=self.dados.acao.pk).percentual_cumprido,
+            Obrigacao.objects.get(pk=self.dados.obrigacao.pk).percentual_cumprido,
+            Instrumento.objects.get(pk=self.dados.instrumento.pk).percentual_cumprido,
+        )
+
+    def test_sobe_a_hierarquia_a_cada_alteracao(self):
+        self.assertEqual(self.percentuais(), (25, 25, 25))
+        self.b.percentual_cumprido = 90
+        self.b.save()
+        self.assertEqual(self.percentuais(), (70, 70, 70))
+        self.b.delete()
+        self.assertEqual(self.percentuais(), (50, 50, 50))
+
+    def test_consultas_nao_dependem_da_quantidade_de_irmas(self):
+        # A agregação soma todas as irmãs, mas numa consulta só
+        def consultas_de_um_save():
+            with CaptureQueriesContext(connection) as consultas:
+                self.a.save()
+            return len(sem_savepoints(consultas))
+
+        antes = consultas_de_um_save()
+        for indice in range(20):
+            criar_tarefa(self.dados.acao, f'N{indice}', HOJE, HOJE)
+        self.assertEqual(consultas_de_um_save(), antes)
+
+    def test_recalcular_tudo_repara_o_que_foi_alterado_por_update(self):
+        Tarefa.objects.update(percentual_cumprido=100)
+        self.assertEqual(self.percentuais(), (25, 25, 25))
+
+        criar_estrutura('2')
+        with CaptureQueriesContext(connection) as consultas:
+            processados = recalcular_tudo(lote=1)
+        self.assertEqual(processados, {'acoes': 2, 'obrigacoes': 2, 'instrumentos': 2})
+        self.assertEqual(self.percentuais()[0], 100)
+        # Uma leitura de ids por nível + no máximo três consultas por lote
+        self.assertLessEqual(len(sem_savepoints(consultas)), 3 + 3 * 6)
+
+    def test_comando(self):
+        Tarefa.objects.update(percentual_cumprido=100, status='finalizado')
+        call_command('recalcular_progresso', stdout=StringIO())
+        acao = Acao.objects.get(pk=self.dados.acao.pk)
+        self.assertEqual((acao.percentual_cumprido, acao.status), (100, 'finalizado'))
+        self.assertEqual(self.percentuais(), (100, 100, 100))
+
+    def test_status_da_obrigacao_e_da_acao_finalizada_nao_sao_alterados(self):
+        for tarefa in (self.a, self.b):
+            tarefa.status = 'finalizado'
+            tarefa.save()
+        obrigacao = Obrigacao.objects.get(pk=self.dados.obrigacao.pk)
+        # Todas as ações finalizadas não marcam a obrigação como cumprida
+        self.assertEqual((obrigacao.status, obrigacao.cumprida), ('pendente', False))
+        self.assertEqual(Acao.objects.get(pk=self.dados.acao.pk).status, 'finalizado')
+
+        # Tarefa reaberta não reabre a ação já finalizada
+        self.b.status = 'em_andamento'
+        self.b.save()
+        self.assertEqual(Acao.objects.get(pk=self.dados.acao.pk).status, 'finalizado')
+
+
+class RecorrenciaTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura(
+            periodicidade='mensal', data_inicio=HOJE, data_fim_prevista=HOJE + timedelta(days=5)
+        )
+        self.modelo = self.dados.acao
+
+    def ocorrencias(self):
+        return list(
+            Acao.objects.filter(acao_origem=self.modelo)
+            .order_by('periodo').values_list('periodo', 'data_inicio', 'data_fim_prevista')
+        )
+
+    def test_somar_meses_no_fim_do_mes(self):
+        self.assertEqual(somar_meses(date(2025, 1, 31), 1), date(2025, 2, 28))
+        self.assertEqual(somar_meses(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(somar_meses(date(2025, 8, 31), 6), date(2026, 2, 28))
+        self.assertEqual(somar_meses(date(2025, 12, 15), 1), date(2026, 1, 15))
+        self.assertEqual(somar_meses(date(2025, 3, 10), 12), date(2026, 3, 10))
+
+    def test_dia_31_nao_escorrega_entre_ocorrencias(self):
+        Acao.objects.filter(pk=self.modelo.pk).update(data_inicio=date(2025, 1, 31), data_fim_prevista=date(2025, 1, 31))
+        modelo = Acao.objects.select_related('obrigacao__instrumento').get(pk=self.modelo.pk)
+        previstas = ocorrencias_previstas(modelo, date(2025, 1, 31), date(2025, 4, 30))
+        self.assertEqual([inicio for _, inicio, _ in previstas], [date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)])
+
+    def test_horizonte_e_reexecucao(self):
+        resultado = materializar_recorrencias(hoje=HOJE, horizonte_dias=90, copiar_tarefas=False)
+        self.assertEqual(resultado, {'acoes': 2, 'tarefas': 0})
+        self.assertEqual(self.ocorrencias(), [
+            ('2025-04', date(2025, 4, 10), date(2025, 4, 15)),
+            ('2025-05', date(2025, 5, 10), date(2025, 5, 15)),
+        ])
+
+        self.assertEqual(materializar_recorrencias(hoje=HOJE, horizonte_dias=90), {'acoes': 0, 'tarefas': 0})
+        # O horizonte anda com os dias (limite em 09/07)
+        materializar_recorrencias(hoje=HOJE + timedelta(days=31), horizonte_dias=90, copiar_tarefas=False)
+        self.assertEqual([periodo for periodo, _, _ in self.ocorrencias()], ['2025-04', '2025-05', '2025-06'])
+
+    def test_periodos_encerrados_nao_sao_preenchidos(self):
+        Acao.objects.filter(pk=self.modelo.pk).update(data_inicio=date(2024, 11, 10), data_fim_prevista=date(2024, 11, 15))
+        # Fevereiro terminou antes de hoje; março ainda está em curso
+        materializar_recorrencias(hoje=HOJE, horizonte_dias=31, copiar_tarefas=False)
+        self.assertEqual([periodo for periodo, _, _ in self.ocorrencias()], ['2025-03', '2025-04'])
+
+    def test_fim_da_vigencia(self):
+        Instrumento.objects.filter(pk=self.dados.instrumento.pk).update(data_fim=date(2025, 4, 30))
+        materializar_recorrencias(hoje=HOJE, horizonte_dias=365, copiar_tarefas=False)
+        self.assertEqual([periodo for periodo, _, _ in self.ocorrencias()], ['2025-04'])
+
+    def test_copia_tarefas_com_dependencias_e_checklist(self):
+        outro = get_user_model().objects.create_user('executor', password='x', perfil=4)
+        primeira = criar_tarefa(self.modelo, 'Coletar', HOJE, HOJE + timedelta(days=1))
+        segunda = criar_tarefa(self.modelo, 'Enviar', HOJE + timedelta(days=2), HOJE + timedelta(days=5))
+        segunda.tarefas_predecessoras.add(primeira)
+        segunda.executores.add(outro)
+        ChecklistItem.objects.create(tarefa=primeira, nome='Planilha')
+
+        resultado = materializar_recorrencias(hoje=HOJE, horizonte_dias=40, copiar_tarefas=True)
+        self.assertEqual(resultado, {'acoes': 1, 'tarefas': 2})
+
+        ocorrencia = Acao.objects.get(acao_origem=self.modelo)
+        copias = {tarefa.nome: tarefa for tarefa in Tarefa.objects.filter(acao=ocorrencia)}
+        self.assertEqual(copias['Enviar'].data_inicio, date(2025, 4, 12))
+        # Predecessoras, executores e checklist apontam para as cópias
+        self.assertEqual(list(copias['Enviar'].tarefas_predecessoras.all()), [copias['Coletar']])
+        self.assertEqual(list(copias['Enviar'].executores.all()), [outro])
+        self.assertEqual(list(copias['Coletar'].checklist_itens.values_list('nome', flat=True)), ['Planilha'])
+        # O modelo segue intacto
+        self.assertEqual(list(segunda.tarefas_predecessoras.all()), [primeira])
+
+    def test_ocorrencias_criadas_por_outra_execucao_no_meio_do_caminho(self):
+        criar_tarefa(self.modelo, 'Coletar', HOJE, HOJE + timedelta(days=1))
+        concorrente = {}
+
+        def previstas(modelo, hoje, limite):
+            # A outra execução grava depois desta ter lido as existentes
+            if not concorrente:
+                concorrente['rodando'] = True
+                concorrente['resultado'] = materializar_recorrencias(
+                    hoje=HOJE, horizonte_dias=40, copiar_tarefas=True
+                )
+            return ocorrencias_previstas(modelo, hoje, limite)
+
+        with mock.patch('acoes.recorrencia.ocorrencias_previstas', side_effect=previstas):
+            resultado = materializar_recorrencias(hoje=HOJE, horizonte_dias=40, copiar_tarefas=True)
+
+        self.assertEqual(concorrente['resultado'], {'acoes': 1, 'tarefas': 1})
+        self.assertEqual(resultado, {'acoes': 0, 'tarefas': 0})
+        self.assertEqual(Tarefa.objects.filter(acao__acao_origem=self.modelo).count(), 1)
+
+    def test_comando_respeita_a_trava_da_tarefa_agendada(self):
+        saida = StringIO()
+        with trava('acoes:recorrencias', 60):
+            call_command('materializar_recorrencias', stdout=saida)
+        self.assertIn('Outra execução', saida.getvalue())
+        self.assertEqual(self.ocorrencias(), [])
+
+        call_command('materializar_recorrencias', stdout=StringIO())
+        self.assertNotEqual(self.ocorrencias(), [])
+
+
+class FormularioTarefaTests(TestCase):
+    """Selects das relações renderizam só as opções escolhidas"""
+
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.admin = get_user_model().objects.create_user('admin', password='x', perfil=0)
+        self.client.force_login(self.admin)
+        self.anterior = criar_tarefa(self.dados.acao, 'Anterior', HOJE, HOJE)
+        self.tarefa = criar_tarefa(self.dados.acao, 'Editada', HOJE, HOJE + timedelta(days=2))
+        self.tarefa.tarefas_predecessoras.add(self.anterior)
+
+    def editar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(reverse('tarefa_edit', args=[self.tarefa.pk]))
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, len(sem_savepoints(consultas))
+
+    def test_renderiza_so_as_escolhidas(self):
+        criar_tarefa(self.dados.acao, 'Fora do select', HOJE, HOJE)
+        resposta, _ = self.editar()
+        html = resposta.content.decode()
+
+        self.assertIn(f'data-autocomplete="{reverse("autocomplete", args=["tarefas"])}"', html)
+        self.assertIn(f'<option value="{self.anterior.pk}" selected>Anterior', html)
+        self.assertNotIn('Fora do select', html)
 
-# Create your tests here.
+    def test_consultas_nao_crescem_com_tarefas_e_usuarios(self):
+        _, poucas = self.editar()
+        for indice in range(10):
+            criar_tarefa(self.dados.acao, f'Outra {indice}', HOJE, HOJE)
+            get_user_model().objects.create_user(f'extra{indice}', password='x', perfil=4)
+        self.assertEqual(self.editar()[1], poucas)
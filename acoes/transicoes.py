@@ -0,0 +1,105 @@
+"""
+Transições de status de tarefas em lote, com controle de versão
+
+Cada movimento é (id, novo_status, versao_esperada). Todos são aplicados
+por um único UPDATE condicional:
+
+    UPDATE acoes_tarefa SET status = CASE id WHEN ... END, versao = versao + 1
+    WHERE (id = 1 AND versao = 3) OR (id = 2 AND versao = 7) ...
+
+Tarefas alteradas por outra pessoa desde a leitura (versão diferente) não
+são tocadas e voltam como conflito, com o status e a versão atuais. Os
+rollups de Acao/Obrigacao/Instrumento (acoes/rollups.py) e o sinal tarefas_alteradas
+(alertas, dashboards) rodam uma vez por lote, não uma vez por tarefa.
+
+Uso:
+    from acoes.transicoes import aplicar_transicoes
+    aplicar_transicoes([(10, 'finalizado', 4), (11, 'em_andamento', 1)])
+    # {'aplicadas': [...], 'conflitos': [...], 'nao_encontradas': [...]}
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Tarefa
+from .rollups import recalcular_hierarquia
+from .signals import enviar_tarefas_alteradas
+
+LIMITE_LOTE = 500
+
+
+def normalizar_movimentos(movimentos):
+    """Valida e remove repetições (vale o último movimento de cada tarefa)"""
+    status_validos = dict(Tarefa.STATUS_CHOICES)
+    por_id = {}
+    for tarefa_id, status, versao in movimentos:
+        if status not in status_validos:
+            raise ValueError(f'Status inválido: {status}')
+        por_id[int(tarefa_id)] = (status, int(versao))
+
+    if len(por_id) > LIMITE_LOTE:
+        raise ValueError(f'No máximo {LIMITE_LOTE} tarefas por lote')
+    return por_id
+
+
+def aplicar_transicoes(movimentos):
+    """Aplica os movimentos [(id, status, versao_esperada)] de uma só vez"""
+    por_id = normalizar_movimentos(movimentos)
+    resultado = {'aplicadas': [], 'conflitos': [], 'nao_encontradas': []}
+    if not por_id:
+        return resultado
+
+    agora = timezone.now()
+    hoje = timezone.localdate()
+    finalizadas = [pk for pk, (status, _) in por_id.items() if status == 'finalizado']
+
+    with transaction.atomic():
+        Tarefa.objects.filter(
+            reduce(or_, (Q(pk=pk, versao=versao) for pk, (_, versao) in por_id.items()))
+        ).update(
+            status=Case(
+                *(When(pk=pk, then=Value(status)) for pk, (status, _) in por_id.items()),
+                default=F('status'),
+            ),
+            data_conclusao=Case(
+                When(pk__in=finalizadas, data_conclusao__isnull=True, then=Value(hoje)),
+                default=F('data_conclusao'),
+            ),
+            versao=F('versao') + 1,
+            data_atualizacao=agora,
+        )
+
+        # Dentro da transação a linha já reflete o UPDATE (e segue travada)
+        atuais = {
+            pk: (status, versao, acao_id)
+            for pk, status, versao, acao_id in Tarefa.objects.filter(pk__in=por_id)
+            .values_list('pk', 'status', 'versao', 'acao_id')
+        }
+
+        acao_ids = set()
+        for pk, (status, versao) in por_id.items():
+            if pk not in atuais:
+                resultado['nao_encontradas'].append(pk)
+                continue
+            status_atual, versao_atual, acao_id = atuais[pk]
+            item = {'id': pk, 'status': status_atual, 'versao': versao_atual}
+            if versao_atual == versao + 1 and status_atual == status:
+                resultado['aplicadas'].append(item)
+                acao_ids.add(acao_id)
+            else:
+                resultado['conflitos'].append(item)
+
+        if acao_ids:
+            obrigacao_ids = recalcular_hierarquia(acao_ids, hoje=hoje)
+            enviar_tarefas_alteradas(
+                Tarefa,
+                tarefa_ids=[item['id'] for item in resultado['aplicadas']],
+                acao_ids=acao_ids,
+                obrigacao_ids=obrigacao_ids,
+            )
+
+    return resultado
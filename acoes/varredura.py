@@ -0,0 +1,113 @@
+"""
+Varredura de prazos vencidos
+
+Aplica, sem depender de alguém salvar o registro, as transições de prazo
+de verificar_status_automatico:
+
+- Tarefa: a_iniciar/em_andamento com data_fim < hoje -> atrasado
+- Acao: a_iniciar/em_andamento com data_fim_prevista < hoje -> atrasado
+- Obrigacao: pendente/em_andamento, não cumprida, com data_vencimento < hoje -> vencida
+- Instrumento: vigente com data_fim < hoje -> encerrado
+
+Tarefas em validação não viram atrasadas (o trabalho já foi entregue),
+nem instrumentos suspensos ou em renovação são encerrados.
+
+Cada nível é um UPDATE ... WHERE prazo < hoje AND status IN (...), em
+lotes de ids (ACOES_VARREDURA_LOTE) com transações curtas, apoiado em
+índices parciais sobre os registros em aberto. Sem nada a mudar, custa
+uma consulta por nível, então pode rodar a cada poucos minutos.
+As tarefas e obrigações alteradas seguem pelo sinal tarefas_alteradas
+(alertas, dashboards, calendário). Cada execução é registrada em
+VarreduraStatus.
+
+Uso:
+    from acoes.varredura import varrer_status
+    varrer_status()  # {'tarefas': 12, 'acoes': 3, 'obrigacoes': 0, 'instrumentos': 1}
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from instrumentos.models import Instrumento, Obrigacao
+
+from .models import Acao, Tarefa, VarreduraStatus
+from .signals import enviar_tarefas_alteradas
+
+
+def niveis(hoje):
+    """(nome, queryset dos vencidos, campos lidos, campos do UPDATE)"""
+    agora = timezone.now()
+    return (
+        (
+            'tarefas',
+            Tarefa.objects.filter(status__in=['a_iniciar', 'em_andamento'], data_fim__lt=hoje),
+            ('pk', 'acao_id'),
+            {'status': 'atrasado', 'versao': F('versao') + 1, 'data_atualizacao': agora},
+        ),
+        (
+            'acoes',
+            Acao.objects.filter(status__in=['a_iniciar', 'em_andamento'], data_fim_prevista__lt=hoje),
+            ('pk',),
+            {'status': 'atrasado', 'data_atualizacao': agora},
+        ),
+        (
+            'obrigacoes',
+            Obrigacao.objects.filter(
+                status__in=['pendente', 'em_andamento'], cumprida=False, data_vencimento__lt=hoje
+            ),
+            ('pk',),
+            {'status': 'vencida', 'data_atualizacao': agora},
+        ),
+        (
+            'instrumentos',
+            Instrumento.objects.filter(status='vigente', data_fim__lt=hoje),
+            ('pk',),
+            {'status': 'encerrado', 'data_atualizacao': agora},
+        ),
+    )
+
+
+def varrer_status(hoje=None, lote=None):
+    """Aplica as transições de prazo; retorna a contagem por nível"""
+    hoje = hoje or timezone.localdate()
+    lote = lote or settings.ACOES_VARREDURA_LOTE
+    inicio = time.perf_counter()
+
+    contagens = {}
+    alterados = {}
+    for nome, vencidos, lidos, campos in niveis(hoje):
+        contagens[nome] = 0
+        alterados[nome] = []
+        while True:
+            with transaction.atomic():
+                linhas = list(vencidos.order_by('pk').values_list(*lidos)[:lote])
+                if not linhas:
+                    break
+                # O filtro é repetido no UPDATE: quem mudou entre a leitura e
+                # a gravação não é sobrescrito
+                contagens[nome] += vencidos.filter(pk__in=[linha[0] for linha in linhas]).update(**campos)
+            alterados[nome].extend(linhas)
+            if len(linhas) < lote:
+                break
+
+    enviar_tarefas_alteradas(
+        Tarefa,
+        tarefa_ids=[pk for pk, _ in alterados['tarefas']],
+        acao_ids={acao_id for _, acao_id in alterados['tarefas']},
+        obrigacao_ids=[linha[0] for linha in alterados['obrigacoes']],
+    )
+
+    VarreduraStatus.objects.create(
+        data_referencia=hoje,
+        duracao=time.perf_counter() - inicio,
+        **contagens,
+    )
+    VarreduraStatus.objects.filter(
+        executada_em__lt=timezone.now() - timedelta(days=settings.ACOES_VARREDURA_RETENCAO_DIAS)
+    ).delete()
+    return contagens
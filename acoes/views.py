@@ -3,10 +3,17 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
 from .models import Tarefa, Acao, ChecklistItem
 from django.urls import reverse_lazy
-from .forms import AcaoForm, ChecklistItemFormSet
+from .forms import AcaoForm, ChecklistItemFormSet, WIDGETS_RELACOES_TAREFA
+from .calendario import CORES_STATUS, chave_janela, gerar_json, ler_data
+from .cronograma import CicloDependencias, carregar_grafo, gantt
+from .reprogramacao import aplicar_reprogramacao, calcular_reprogramacao
+from core.autocomplete import selecionados
+from dashboards.escopos import escopo_do_usuario
 from instrumentos.models import Instrumento, Obrigacao
-from django.http import JsonResponse
-from django.forms import inlineformset_factory
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.contrib.auth.decorators import login_required
+from django.forms import inlineformset_factory, modelform_factory
 
 # Formset para checklist
 ChecklistFormSet = inlineformset_factory(
@@ -29,7 +36,8 @@ class TarefaListView(ModernListView):
         instrumento_id = self.request.GET.get('instrumento')
         obrigacao_id = self.request.GET.get('obrigacao')
 
-        queryset = Tarefa.objects.all()
+        # Ação, responsável e checklist de toda a página em consultas fixas
+        queryset = Tarefa.objects.select_related('acao', 'responsavel').prefetch_related('checklist_itens')
 
         if instrumento_id:
             queryset = queryset.filter(acao__instrumento_id=instrumento_id)
@@ -43,11 +51,13 @@ class TarefaListView(ModernListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         instrumento_id = self.request.GET.get('instrumento')
+        obrigacao_id = self.request.GET.get('obrigacao')
 
-        context['instrumentos'] = Instrumento.objects.all()
-        context['obrigacoes'] = Obrigacao.objects.filter(instrumento_id=instrumento_id) if instrumento_id else Obrigacao.objects.all()
+        # Só as opções escolhidas; as demais vêm do autocomplete, por página
+        context['instrumentos'] = selecionados('instrumentos', self.request.user, [instrumento_id])
+        context['obrigacoes'] = selecionados('obrigacoes', self.request.user, [obrigacao_id])
         context['instrumento_selecionado'] = instrumento_id
-        context['obrigacao_selecionada'] = self.request.GET.get('obrigacao')
+        context['obrigacao_selecionada'] = obrigacao_id
 
         return context
 
@@ -62,7 +72,14 @@ def get_obrigacoes_por_instrumento(request):
     return JsonResponse({'obrigacoes': list(obrigacoes)})
 
 
-class TarefaCreateView(ModernCreateView):
+class TarefaFormMixin:
+    """Formulário dos campos da view, com as relações em selects assíncronos"""
+
+    def get_form_class(self):
+        return modelform_factory(Tarefa, fields=self.fields, widgets=WIDGETS_RELACOES_TAREFA)
+
+
+class TarefaCreateView(TarefaFormMixin, ModernCreateView):
     model = Tarefa
     fields = '__all__'
     success_url = reverse_lazy('tarefa_list')
@@ -97,7 +114,7 @@ class TarefaCreateView(ModernCreateView):
             return self.render_to_response(context)
 
 
-class TarefaUpdateView(ModernUpdateView):
+class TarefaUpdateView(TarefaFormMixin, ModernUpdateView):
     model = Tarefa
     fields = ['nome', 'descricao', 'acao', 'responsavel', 'executores', 'status',
               'percentual_cumprido', 'data_inicio', 'data_fim', 'data_conclusao',
@@ -174,35 +191,116 @@ class TarefaCalendarioView(TemplateView):
     template_name = 'acoes/tarefas_calendario.html'
 
 
+@login_required
 def tarefas_json(request):
-    """Retorna as tarefas em formato JSON para o FullCalendar"""
+    """
+    Retorna as tarefas em formato JSON para o FullCalendar
+    
+    Apenas a janela pedida (?start=&end=), em streaming e com cache por
+    janela (ver acoes/calendario.py).
+    """
+    inicio = ler_data(request.GET.get('start'))
+    fim = ler_data(request.GET.get('end'))
+    if not inicio or not fim or fim <= inicio:
+        return JsonResponse({'error': 'Informe start e end (AAAA-MM-DD)'}, status=400)
+    if (fim - inicio).days > 400:
+        return JsonResponse({'error': 'Janela máxima de 400 dias'}, status=400)
+    
+    chave = chave_janela(inicio, fim)
+    conteudo = cache.get(chave)
+    if conteudo is not None:
+        return HttpResponse(conteudo, content_type='application/json')
+    
+    return StreamingHttpResponse(gerar_json(inicio, fim, chave), content_type='application/json')
+
+
+@login_required
+def tarefas_gantt_json(request):
+    """
+    Cronograma (Gantt) de uma ação ou instrumento, com o caminho crítico
+    
+    GET /tarefas/gantt/json/?acao=<id> ou ?instrumento=<id>
+    
+    Apenas tarefas do escopo do usuário (dashboards/escopos.py). Ver
+    acoes/cronograma.py para o cálculo.
+    """
+    try:
+        acao_id = int(request.GET['acao']) if request.GET.get('acao') else None
+        instrumento_id = int(request.GET['instrumento']) if request.GET.get('instrumento') else None
+    except ValueError:
+        return JsonResponse({'error': 'Parâmetros inválidos'}, status=400)
+    if acao_id is None and instrumento_id is None:
+        return JsonResponse({'error': 'Informe acao ou instrumento'}, status=400)
+    
+    escopo = escopo_do_usuario(request.user)
+    nos, arestas = carregar_grafo(acao_id, instrumento_id, diretorias=escopo['diretorias'])
+    
+    try:
+        return JsonResponse(gantt(nos, arestas))
+    except CicloDependencias as e:
+        return JsonResponse({'error': str(e), 'ciclo': e.tarefa_ids}, status=409)
+
+
+@login_required
+def tarefa_reprogramar(request, pk):
+    """
+    Nova data de uma tarefa, propagada às sucessoras (acoes/reprogramacao.py)
+    
+    GET  /tarefas/<pk>/reprogramar/?data_fim=AAAA-MM-DD[&data_inicio=...]
+         prévia: tarefas afetadas, com as datas atuais e as novas
+    POST /tarefas/<pk>/reprogramar/ com JSON {"data_fim": ..., "data_inicio": ...}
+         grava todas de uma vez
+    """
+    import json
+    
+    if request.method == 'POST':
+        try:
+            dados = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    else:
+        dados = request.GET
+    
+    data_fim = ler_data(dados.get('data_fim'))
+    data_inicio = ler_data(dados.get('data_inicio')) if dados.get('data_inicio') else None
+    if not data_fim or (dados.get('data_inicio') and not data_inicio):
+        return JsonResponse({'success': False, 'error': 'Datas inválidas (AAAA-MM-DD)'}, status=400)
+    
+    diretorias = escopo_do_usuario(request.user)['diretorias']
     tarefas = Tarefa.objects.all()
-    eventos = []
-
-    for t in tarefas:
-        eventos.append({
-            "id": t.id,
-            "title": t.nome,
-            "start": t.data_inicio.isoformat(),
-            "end": t.data_fim.isoformat(),
-            "color": cor_status(t.status),
-            "extendedProps": {
-                "responsavel": t.responsavel.get_full_name() or t.responsavel.username,
-                "acao": t.acao.nome,
-                "status": t.get_status_display(),
+    if diretorias is not None:
+        tarefas = tarefas.filter(acao__obrigacao__instrumento__diretoria_id__in=diretorias)
+    tarefa = get_object_or_404(tarefas.only('data_inicio'), pk=pk)
+    if data_fim < (data_inicio or tarefa.data_inicio):
+        return JsonResponse({'success': False, 'error': 'A data de fim é anterior ao início'}, status=400)
+    
+    reprogramar = aplicar_reprogramacao if request.method == 'POST' else calcular_reprogramacao
+    try:
+        afetadas = reprogramar(pk, data_fim, data_inicio)
+    except CicloDependencias as e:
+        return JsonResponse({'success': False, 'error': str(e), 'ciclo': e.tarefa_ids}, status=409)
+    
+    return JsonResponse({
+        'success': True,
+        'aplicada': request.method == 'POST',
+        'tarefas': [
+            {
+                'id': item['id'],
+                'nome': item['nome'],
+                'data_inicio': item['data_inicio'].isoformat(),
+                'data_fim': item['data_fim'].isoformat(),
+                'nova_data_inicio': item['nova_data_inicio'].isoformat(),
+                'nova_data_fim': item['nova_data_fim'].isoformat(),
+                'status': item['status'],
+                'novo_status': item['novo_status'],
+                'dias': item['dias'],
             }
-        })
-    return JsonResponse(eventos, safe=False)
+            for item in afetadas
+        ],
+    })
 
 
 def cor_status(status):
     """Define a cor com base no status"""
-    cores = {
-        'a_iniciar': '#f57c00',       # laranja
-        'em_andamento': '#1976d2',    # azul
-        'atrasado': '#c62828',        # vermelho
-        'em_validacao': '#6a1b9a',    # roxo
-        'finalizado': '#2e7d32',      # verde
-    }
-    return cores.get(status, '#607d8b')
+    return CORES_STATUS.get(status, '#607d8b')
 
@@ -1,3 +1,5 @@
+import logging
+
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -5,8 +7,13 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Count, Q
 
+from core.paginacao import decodificar_cursor, fatiar_pagina, ler_limite
+
 from .models import Tarefa
 from .forms import TarefaForm, ChecklistItemFormSet
+from .transicoes import aplicar_transicoes
+
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -15,102 +22,172 @@ def tarefa_kanban_view(request):
     View para visualização Kanban das tarefas.
     
     Configuração: Mostra TODAS as tarefas do sistema (visão geral)
-    Para filtrar por usuário, descomente a linha comentada abaixo.
+    
+    A página traz apenas o total de cada coluna (uma consulta); os cards
+    são carregados por coluna, sob demanda, em tarefa_kanban_coluna.
     """
-    # ✅ OPÇÃO 1: Todas as tarefas do sistema
-    tarefas = Tarefa.objects.select_related(
-        'acao',
-        'responsavel'
-    ).prefetch_related(
-        'executores',
-        'checklist_itens'
-    ).order_by('-data_cadastro')
-    
-    # ✅ OPÇÃO 2: Apenas tarefas do usuário (descomente se quiser)
-    # tarefas = Tarefa.objects.filter(
-    #     Q(responsavel=request.user) | Q(executores=request.user)
-    # ).select_related(
-    #     'acao',
-    #     'responsavel'
-    # ).prefetch_related(
-    #     'executores',
-    #     'checklist_itens'
-    # ).distinct().order_by('-data_cadastro')
-    
-    # Preparar dados para JSON
-    tarefas_json = []
-    for tarefa in tarefas:
-        # Contar itens do checklist
-        checklist_total = tarefa.checklist_itens.count()
-        checklist_concluidos = tarefa.checklist_itens.filter(concluido=True).count()
-        
-        tarefas_json.append({
-            'id': tarefa.id,
-            'nome': tarefa.nome,
-            'status': tarefa.status,
-            'responsavel': tarefa.responsavel.get_full_name() if tarefa.responsavel else '-',
-            'data_fim': tarefa.data_fim.strftime('%d/%m/%Y') if tarefa.data_fim else None,
-            'percentual_cumprido': tarefa.percentual_cumprido,
-            'acao': tarefa.acao.nome if tarefa.acao else None,
-            'checklist_total': checklist_total,
-            'checklist_concluidos': checklist_concluidos,
-        })
+    totais = Tarefa.objects.aggregate(**{
+        status: Count('id', filter=Q(status=status))
+        for status, _ in Tarefa.STATUS_CHOICES
+    })
     
     context = {
-        'tarefas_json': tarefas_json,
+        'totais': totais,
     }
     
     return render(request, 'acoes/tarefa_kanban.html', context)
 
 
+# ===== COLUNAS DO KANBAN (KEYSET) =====
+# Ordem dos cards: mais recentes primeiro, (data_cadastro, id) decrescente
+
+LIMITE_COLUNA = 50
+
+
+def serializar_card(tarefa):
+    nome_responsavel = ' '.join(
+        filter(None, [tarefa['responsavel__first_name'], tarefa['responsavel__last_name']])
+    )
+    return {
+        'id': tarefa['id'],
+        'nome': tarefa['nome'],
+        'status': tarefa['status'],
+        'versao': tarefa['versao'],
+        'responsavel': nome_responsavel or '-',
+        'data_fim': tarefa['data_fim'].isoformat() if tarefa['data_fim'] else None,
+        'percentual_cumprido': tarefa['percentual_cumprido'],
+        'acao': tarefa['acao__nome'],
+        'checklist_total': tarefa['checklist_total'],
+        'checklist_concluidos': tarefa['checklist_concluidos'],
+    }
+
+
+@login_required
+def tarefa_kanban_coluna(request, status):
+    """
+    Cards de uma coluna do Kanban, em páginas
+    
+    GET /tarefas/kanban/coluna/<status>/?antes=<proximo>&limite=<n>
+    
+    Uma consulta por página: os totais do checklist vêm de anotações
+    (Count com filtro) e não de consultas por card. Envie ?antes=<proximo>
+    da resposta anterior para buscar a página seguinte.
+    """
+    if status not in dict(Tarefa.STATUS_CHOICES):
+        return JsonResponse({'success': False, 'error': f'Status inválido: {status}'}, status=400)
+    
+    limite = ler_limite(request, padrao=LIMITE_COLUNA)
+    antes = decodificar_cursor(request.GET.get('antes'))
+    
+    tarefas = Tarefa.objects.filter(status=status)
+    if antes:
+        data, pk = antes
+        tarefas = tarefas.filter(
+            Q(data_cadastro__lt=data) | Q(data_cadastro=data, id__lt=pk)
+        )
+    
+    # Uma linha extra indica se há próxima página
+    linhas = list(
+        tarefas.order_by('-data_cadastro', '-id')
+        .values(
+            'id', 'nome', 'status', 'versao', 'data_fim', 'percentual_cumprido', 'data_cadastro',
+            'acao__nome', 'responsavel__first_name', 'responsavel__last_name',
+        )
+        .annotate(
+            checklist_total=Count('checklist_itens'),
+            checklist_concluidos=Count('checklist_itens', filter=Q(checklist_itens__concluido=True)),
+        )[:limite + 1]
+    )
+    pagina, proximo = fatiar_pagina(linhas, limite, lambda tarefa: (tarefa['data_cadastro'], tarefa['id']))
+    
+    return JsonResponse({
+        'status': status,
+        'proximo': proximo,
+        'tarefas': [serializar_card(tarefa) for tarefa in pagina],
+    })
+
+
 @login_required
 @require_POST
 def tarefa_update_status(request, pk):
     """
     View para atualizar o status de uma tarefa via AJAX (drag & drop).
     
-    Recebe JSON com o novo status e atualiza no banco.
+    Recebe JSON {"status": ..., "versao": ...}. Sem "versao", vale a versão
+    atual (compatibilidade). Mesmo caminho de tarefa_transicoes_status.
     """
     import json
     
     try:
-        tarefa = get_object_or_404(Tarefa, pk=pk)
         data = json.loads(request.body)
-        new_status = data.get('status')
-        
-        # Validar status
-        valid_statuses = ['a_iniciar', 'em_andamento', 'atrasado', 'em_validacao', 'finalizado']
-        if new_status not in valid_statuses:
-            return JsonResponse({
-                'success': False,
-                'error': f'Status inválido: {new_status}'
-            }, status=400)
-        
-        # Atualizar status
-        old_status = tarefa.status
-        tarefa.status = new_status
-        tarefa.save()
-        
-        # Log para debug
-        print(f"======================================================")
-        print(f"Tarefa #{tarefa.id} '{tarefa.nome}' mudou de '{old_status}' para '{new_status}'")
-        print(f"======================================================")
-        
-        return JsonResponse({
-            'success': True,
-            'message': f'Status atualizado de {old_status} para {new_status}'
-        })
-        
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
             'error': 'JSON inválido'
         }, status=400)
-    except Exception as e:
+    
+    tarefa = get_object_or_404(Tarefa.objects.only('status', 'versao'), pk=pk)
+    old_status = tarefa.status
+    new_status = data.get('status')
+    
+    try:
+        resultado = aplicar_transicoes([(pk, new_status, data.get('versao', tarefa.versao))])
+    except (TypeError, ValueError) as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
-        }, status=500)
+        }, status=400)
+    
+    if resultado['conflitos']:
+        return JsonResponse({
+            'success': False,
+            'error': 'A tarefa foi alterada por outra pessoa. Atualize a página.',
+            'tarefa': resultado['conflitos'][0],
+        }, status=409)
+    
+    logger.info("Tarefa #%s mudou de '%s' para '%s'", pk, old_status, new_status)
+    
+    return JsonResponse({
+        'success': True,
+        'message': f'Status atualizado de {old_status} para {new_status}',
+        'tarefa': resultado['aplicadas'][0],
+    })
+
+
+@login_required
+@require_POST
+def tarefa_transicoes_status(request):
+    """
+    Transições de status em lote (acoes/transicoes.py)
+    
+    POST JSON {"movimentos": [{"id": 1, "status": "finalizado", "versao": 3}, ...]}
+    
+    Responde com as transições aplicadas (nova versão) e os conflitos
+    (status e versão atuais); conflitos não impedem as demais.
+    """
+    import json
+    
+    try:
+        movimentos = [
+            (movimento['id'], movimento['status'], movimento['versao'])
+            for movimento in json.loads(request.body)['movimentos']
+        ]
+        resultado = aplicar_transicoes(movimentos)
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Requisição inválida: {e}'
+        }, status=400)
+    
+    logger.info(
+        'Transições de status: %d aplicadas, %d conflitos',
+        len(resultado['aplicadas']), len(resultado['conflitos'])
+    )
+    
+    return JsonResponse({
+        'success': not resultado['conflitos'] and not resultado['nao_encontradas'],
+        **resultado,
+    })
 
 
 @login_required
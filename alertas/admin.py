@@ -1,7 +1,7 @@
 # ===== ADMIN PARA GERENCIAR NOTIFICAÇÕES =====
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Notificacao, PreferenciaNotificacao
+from .models import Notificacao, NotificacaoArquivada, NotificacaoEvento, PreferenciaNotificacao
 
 
 @admin.register(Notificacao)
@@ -17,21 +17,34 @@ class NotificacaoAdmin(admin.ModelAdmin):
     ]
     
     list_filter = [
-        'tipo',
-        'prioridade',
+        'evento__tipo',
+        'evento__prioridade',
         'lida',
         'data_criacao',
     ]
     
+    list_select_related = ['usuario', 'evento']
+    
     search_fields = [
         'usuario__username',
         'usuario__first_name',
         'usuario__last_name',
-        'titulo',
-        'mensagem',
+        'evento__titulo',
+        'evento__mensagem',
     ]
     
+    # Conteúdo vem do evento (compartilhado entre destinatários)
+    raw_id_fields = ['evento']
+    
     readonly_fields = [
+        'tipo',
+        'prioridade',
+        'titulo',
+        'mensagem',
+        'link',
+        'tarefa_id',
+        'obrigacao_id',
+        'instrumento_id',
         'data_criacao',
         'data_leitura',
     ]
@@ -41,7 +54,7 @@ class NotificacaoAdmin(admin.ModelAdmin):
             'fields': ('usuario',)
         }),
         ('Conteúdo', {
-            'fields': ('tipo', 'prioridade', 'titulo', 'mensagem', 'link')
+            'fields': ('evento', 'tipo', 'prioridade', 'titulo', 'mensagem', 'link')
         }),
         ('Entidades Relacionadas', {
             'fields': ('tarefa_id', 'obrigacao_id', 'instrumento_id'),
@@ -169,3 +182,25 @@ class PreferenciaNotificacaoAdmin(admin.ModelAdmin):
         }),
     )
 
+
+
+@admin.register(NotificacaoEvento)
+class NotificacaoEventoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'titulo', 'prioridade', 'data_criacao']
+    list_filter = ['tipo', 'prioridade', 'data_criacao']
+    search_fields = ['titulo', 'mensagem']
+
+
+@admin.register(NotificacaoArquivada)
+class NotificacaoArquivadaAdmin(admin.ModelAdmin):
+    """Consulta do arquivo da retenção (somente leitura)"""
+    
+    list_display = ['id', 'usuario_id', 'tipo', 'titulo', 'lida', 'data_criacao', 'data_arquivamento']
+    list_filter = ['tipo', 'lida', 'data_arquivamento']
+    search_fields = ['titulo', 'mensagem']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
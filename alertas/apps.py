@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
 
 
 class AlertasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'alertas'
+
+    def ready(self):
+        # Registra a geração de notificações por eventos
+        from . import signals  # noqa: F401
+
+
+@checks.register()
+def verificar_sse(app_configs, **kwargs):
+    """SSE sem pub/sub compartilhado não recebe eventos de outros processos"""
+    if settings.ALERTAS_SSE_ATIVO and not settings.ALERTAS_PUBSUB_URL:
+        return [checks.Warning(
+            'ALERTAS_SSE_ATIVO sem ALERTAS_PUBSUB_URL (ou REDIS_URL): o push fica desligado',
+            hint='Configure um Redis compartilhado e sirva via ASGI (config/asgi.py).',
+            id='alertas.W001',
+        )]
+    return []
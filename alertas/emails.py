@@ -0,0 +1,152 @@
+# ===== SISTEMA DE ALERTAS - RESUMOS POR E-MAIL =====
+"""
+Envio das notificações por e-mail conforme PreferenciaNotificacao
+
+Para uma frequência (imediato, diario ou semanal):
+1. uma consulta lista os usuários com notificações não lidas e ainda não
+   enviadas; outra traz, já ordenadas por usuário, as notificações de cada
+   página de usuários, lida inteira antes de qualquer marcação;
+2. os resumos são montados em memória (templates carregados uma vez);
+3. os e-mails saem por uma única conexão do EMAIL_BACKEND, reaproveitada
+   para todos os destinatários, uma mensagem por vez;
+4. Notificacao.data_envio_email é preenchida só para as mensagens que o
+   backend aceitou (a cada lote e também quando o envio falha no meio),
+   de modo que nenhuma notificação é enviada duas vezes.
+
+Só entram notificações criadas dentro do período da frequência (um dia
+para imediato/diario, sete para semanal): quem acabou de ativar o e-mail
+não recebe o histórico inteiro.
+
+Uso:
+    from alertas.emails import enviar_resumos
+    enviar_resumos('diario')   # {'emails': 12, 'notificacoes': 87}
+
+Em testes, EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+deixa as mensagens em django.core.mail.outbox.
+"""
+
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+
+PERIODOS = {
+    'imediato': timezone.timedelta(days=1),
+    'diario': timezone.timedelta(days=1),
+    'semanal': timezone.timedelta(days=7),
+}
+
+ASSUNTOS = {
+    'imediato': 'Novas notificações',
+    'diario': 'Resumo diário de notificações',
+    'semanal': 'Resumo semanal de notificações',
+}
+
+
+def notificacoes_pendentes(frequencia, agora=None):
+    """Notificações a enviar, de todos os usuários da frequência, por usuário"""
+    from .models import Notificacao
+
+    agora = agora or timezone.now()
+    return (
+        Notificacao.objects.filter(
+            data_envio_email__isnull=True,
+            lida=False,
+            data_criacao__gte=agora - PERIODOS[frequencia],
+            usuario__is_active=True,
+            usuario__preferencia_notificacao__enviar_email=True,
+            usuario__preferencia_notificacao__frequencia_email=frequencia,
+        )
+        .exclude(usuario__email='')
+        .select_related('usuario', 'evento')
+        .order_by('usuario_id', 'data_criacao', 'id')
+    )
+
+
+def montar_resumos(frequencia, agora=None, usuarios_por_consulta=500):
+    """
+    Gera (mensagem, ids das notificações) para cada usuário pendente
+
+    Cada página de usuários é lida inteira antes de gerar as mensagens:
+    marcar as enviadas (UPDATE na mesma tabela e no campo do filtro) nunca
+    acontece com uma leitura em aberto, que no SQLite não fica isolada das
+    escritas da mesma conexão.
+    """
+    texto = get_template('alertas/email_resumo.txt')
+    html = get_template('alertas/email_resumo.html')
+    limite = settings.ALERTAS_EMAIL_MAX_ITENS
+    assunto = f'AGEMS - {ASSUNTOS[frequencia]}'
+
+    pendentes = notificacoes_pendentes(frequencia, agora)
+    usuario_ids = list(
+        pendentes.order_by('usuario_id').values_list('usuario_id', flat=True).distinct()
+    )
+
+    for inicio in range(0, len(usuario_ids), usuarios_por_consulta):
+        pagina = list(pendentes.filter(usuario_id__in=usuario_ids[inicio:inicio + usuarios_por_consulta]))
+        for _, grupo in groupby(pagina, key=lambda n: n.usuario_id):
+            notificacoes = list(grupo)
+            usuario = notificacoes[0].usuario
+            contexto = {
+                'usuario': usuario,
+                'frequencia': frequencia,
+                'notificacoes': notificacoes[:limite],
+                'restantes': max(0, len(notificacoes) - limite),
+                'total': len(notificacoes),
+                'url_base': settings.ALERTAS_EMAIL_URL_BASE,
+            }
+            mensagem = EmailMultiAlternatives(
+                subject=f'{assunto} ({len(notificacoes)})',
+                body=texto.render(contexto),
+                to=[usuario.email],
+            )
+            mensagem.attach_alternative(html.render(contexto), 'text/html')
+            yield mensagem, [n.id for n in notificacoes]
+
+
+def marcar_enviadas(ids, quando):
+    from .models import Notificacao
+
+    # update() direto: não altera data_atualizacao nem invalida os alertas
+    Notificacao.objects.filter(pk__in=ids).update(data_envio_email=quando)
+
+
+def enviar_resumos(frequencia, agora=None, conexao=None, lote=100):
+    """
+    Envia os resumos da frequência por uma única conexão
+
+    Cada mensagem vai sozinha ao backend e só as notificações das aceitas
+    são marcadas como enviadas, a cada `lote` e-mails e, se o envio falhar
+    no meio, antes de propagar o erro: o que saiu não sai de novo e o que
+    não saiu fica para a próxima execução.
+    """
+    if frequencia not in PERIODOS:
+        raise ValueError(f'Frequência inválida: {frequencia}')
+
+    agora = agora or timezone.now()
+    resultado = {'emails': 0, 'notificacoes': 0}
+    enviadas = []
+
+    def marcar():
+        marcar_enviadas(enviadas, agora)
+        resultado['notificacoes'] += len(enviadas)
+        enviadas.clear()
+
+    conexao = conexao or get_connection()
+    try:
+        with conexao:
+            for mensagem, notificacao_ids in montar_resumos(frequencia, agora):
+                mensagem.connection = conexao
+                if not conexao.send_messages([mensagem]):
+                    continue
+                resultado['emails'] += 1
+                enviadas.extend(notificacao_ids)
+                if resultado['emails'] % lote == 0:
+                    marcar()
+    finally:
+        if enviadas:
+            marcar()
+
+    return resultado
@@ -0,0 +1,427 @@
+# ===== SISTEMA DE ALERTAS - GERAÇÃO EM LOTE DE NOTIFICAÇÕES =====
+"""
+Gerador de notificações baseado em conjuntos
+
+Substitui o laço "um usuário por vez" do comando gerar_notificacoes:
+em vez de uma consulta exists() por tarefa/obrigação, calcula todas as
+tuplas candidatas (usuario, tipo, tarefa/obrigacao) com poucas consultas,
+remove as que já possuem notificação não lida e insere o restante com
+bulk_create em lotes: um NotificacaoEvento por objeto/tipo e um recibo
+(Notificacao) por destinatário.
+
+Também expõe a reavaliação pontual usada pelos sinais (alertas/signals.py),
+que processa apenas as tarefas/obrigações alteradas.
+
+Uso:
+    from alertas.geracao import gerar_notificacoes
+    resultado = gerar_notificacoes()
+    resultado['total']  # notificações criadas
+
+    from alertas.geracao import reavaliar_objetos
+    reavaliar_objetos(tarefa_ids={1, 2}, obrigacao_ids={7})
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from acoes.models import Acao, Tarefa
+from instrumentos.models import Obrigacao
+from .models import Notificacao, NotificacaoEvento, PreferenciaNotificacao
+from .views import (
+    dados_notificacao_tarefa_atrasada,
+    dados_notificacao_tarefa_vencendo_hoje,
+    dados_notificacao_tarefa_a_vencer,
+    dados_notificacao_obrigacao_vencendo,
+    dados_notificacao_tarefa_nova,
+    dados_notificacao_atribuicao,
+)
+
+
+STATUS_TAREFA_ATRASADA = ['a_iniciar', 'em_andamento', 'atrasado']
+STATUS_TAREFA_VENCENDO = ['a_iniciar', 'em_andamento']
+
+TIPOS_TAREFA = ['tarefa_atrasada', 'tarefa_vencendo_hoje', 'tarefa_a_vencer']
+TIPOS_OBRIGACAO = ['obrigacao_vencendo']
+
+# Campo de preferência que habilita cada tipo
+PREFERENCIA_POR_TIPO = {
+    'tarefa_atrasada': 'notificar_tarefa_atrasada',
+    'tarefa_vencendo_hoje': 'notificar_tarefa_vencendo',
+    'tarefa_a_vencer': 'notificar_tarefa_vencendo',
+    'obrigacao_vencendo': 'notificar_obrigacao',
+    'tarefa_nova': 'notificar_tarefa_nova',
+    'atribuicao': 'notificar_tarefa_nova',
+}
+
+MONTADORES = {
+    'tarefa_atrasada': dados_notificacao_tarefa_atrasada,
+    'tarefa_vencendo_hoje': dados_notificacao_tarefa_vencendo_hoje,
+    'tarefa_a_vencer': dados_notificacao_tarefa_a_vencer,
+    'obrigacao_vencendo': dados_notificacao_obrigacao_vencendo,
+    'tarefa_nova': dados_notificacao_tarefa_nova,
+    'atribuicao': dados_notificacao_atribuicao,
+}
+
+
+def filtro_faixa(campo, faixa_usuarios):
+    """
+    Filtro ORM para uma faixa de ids de usuário [inicio, fim)
+
+    Usado pelas tarefas Celery (alertas/tasks.py) para dividir a geração
+    em partições processadas em paralelo.
+    """
+    if faixa_usuarios is None:
+        return {}
+    inicio, fim = faixa_usuarios
+    return {f'{campo}__gte': inicio, f'{campo}__lt': fim}
+
+
+def na_faixa(usuario_id, faixa_usuarios):
+    return faixa_usuarios is None or faixa_usuarios[0] <= usuario_id < faixa_usuarios[1]
+
+
+def carregar_preferencias(usuarios):
+    """
+    Retorna {usuario_id: {campo_preferencia: bool}} para os usuários informados
+
+    Usuários sem PreferenciaNotificacao ganham o registro padrão
+    (mesmo efeito do get_or_create do laço antigo), criado em lote.
+    """
+    campos = sorted(set(PREFERENCIA_POR_TIPO.values()))
+    linhas = usuarios.values_list(
+        'id',
+        'preferencia_notificacao__id',
+        *[f'preferencia_notificacao__{campo}' for campo in campos]
+    )
+
+    preferencias = {}
+    sem_preferencia = []
+    for usuario_id, pref_id, *valores in linhas:
+        if pref_id is None:
+            sem_preferencia.append(usuario_id)
+            valores = [
+                PreferenciaNotificacao._meta.get_field(campo).default
+                for campo in campos
+            ]
+        preferencias[usuario_id] = dict(zip(campos, valores))
+
+    if sem_preferencia:
+        PreferenciaNotificacao.objects.bulk_create(
+            [PreferenciaNotificacao(usuario_id=uid) for uid in sem_preferencia],
+            ignore_conflicts=True,
+        )
+
+    return preferencias
+
+
+def classificar_tarefa(tarefa, hoje):
+    """Retorna o tipo de notificação que a tarefa gera hoje (ou None)"""
+    if tarefa.data_fim < hoje:
+        if tarefa.status in STATUS_TAREFA_ATRASADA:
+            return 'tarefa_atrasada'
+        return None
+
+    if tarefa.status not in STATUS_TAREFA_VENCENDO:
+        return None
+    if tarefa.data_fim == hoje:
+        return 'tarefa_vencendo_hoje'
+    if tarefa.data_fim <= hoje + timezone.timedelta(days=7):
+        return 'tarefa_a_vencer'
+    return None
+
+
+def candidatos_tarefas(hoje, tarefas=None, faixa_usuarios=None):
+    """
+    Retorna (tarefas_por_id, {(usuario_id, tipo, tarefa_id)})
+
+    Destinatários de uma tarefa são o responsável e os executores,
+    resolvidos com uma consulta na tabela de tarefas e outra na
+    tabela intermediária de executores. Com faixa_usuarios, só são lidas
+    as tarefas com responsável ou executor na faixa: cada partição
+    percorre apenas a sua parte das tarefas.
+    """
+    proxima_semana = hoje + timezone.timedelta(days=7)
+    Executores = Tarefa.executores.through
+
+    if tarefas is None:
+        tarefas = Tarefa.objects.all()
+    tarefas = tarefas.filter(
+        data_fim__lte=proxima_semana,
+        status__in=STATUS_TAREFA_ATRASADA,
+    ).order_by().only('id', 'nome', 'status', 'data_fim', 'responsavel_id')
+    if faixa_usuarios is not None:
+        tarefas = tarefas.filter(
+            Q(**filtro_faixa('responsavel_id', faixa_usuarios))
+            | Q(Exists(Executores.objects.filter(
+                tarefa_id=OuterRef('pk'), **filtro_faixa('usuario_id', faixa_usuarios)
+            )))
+        )
+
+    tarefas_por_id = {}
+    tipo_por_tarefa = {}
+    candidatos = set()
+
+    for tarefa in tarefas.iterator(chunk_size=2000):
+        tipo = classificar_tarefa(tarefa, hoje)
+        if tipo is None:
+            continue
+        tarefas_por_id[tarefa.id] = tarefa
+        tipo_por_tarefa[tarefa.id] = tipo
+        if na_faixa(tarefa.responsavel_id, faixa_usuarios):
+            candidatos.add((tarefa.responsavel_id, tipo, tarefa.id))
+
+    if tipo_por_tarefa:
+        executores = Executores.objects.filter(
+            tarefa_id__in=tarefas.values('id'),
+            **filtro_faixa('usuario_id', faixa_usuarios)
+        ).values_list('tarefa_id', 'usuario_id')
+
+        for tarefa_id, usuario_id in executores.iterator(chunk_size=5000):
+            tipo = tipo_por_tarefa.get(tarefa_id)
+            if tipo is not None:
+                candidatos.add((usuario_id, tipo, tarefa_id))
+
+    return tarefas_por_id, candidatos
+
+
+def candidatos_obrigacoes(hoje, obrigacoes=None, faixa_usuarios=None):
+    """
+    Retorna (obrigacoes_por_id, {(usuario_id, tipo, obrigacao_id)})
+
+    Destinatários de uma obrigação são os responsáveis por suas ações. Com
+    faixa_usuarios, só são lidas as obrigações com alguma ação de
+    responsável na faixa.
+    """
+    proxima_semana = hoje + timezone.timedelta(days=7)
+
+    if obrigacoes is None:
+        obrigacoes = Obrigacao.objects.all()
+    obrigacoes = obrigacoes.filter(
+        data_vencimento__lte=proxima_semana,
+        data_vencimento__gte=hoje,
+        status='pendente',
+    ).order_by().only('id', 'titulo', 'data_vencimento', 'instrumento_id')
+    if faixa_usuarios is not None:
+        obrigacoes = obrigacoes.filter(Exists(Acao.objects.filter(
+            obrigacao_id=OuterRef('pk'), **filtro_faixa('responsavel_id', faixa_usuarios)
+        )))
+
+    obrigacoes_por_id = {o.id: o for o in obrigacoes.iterator(chunk_size=2000)}
+    candidatos = set()
+
+    if obrigacoes_por_id:
+        responsaveis = Acao.objects.filter(
+            obrigacao_id__in=obrigacoes.values('id'),
+            **filtro_faixa('responsavel_id', faixa_usuarios)
+        ).order_by().values_list('obrigacao_id', 'responsavel_id').distinct()
+
+        for obrigacao_id, usuario_id in responsaveis.iterator(chunk_size=5000):
+            if obrigacao_id in obrigacoes_por_id:
+                candidatos.add((usuario_id, 'obrigacao_vencendo', obrigacao_id))
+
+    return obrigacoes_por_id, candidatos
+
+
+def notificacoes_nao_lidas(tipos, campo_id, objeto_ids=None, faixa_usuarios=None):
+    """Conjunto {(usuario_id, tipo, objeto_id)} das notificações não lidas"""
+    existentes = Notificacao.objects.filter(
+        lida=False,
+        evento__tipo__in=tipos,
+        **{f'evento__{campo_id}__isnull': False},
+        **filtro_faixa('usuario_id', faixa_usuarios)
+    )
+    if objeto_ids is not None:
+        existentes = existentes.filter(**{f'evento__{campo_id}__in': objeto_ids})
+    existentes = existentes.order_by().values_list(
+        'usuario_id', 'evento__tipo', f'evento__{campo_id}'
+    )
+    return set(existentes.iterator(chunk_size=5000))
+
+
+def filtrar_candidatos(candidatos, preferencias, existentes):
+    """Remove usuários inativos, tipos desabilitados e notificações já existentes"""
+    return {
+        (usuario_id, tipo, objeto_id)
+        for usuario_id, tipo, objeto_id in candidatos
+        if usuario_id in preferencias
+        and preferencias[usuario_id][PREFERENCIA_POR_TIPO[tipo]]
+        and (usuario_id, tipo, objeto_id) not in existentes
+    }
+
+
+def gerar_notificacoes(hoje=None, batch_size=1000, usuarios=None, faixa_usuarios=None):
+    """
+    Gera as notificações de tarefas e obrigações em poucas consultas
+
+    Produz as mesmas notificações do laço por usuário (mesmos tipos,
+    títulos, mensagens e prioridades), sem duplicar notificações não lidas.
+
+    Args:
+        hoje: data de referência (padrão: timezone.now().date())
+        batch_size: tamanho dos lotes do bulk_create
+        usuarios: queryset opcional de usuários (padrão: todos os ativos)
+        faixa_usuarios: tupla (inicio, fim) restringindo os ids de usuário
+
+    Returns:
+        dict com o total criado e a contagem por tipo
+    """
+    hoje = hoje or timezone.now().date()
+
+    if usuarios is None:
+        usuarios = get_user_model().objects.filter(is_active=True)
+    usuarios = usuarios.filter(**filtro_faixa('id', faixa_usuarios))
+    preferencias = carregar_preferencias(usuarios)
+
+    tarefas_por_id, candidatos_t = candidatos_tarefas(hoje, faixa_usuarios=faixa_usuarios)
+    obrigacoes_por_id, candidatos_o = candidatos_obrigacoes(hoje, faixa_usuarios=faixa_usuarios)
+
+    novos_t = filtrar_candidatos(
+        candidatos_t, preferencias,
+        notificacoes_nao_lidas(TIPOS_TAREFA, 'tarefa_id', faixa_usuarios=faixa_usuarios)
+    )
+    novos_o = filtrar_candidatos(
+        candidatos_o, preferencias,
+        notificacoes_nao_lidas(TIPOS_OBRIGACAO, 'obrigacao_id', faixa_usuarios=faixa_usuarios)
+    )
+
+    # Um evento por (tipo, objeto), compartilhado por todos os destinatários
+    eventos = {}
+
+    def montar(usuario_id, tipo, objeto):
+        chave = (tipo, objeto.id)
+        if chave not in eventos:
+            eventos[chave] = NotificacaoEvento(**MONTADORES[tipo](objeto, hoje))
+        return Notificacao(
+            usuario_id=usuario_id, evento=eventos[chave]
+        ).preencher_chave_dedup()
+
+    novas = [
+        montar(usuario_id, tipo, tarefas_por_id[tarefa_id])
+        for usuario_id, tipo, tarefa_id in sorted(novos_t)
+    ] + [
+        montar(usuario_id, tipo, obrigacoes_por_id[obrigacao_id])
+        for usuario_id, tipo, obrigacao_id in sorted(novos_o)
+    ]
+
+    with transaction.atomic():
+        NotificacaoEvento.objects.bulk_create(eventos.values(), batch_size=batch_size)
+        # A restrição única das não lidas descarta o que outra execução
+        # concorrente já tiver inserido (sem erro e sem consulta prévia por linha)
+        Notificacao.objects.bulk_create(novas, batch_size=batch_size, ignore_conflicts=True)
+        novas = NotificacaoEvento.confirmar_recibos(eventos.values(), novas, batch_size)
+    # bulk_create não dispara post_save: invalida as versões em lote
+    Notificacao.invalidar_alertas((n.usuario_id for n in novas), novas=novas)
+
+    por_tipo = {}
+    for notificacao in novas:
+        por_tipo[notificacao.tipo] = por_tipo.get(notificacao.tipo, 0) + 1
+
+    return {
+        'total': len(novas),
+        'por_tipo': por_tipo,
+    }
+
+
+def publicar_por_objeto(novos, objetos_por_id, hoje):
+    """
+    Publica um evento por (tipo, objeto) para todos os seus destinatários
+
+    Usado pela reavaliação pontual, onde o volume é pequeno.
+    """
+    destinatarios = {}
+    for usuario_id, tipo, objeto_id in novos:
+        destinatarios.setdefault((tipo, objeto_id), []).append(usuario_id)
+
+    por_tipo = {}
+    for (tipo, objeto_id), usuario_ids in sorted(destinatarios.items()):
+        recibos = NotificacaoEvento.publicar(
+            usuario_ids, **MONTADORES[tipo](objetos_por_id[objeto_id], hoje)
+        )
+        if recibos:
+            por_tipo[tipo] = por_tipo.get(tipo, 0) + len(recibos)
+    return por_tipo
+
+
+def preferencias_dos_candidatos(candidatos):
+    """Preferências apenas dos usuários ativos presentes nos candidatos"""
+    usuario_ids = {usuario_id for usuario_id, _, _ in candidatos}
+    if not usuario_ids:
+        return {}
+    return carregar_preferencias(
+        get_user_model().objects.filter(is_active=True, id__in=usuario_ids)
+    )
+
+
+def reavaliar_objetos(tarefa_ids=(), obrigacao_ids=(), hoje=None):
+    """
+    Reavalia apenas as tarefas/obrigações informadas
+
+    Aplica as mesmas regras de gerar_notificacoes, restritas aos objetos
+    alterados e a seus destinatários atuais.
+
+    Returns:
+        dict com o total criado e a contagem por tipo
+    """
+    hoje = hoje or timezone.now().date()
+    tarefa_ids = set(tarefa_ids)
+    obrigacao_ids = set(obrigacao_ids)
+    por_tipo = {}
+
+    if tarefa_ids:
+        tarefas_por_id, candidatos = candidatos_tarefas(
+            hoje, Tarefa.objects.filter(id__in=tarefa_ids)
+        )
+        novos = filtrar_candidatos(
+            candidatos,
+            preferencias_dos_candidatos(candidatos),
+            notificacoes_nao_lidas(TIPOS_TAREFA, 'tarefa_id', tarefa_ids),
+        )
+        por_tipo.update(publicar_por_objeto(novos, tarefas_por_id, hoje))
+
+    if obrigacao_ids:
+        obrigacoes_por_id, candidatos = candidatos_obrigacoes(
+            hoje, Obrigacao.objects.filter(id__in=obrigacao_ids)
+        )
+        novos = filtrar_candidatos(
+            candidatos,
+            preferencias_dos_candidatos(candidatos),
+            notificacoes_nao_lidas(TIPOS_OBRIGACAO, 'obrigacao_id', obrigacao_ids),
+        )
+        por_tipo.update(publicar_por_objeto(novos, obrigacoes_por_id, hoje))
+
+    return {
+        'total': sum(por_tipo.values()),
+        'por_tipo': por_tipo,
+    }
+
+
+def notificar_atribuicoes(atribuicoes):
+    """
+    Dispara 'tarefa_nova' / 'atribuicao' para {(usuario_id, tipo, tarefa_id)}
+
+    Respeita PreferenciaNotificacao.notificar_tarefa_nova e não repete
+    uma notificação ainda não lida para a mesma tarefa.
+    """
+    if not atribuicoes:
+        return {'total': 0, 'por_tipo': {}}
+
+    tarefa_ids = {tarefa_id for _, _, tarefa_id in atribuicoes}
+    tarefas_por_id = Tarefa.objects.only('id', 'nome').in_bulk(tarefa_ids)
+    candidatos = {
+        (usuario_id, tipo, tarefa_id)
+        for usuario_id, tipo, tarefa_id in atribuicoes
+        if tarefa_id in tarefas_por_id
+    }
+    novos = filtrar_candidatos(
+        candidatos,
+        preferencias_dos_candidatos(candidatos),
+        notificacoes_nao_lidas(['tarefa_nova', 'atribuicao'], 'tarefa_id', tarefa_ids),
+    )
+    por_tipo = publicar_por_objeto(novos, tarefas_por_id, timezone.now().date())
+
+    return {
+        'total': sum(por_tipo.values()),
+        'por_tipo': por_tipo,
+    }
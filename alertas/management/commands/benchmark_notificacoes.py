@@ -0,0 +1,289 @@
+# ===== BENCHMARK DA GERAÇÃO DE NOTIFICAÇÕES =====
+"""
+Mede o gerador em lote (alertas/geracao.py) sobre uma massa sintética
+
+Uso:
+    python manage.py benchmark_notificacoes
+    python manage.py benchmark_notificacoes --usuarios 10000 --tarefas 500000
+    python manage.py benchmark_notificacoes --usuarios 300 --tarefas 20000 --comparar-legado
+
+Todos os dados são criados dentro de uma transação que é desfeita ao
+final, portanto o banco não é alterado. Com --comparar-legado o laço
+antigo (um usuário por vez) também é executado e o resultado dos dois
+é comparado notificação a notificação.
+"""
+
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from acoes.models import Acao, Tarefa
+from core.models import Diretoria, TipoAcao, TipoInstrumento, TipoObrigacao
+from instrumentos.models import Instrumento, Obrigacao
+from alertas.models import Notificacao, NotificacaoEvento, PreferenciaNotificacao
+from alertas.geracao import gerar_notificacoes
+from alertas.views import (
+    criar_notificacao_tarefa_atrasada,
+    criar_notificacao_tarefa_vencendo_hoje,
+    criar_notificacao_tarefa_a_vencer,
+    criar_notificacao_obrigacao_vencendo,
+)
+
+CAMPOS_COMPARACAO = (
+    'usuario_id', 'evento__tipo', 'evento__titulo', 'evento__mensagem', 'evento__link',
+    'evento__tarefa_id', 'evento__obrigacao_id', 'evento__prioridade',
+)
+
+
+class Rollback(Exception):
+    """Usada para desfazer a massa sintética ao final do benchmark"""
+
+
+class ContadorConsultas:
+    """execute_wrapper que conta as consultas executadas na conexão"""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def medir(funcao, *args, **kwargs):
+    """Executa a função e retorna (resultado, consultas, segundos)"""
+    contador = ContadorConsultas()
+    inicio = time.perf_counter()
+    with connection.execute_wrapper(contador):
+        resultado = funcao(*args, **kwargs)
+    return resultado, contador.total, time.perf_counter() - inicio
+
+
+def gerar_legado(hoje):
+    """Laço original do comando gerar_notificacoes (referência para comparação)"""
+    amanha = hoje + timezone.timedelta(days=1)
+    proxima_semana = hoje + timezone.timedelta(days=7)
+    total_criadas = 0
+
+    for usuario in get_user_model().objects.filter(is_active=True):
+        prefs, _ = PreferenciaNotificacao.objects.get_or_create(usuario=usuario)
+        tarefas = Tarefa.objects.filter(
+            Q(responsavel=usuario) | Q(executores=usuario)
+        ).distinct()
+
+        grupos = []
+        if prefs.notificar_tarefa_atrasada:
+            grupos.append((
+                'tarefa_atrasada', criar_notificacao_tarefa_atrasada,
+                tarefas.filter(data_fim__lt=hoje, status__in=['a_iniciar', 'em_andamento', 'atrasado']),
+            ))
+        if prefs.notificar_tarefa_vencendo:
+            grupos.append((
+                'tarefa_vencendo_hoje', criar_notificacao_tarefa_vencendo_hoje,
+                tarefas.filter(data_fim=hoje, status__in=['a_iniciar', 'em_andamento']),
+            ))
+            grupos.append((
+                'tarefa_a_vencer', criar_notificacao_tarefa_a_vencer,
+                tarefas.filter(data_fim__gte=amanha, data_fim__lte=proxima_semana,
+                               status__in=['a_iniciar', 'em_andamento']),
+            ))
+
+        for tipo, criar, queryset in grupos:
+            for tarefa in queryset:
+                if not Notificacao.objects.filter(
+                    usuario=usuario, evento__tipo=tipo, evento__tarefa_id=tarefa.id, lida=False
+                ).exists():
+                    criar(tarefa, usuario)
+                    total_criadas += 1
+
+        if prefs.notificar_obrigacao:
+            obrigacoes = Obrigacao.objects.filter(
+                acoes__responsavel=usuario,
+                data_vencimento__lte=proxima_semana,
+                data_vencimento__gte=hoje,
+                status='pendente'
+            ).distinct()
+            for obrigacao in obrigacoes:
+                if not Notificacao.objects.filter(
+                    usuario=usuario, evento__tipo='obrigacao_vencendo',
+                    evento__obrigacao_id=obrigacao.id, lida=False
+                ).exists():
+                    criar_notificacao_obrigacao_vencendo(obrigacao, usuario)
+                    total_criadas += 1
+
+    return total_criadas
+
+
+class Command(BaseCommand):
+    help = 'Mede a geração de notificações em uma massa de dados sintética'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10000,
+                            help='Quantidade de usuários sintéticos (padrão: 10000)')
+        parser.add_argument('--tarefas', type=int, default=500000,
+                            help='Quantidade de tarefas sintéticas (padrão: 500000)')
+        parser.add_argument('--tarefas-por-acao', type=int, default=20,
+                            help='Tarefas por ação (padrão: 20)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Tamanho dos lotes de inserção (padrão: 1000)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Semente do gerador aleatório (padrão: 42)')
+        parser.add_argument('--comparar-legado', action='store_true',
+                            help='Executa também o laço antigo e compara os resultados')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.executar(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('🧹 Massa sintética descartada'))
+
+    def executar(self, options):
+        hoje = timezone.now().date()
+
+        inicio = time.perf_counter()
+        self.popular(options, hoje)
+        self.stdout.write(f'📦 Massa criada em {time.perf_counter() - inicio:.1f}s')
+
+        legado = None
+        if options['comparar_legado']:
+            sid = transaction.savepoint()
+            total, consultas, duracao = medir(gerar_legado, hoje)
+            legado = self.snapshot()
+            self.stdout.write(
+                f'🐢 Legado: {total} notificações, {consultas} consultas, {duracao:.2f}s'
+            )
+            transaction.savepoint_rollback(sid)
+
+        resultado, consultas, duracao = medir(
+            gerar_notificacoes, hoje=hoje, batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f'🚀 Em lote: {resultado["total"]} notificações, {consultas} consultas, {duracao:.2f}s'
+        )
+
+        resultado, consultas, duracao = medir(
+            gerar_notificacoes, hoje=hoje, batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f'🔁 Reexecução: {resultado["total"]} notificações, {consultas} consultas, {duracao:.2f}s'
+        )
+
+        if legado is not None:
+            novo = self.snapshot()
+            if novo != legado:
+                raise CommandError(
+                    f'Resultados divergentes: {len(legado - novo)} só no legado, '
+                    f'{len(novo - legado)} só no gerador em lote'
+                )
+            self.stdout.write(self.style.SUCCESS('✅ Resultados idênticos ao laço legado'))
+
+    def snapshot(self):
+        return set(
+            Notificacao.objects.filter(lida=False).values_list(*CAMPOS_COMPARACAO)
+        )
+
+    def popular(self, options, hoje):
+        rnd = random.Random(options['seed'])
+        batch = options['batch_size']
+        User = get_user_model()
+
+        diretoria = Diretoria.objects.create(nome='Benchmark', sigla='BENCH')
+        tipo_instrumento = TipoInstrumento.objects.create(nome='Benchmark')
+        tipo_obrigacao = TipoObrigacao.objects.create(nome='Benchmark')
+        tipo_acao = TipoAcao.objects.create(nome='Benchmark')
+
+        usuarios = User.objects.bulk_create([
+            User(username=f'bench_{i}', password='!', is_active=rnd.random() > 0.05)
+            for i in range(options['usuarios'])
+        ], batch_size=batch)
+        usuario_ids = [u.id for u in usuarios]
+
+        # Parte dos usuários já possui preferências (algumas desabilitadas)
+        PreferenciaNotificacao.objects.bulk_create([
+            PreferenciaNotificacao(
+                usuario_id=uid,
+                notificar_tarefa_atrasada=rnd.random() > 0.2,
+                notificar_tarefa_vencendo=rnd.random() > 0.2,
+                notificar_obrigacao=rnd.random() > 0.2,
+            )
+            for uid in usuario_ids if rnd.random() > 0.5
+        ], batch_size=batch)
+
+        total_acoes = max(1, options['tarefas'] // options['tarefas_por_acao'])
+        total_obrigacoes = max(1, total_acoes // 5)
+        total_instrumentos = max(1, total_obrigacoes // 10)
+
+        def data_aleatoria():
+            return hoje + timezone.timedelta(days=rnd.randint(-60, 60))
+
+        instrumentos = Instrumento.objects.bulk_create([
+            Instrumento(
+                numero=f'BENCH-{i}', tipo_instrumento=tipo_instrumento,
+                diretoria=diretoria, objeto='Benchmark',
+                data_assinatura=hoje, data_inicio=hoje,
+                data_fim=hoje + timezone.timedelta(days=365),
+            )
+            for i in range(total_instrumentos)
+        ], batch_size=batch)
+
+        obrigacoes = Obrigacao.objects.bulk_create([
+            Obrigacao(
+                titulo=f'Obrigação {i}', descricao='Benchmark',
+                instrumento=rnd.choice(instrumentos), tipo_obrigacao=tipo_obrigacao,
+                data_vencimento=data_aleatoria(),
+                status=rnd.choice(['pendente', 'pendente', 'em_andamento', 'cumprida']),
+            )
+            for i in range(total_obrigacoes)
+        ], batch_size=batch)
+
+        acoes = Acao.objects.bulk_create([
+            Acao(
+                nome=f'Ação {i}', descricao='Benchmark',
+                obrigacao=rnd.choice(obrigacoes), tipo_acao=tipo_acao,
+                responsavel_id=rnd.choice(usuario_ids),
+            )
+            for i in range(total_acoes)
+        ], batch_size=batch)
+
+        status = [s for s, _ in Tarefa.STATUS_CHOICES]
+        tarefas = []
+        for i in range(options['tarefas']):
+            data_fim = data_aleatoria()
+            tarefas.append(Tarefa(
+                nome=f'Tarefa {i}', acao=rnd.choice(acoes),
+                responsavel_id=rnd.choice(usuario_ids),
+                status=rnd.choice(status),
+                data_inicio=data_fim - timezone.timedelta(days=10),
+                data_fim=data_fim,
+            ))
+        tarefas = Tarefa.objects.bulk_create(tarefas, batch_size=batch)
+
+        Executores = Tarefa.executores.through
+        Executores.objects.bulk_create([
+            Executores(tarefa_id=t.id, usuario_id=uid)
+            for t in tarefas
+            for uid in rnd.sample(usuario_ids, rnd.randint(0, min(2, len(usuario_ids))))
+        ], batch_size=batch, ignore_conflicts=True)
+
+        # Notificações não lidas pré-existentes exercitam o anti-join
+        eventos = NotificacaoEvento.objects.bulk_create([
+            NotificacaoEvento(
+                tipo='tarefa_atrasada', titulo='pré-existente', link='#', tarefa_id=t.id,
+            )
+            for t in rnd.sample(tarefas, len(tarefas) // 20)
+            if t.data_fim < hoje
+        ], batch_size=batch)
+        responsavel = {t.id: t.responsavel_id for t in tarefas}
+        Notificacao.objects.bulk_create([
+            Notificacao(
+                usuario_id=responsavel[e.tarefa_id], evento=e,
+            ).preencher_chave_dedup()
+            for e in eventos
+        ], batch_size=batch)
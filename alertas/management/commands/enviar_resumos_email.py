@@ -0,0 +1,44 @@
+# ===== COMANDO PARA ENVIAR OS RESUMOS POR E-MAIL =====
+"""
+Envia por e-mail as notificações pendentes (ver alertas/emails.py)
+
+Uso:
+    python manage.py enviar_resumos_email --frequencia diario
+    python manage.py enviar_resumos_email --frequencia semanal --lote 50
+
+Em produção o envio é agendado pelo Celery beat
+(alertas/migrations/0008_agendar_resumos_email.py).
+"""
+
+from django.core.management.base import BaseCommand
+
+from alertas.emails import PERIODOS, enviar_resumos
+
+
+class Command(BaseCommand):
+    help = 'Envia os resumos de notificações por e-mail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequencia',
+            choices=list(PERIODOS),
+            default='diario',
+            help='Frequência dos usuários a atender (padrão: diario)',
+        )
+
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=100,
+            help='E-mails enviados antes de registrar o envio (padrão: 100)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'📧 Enviando resumos ({options["frequencia"]})...'))
+        
+        resultado = enviar_resumos(options['frequencia'], lote=options['lote'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado["emails"]} e-mails enviados com '
+            f'{resultado["notificacoes"]} notificações'
+        ))
@@ -4,25 +4,22 @@ Comando Django para gerar notificações baseadas em tarefas e obrigações
 
 Uso:
     python manage.py gerar_notificacoes
+    python manage.py gerar_notificacoes --limpar-antigas --arquivar arquivo
 
-Agendar com cron (executar a cada hora):
-    0 * * * * cd /app && python manage.py gerar_notificacoes
+Alterações em tarefas, ações e obrigações já geram suas notificações na
+hora (ver alertas/signals.py); este comando cobre a virada de data, isto é,
+itens que passam a vencer ou atrasar sem terem sido alterados.
+
+Agendar com cron (executar logo após a meia-noite):
+    5 0 * * * cd /app && python manage.py gerar_notificacoes
 """
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db.models import Q
-from django.contrib.auth import get_user_model
 
-from acoes.models import Tarefa
-from instrumentos.models import Obrigacao
-from alertas.models import Notificacao, PreferenciaNotificacao
-from alertas.views import (
-    criar_notificacao_tarefa_atrasada,
-    criar_notificacao_tarefa_vencendo_hoje,
-    criar_notificacao_tarefa_a_vencer,
-    criar_notificacao_obrigacao_vencendo,
-)
+from alertas.models import Notificacao
+from alertas.geracao import gerar_notificacoes
+from alertas.retencao import DESTINOS_ARQUIVO
 
 
 class Command(BaseCommand):
@@ -42,127 +39,82 @@ class Command(BaseCommand):
             help='Dias para considerar notificação antiga (padrão: 30)',
         )
 
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tamanho dos lotes de inserção (padrão: 1000)',
+        )
+
+        parser.add_argument(
+            '--lote-limpeza',
+            type=int,
+            default=None,
+            help='Notificações removidas por lote (padrão: ALERTAS_RETENCAO_LOTE)',
+        )
+
+        parser.add_argument(
+            '--pausa-limpeza',
+            type=float,
+            default=None,
+            help='Segundos de pausa entre lotes (padrão: ALERTAS_RETENCAO_PAUSA)',
+        )
+
+        parser.add_argument(
+            '--arquivar',
+            choices=DESTINOS_ARQUIVO,
+            default=None,
+            help='Arquivar antes de remover: tabela (NotificacaoArquivada) ou arquivo (JSONL gzip)',
+        )
+
+        parser.add_argument(
+            '--arquivo',
+            default=None,
+            help='Caminho do .jsonl.gz quando --arquivar arquivo',
+        )
+
     def handle(self, *args, **options):
-        hoje = timezone.now().date()
-        amanha = hoje + timezone.timedelta(days=1)
-        proxima_semana = hoje + timezone.timedelta(days=7)
-        
-        total_criadas = 0
-        
         self.stdout.write(self.style.SUCCESS('🔔 Gerando notificações...'))
         
-        # ===== PROCESSAR CADA USUÁRIO =====
-        User = get_user_model()
-        usuarios = User.objects.filter(is_active=True)
+        # ===== GERAÇÃO EM LOTE (ver alertas/geracao.py) =====
+        resultado = gerar_notificacoes(
+            hoje=timezone.now().date(),
+            batch_size=options['batch_size'],
+        )
         
-        for usuario in usuarios:
-            # Buscar preferências
-            prefs, _ = PreferenciaNotificacao.objects.get_or_create(usuario=usuario)
-            
-            # ===== TAREFAS =====
-            tarefas = Tarefa.objects.filter(
-                Q(responsavel=usuario) | Q(executores=usuario)
-            ).distinct()
-            
-            # 1. Tarefas ATRASADAS
-            if prefs.notificar_tarefa_atrasada:
-                atrasadas = tarefas.filter(
-                    data_fim__lt=hoje,
-                    status__in=['a_iniciar', 'em_andamento', 'atrasado']
-                )
-                
-                for tarefa in atrasadas:
-                    # Verificar se já existe notificação não lida
-                    existe = Notificacao.objects.filter(
-                        usuario=usuario,
-                        tipo='tarefa_atrasada',
-                        tarefa_id=tarefa.id,
-                        lida=False
-                    ).exists()
-                    
-                    if not existe:
-                        criar_notificacao_tarefa_atrasada(tarefa, usuario)
-                        total_criadas += 1
-            
-            # 2. Tarefas VENCENDO HOJE
-            if prefs.notificar_tarefa_vencendo:
-                vencendo_hoje = tarefas.filter(
-                    data_fim=hoje,
-                    status__in=['a_iniciar', 'em_andamento']
-                )
-                
-                for tarefa in vencendo_hoje:
-                    existe = Notificacao.objects.filter(
-                        usuario=usuario,
-                        tipo='tarefa_vencendo_hoje',
-                        tarefa_id=tarefa.id,
-                        lida=False
-                    ).exists()
-                    
-                    if not existe:
-                        criar_notificacao_tarefa_vencendo_hoje(tarefa, usuario)
-                        total_criadas += 1
-            
-            # 3. Tarefas A VENCER (próximos 7 dias)
-            if prefs.notificar_tarefa_vencendo:
-                a_vencer = tarefas.filter(
-                    data_fim__gte=amanha,
-                    data_fim__lte=proxima_semana,
-                    status__in=['a_iniciar', 'em_andamento']
-                )
-                
-                for tarefa in a_vencer:
-                    existe = Notificacao.objects.filter(
-                        usuario=usuario,
-                        tipo='tarefa_a_vencer',
-                        tarefa_id=tarefa.id,
-                        lida=False
-                    ).exists()
-                    
-                    if not existe:
-                        criar_notificacao_tarefa_a_vencer(tarefa, usuario)
-                        total_criadas += 1
-            
-            # ===== OBRIGAÇÕES =====
-            if prefs.notificar_obrigacao:
-                obrigacoes_vencendo = Obrigacao.objects.filter(
-                    acoes__responsavel=usuario,
-                    data_vencimento__lte=proxima_semana,
-                    data_vencimento__gte=hoje,
-                    status='pendente'
-                ).distinct()
-                
-                for obrigacao in obrigacoes_vencendo:
-                    existe = Notificacao.objects.filter(
-                        usuario=usuario,
-                        tipo='obrigacao_vencendo',
-                        obrigacao_id=obrigacao.id,
-                        lida=False
-                    ).exists()
-                    
-                    if not existe:
-                        criar_notificacao_obrigacao_vencendo(obrigacao, usuario)
-                        total_criadas += 1
+        for tipo, quantidade in sorted(resultado['por_tipo'].items()):
+            self.stdout.write(f'   {tipo}: {quantidade}')
         
         self.stdout.write(
-            self.style.SUCCESS(f'✅ {total_criadas} notificações criadas!')
+            self.style.SUCCESS(f'✅ {resultado["total"]} notificações criadas!')
         )
         
         # ===== LIMPEZA =====
         if options['limpar_antigas']:
-            dias = options['dias_limpeza']
+            opcoes = {
+                'lote': options['lote_limpeza'],
+                'pausa': options['pausa_limpeza'],
+                'arquivar': options['arquivar'],
+                'arquivo': options['arquivo'],
+            }
             
             # Limpar notificações lidas antigas
-            count_lidas, _ = Notificacao.limpar_antigas_lidas(dias=dias)
-            self.stdout.write(
-                self.style.SUCCESS(f'🗑️  {count_lidas} notificações lidas antigas removidas')
-            )
+            relatorio = Notificacao.limpar_antigas_lidas(dias=options['dias_limpeza'], **opcoes)
+            self.relatar('lidas antigas', relatorio)
             
             # Limpar notificações expiradas
-            count_expiradas, _ = Notificacao.limpar_expiradas()
-            self.stdout.write(
-                self.style.SUCCESS(f'🗑️  {count_expiradas} notificações expiradas removidas')
-            )
+            relatorio = Notificacao.limpar_expiradas(**opcoes)
+            self.relatar('expiradas', relatorio)
         
         self.stdout.write(self.style.SUCCESS('🎉 Concluído!'))
 
+    def relatar(self, descricao, relatorio):
+        self.stdout.write(self.style.SUCCESS(
+            f'🗑️  {relatorio["removidas"]} notificações {descricao} removidas '
+            f'({relatorio["lotes"]} lotes, {relatorio["segundos"]}s, '
+            f'{relatorio["por_segundo"]} linhas/s)'
+        ))
+        if relatorio.get('arquivo'):
+            self.stdout.write(f'   📦 Arquivadas em {relatorio["arquivo"]}')
+        elif relatorio['arquivadas']:
+            self.stdout.write(f'   📦 {relatorio["arquivadas"]} arquivadas em NotificacaoArquivada')
@@ -0,0 +1,20 @@
+# ===== SISTEMA DE ALERTAS - MIDDLEWARE =====
+"""
+Reavaliação de notificações uma única vez por requisição
+
+Tudo o que a view altera (save() do form, save_m2m(), formsets) entra na
+fila da requisição (alertas/signals.py), entregue ao final, depois da
+view, a uma única tarefa Celery de reavaliação. A fila vale só para esta
+requisição, inclusive sob ASGI.
+"""
+
+from .signals import fila_da_requisicao
+
+
+class ReavaliacaoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with fila_da_requisicao():
+            return self.get_response(request)
@@ -0,0 +1,66 @@
+# Registra as tarefas de alertas no DatabaseScheduler do django_celery_beat
+
+import json
+
+from django.conf import settings
+from django.db import migrations
+
+
+TAREFAS = [
+    {
+        'name': 'alertas: gerar notificações',
+        'task': 'alertas.tasks.gerar_notificacoes_todas',
+        'crontab': {'minute': '5', 'hour': '0'},
+        'kwargs': {},
+        'description': 'Virada de data: tarefas/obrigações que passam a vencer ou atrasar',
+    },
+    {
+        'name': 'alertas: limpar notificações',
+        'task': 'alertas.tasks.limpar_notificacoes',
+        'crontab': {'minute': '0', 'hour': '3'},
+        'kwargs': {'dias': 30},
+        'description': 'Remove notificações lidas há mais de 30 dias e as expiradas',
+    },
+]
+
+
+def agendar(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    for tarefa in TAREFAS:
+        crontab, _ = CrontabSchedule.objects.get_or_create(
+            minute=tarefa['crontab']['minute'],
+            hour=tarefa['crontab']['hour'],
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*',
+            timezone=settings.TIME_ZONE,
+        )
+        PeriodicTask.objects.update_or_create(
+            name=tarefa['name'],
+            defaults={
+                'task': tarefa['task'],
+                'crontab': crontab,
+                'kwargs': json.dumps(tarefa['kwargs']),
+                'description': tarefa['description'],
+                'enabled': True,
+            },
+        )
+
+
+def desagendar(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(name__in=[t['name'] for t in TAREFAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0002_rename_alertas_not_usuario_lida_idx_alertas_not_usuario_2e67c7_idx_and_more'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(agendar, desagendar),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0003_agendar_tarefas_periodicas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última Atualização'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['usuario', 'data_atualizacao', 'id'], name='alertas_not_usuario_76bd80_idx'),
+        ),
+    ]
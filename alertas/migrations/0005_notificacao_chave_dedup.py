@@ -0,0 +1,76 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+TIPOS_DEDUPLICADOS = [
+    'tarefa_atrasada',
+    'tarefa_vencendo_hoje',
+    'tarefa_a_vencer',
+    'tarefa_nova',
+    'atribuicao',
+    'obrigacao_vencendo',
+    'instrumento_expirando',
+]
+
+
+def preencher_e_colapsar(apps, schema_editor):
+    """
+    Preenche chave_dedup e remove duplicatas não lidas já existentes,
+    mantendo a mais recente de cada (usuario, chave_dedup)
+    """
+    Notificacao = apps.get_model('alertas', 'Notificacao')
+
+    linhas = Notificacao.objects.filter(tipo__in=TIPOS_DEDUPLICADOS).values_list(
+        'id', 'tipo', 'tarefa_id', 'obrigacao_id', 'instrumento_id'
+    ).order_by('id')
+
+    lote = []
+    for pk, tipo, tarefa_id, obrigacao_id, instrumento_id in linhas.iterator(chunk_size=2000):
+        lote.append(Notificacao(
+            id=pk,
+            chave_dedup=f'{tipo}:{tarefa_id or ""}:{obrigacao_id or ""}:{instrumento_id or ""}',
+        ))
+        if len(lote) >= 2000:
+            Notificacao.objects.bulk_update(lote, ['chave_dedup'])
+            lote = []
+    if lote:
+        Notificacao.objects.bulk_update(lote, ['chave_dedup'])
+
+    duplicadas = (
+        Notificacao.objects.filter(lida=False, chave_dedup__isnull=False)
+        .values('usuario_id', 'chave_dedup')
+        .annotate(total=Count('id'), manter=Max('id'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    for grupo in duplicadas.iterator():
+        Notificacao.objects.filter(
+            usuario_id=grupo['usuario_id'],
+            chave_dedup=grupo['chave_dedup'],
+            lida=False,
+            id__lt=grupo['manter'],
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0004_notificacao_data_atualizacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='chave_dedup',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, verbose_name='Chave de Deduplicação'),
+        ),
+        migrations.RunPython(preencher_e_colapsar, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notificacao',
+            constraint=models.UniqueConstraint(condition=models.Q(('chave_dedup__isnull', False), ('lida', False)), fields=('usuario', 'chave_dedup'), name='alertas_notificacao_nao_lida_unica'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0005_notificacao_chave_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacaoArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('usuario_id', models.IntegerField(verbose_name='ID do Usuário')),
+                ('tipo', models.CharField(max_length=50, verbose_name='Tipo')),
+                ('prioridade', models.CharField(max_length=20, verbose_name='Prioridade')),
+                ('titulo', models.CharField(max_length=200, verbose_name='Título')),
+                ('mensagem', models.TextField(blank=True, verbose_name='Mensagem')),
+                ('link', models.CharField(max_length=200, verbose_name='Link')),
+                ('tarefa_id', models.IntegerField(blank=True, null=True, verbose_name='ID da Tarefa')),
+                ('obrigacao_id', models.IntegerField(blank=True, null=True, verbose_name='ID da Obrigação')),
+                ('instrumento_id', models.IntegerField(blank=True, null=True, verbose_name='ID do Instrumento')),
+                ('lida', models.BooleanField(default=False, verbose_name='Lida')),
+                ('data_leitura', models.DateTimeField(blank=True, null=True, verbose_name='Data de Leitura')),
+                ('data_criacao', models.DateTimeField(verbose_name='Data de Criação')),
+                ('data_expiracao', models.DateTimeField(blank=True, null=True, verbose_name='Data de Expiração')),
+                ('data_arquivamento', models.DateTimeField(auto_now_add=True, verbose_name='Data de Arquivamento')),
+            ],
+            options={
+                'verbose_name': 'Notificação Arquivada',
+                'verbose_name_plural': 'Notificações Arquivadas',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0006_notificacao_arquivada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='data_envio_email',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Enviada por E-mail em'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(condition=models.Q(('data_envio_email__isnull', True), ('lida', False)), fields=['data_criacao'], name='alertas_notif_email_pendente'),
+        ),
+    ]
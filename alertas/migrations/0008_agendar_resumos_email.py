@@ -0,0 +1,73 @@
+# Registra o envio dos resumos por e-mail no DatabaseScheduler do django_celery_beat
+
+import json
+
+from django.conf import settings
+from django.db import migrations
+
+
+TAREFAS = [
+    {
+        'name': 'alertas: e-mail imediato',
+        'task': 'alertas.tasks.enviar_resumos_email',
+        'crontab': {'minute': '*/5', 'hour': '*', 'day_of_week': '*'},
+        'kwargs': {'frequencia': 'imediato'},
+        'description': 'Envia as notificações novas de quem escolheu e-mail imediato',
+    },
+    {
+        'name': 'alertas: resumo diário por e-mail',
+        'task': 'alertas.tasks.enviar_resumos_email',
+        'crontab': {'minute': '0', 'hour': '7', 'day_of_week': '*'},
+        'kwargs': {'frequencia': 'diario'},
+        'description': 'Resumo diário das notificações não lidas',
+    },
+    {
+        'name': 'alertas: resumo semanal por e-mail',
+        'task': 'alertas.tasks.enviar_resumos_email',
+        'crontab': {'minute': '0', 'hour': '7', 'day_of_week': '1'},
+        'kwargs': {'frequencia': 'semanal'},
+        'description': 'Resumo semanal (segunda-feira) das notificações não lidas',
+    },
+]
+
+
+def agendar(apps, schema_editor):
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+
+    for tarefa in TAREFAS:
+        crontab, _ = CrontabSchedule.objects.get_or_create(
+            minute=tarefa['crontab']['minute'],
+            hour=tarefa['crontab']['hour'],
+            day_of_week=tarefa['crontab']['day_of_week'],
+            day_of_month='*',
+            month_of_year='*',
+            timezone=settings.TIME_ZONE,
+        )
+        PeriodicTask.objects.update_or_create(
+            name=tarefa['name'],
+            defaults={
+                'task': tarefa['task'],
+                'crontab': crontab,
+                'kwargs': json.dumps(tarefa['kwargs']),
+                'description': tarefa['description'],
+                'enabled': True,
+            },
+        )
+
+
+def desagendar(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTask.objects.filter(name__in=[t['name'] for t in TAREFAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0007_notificacao_data_envio_email'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(agendar, desagendar),
+    ]
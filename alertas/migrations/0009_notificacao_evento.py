@@ -0,0 +1,141 @@
+# Separa o conteúdo das notificações (NotificacaoEvento) dos recibos por usuário
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min
+
+
+CAMPOS_EVENTO = (
+    'tipo', 'prioridade', 'titulo', 'mensagem', 'link',
+    'tarefa_id', 'obrigacao_id', 'instrumento_id',
+)
+
+LOTE = 2000
+
+
+def criar_eventos(apps, schema_editor):
+    """Um evento por conteúdo distinto; recibos com o mesmo conteúdo o compartilham"""
+    Notificacao = apps.get_model('alertas', 'Notificacao')
+    NotificacaoEvento = apps.get_model('alertas', 'NotificacaoEvento')
+
+    conteudos = (
+        Notificacao.objects.order_by().values(*CAMPOS_EVENTO)
+        .annotate(criacao=Min('data_criacao'))
+    )
+
+    evento_por_conteudo = {}
+    pendentes = []
+
+    def gravar():
+        eventos = NotificacaoEvento.objects.bulk_create(
+            [NotificacaoEvento(**{c: linha[c] for c in CAMPOS_EVENTO}) for linha in pendentes]
+        )
+        # auto_now_add ignora o valor informado: data original em seguida
+        for evento, linha in zip(eventos, pendentes):
+            evento.data_criacao = linha['criacao']
+            evento_por_conteudo[tuple(linha[c] for c in CAMPOS_EVENTO)] = evento.pk
+        NotificacaoEvento.objects.bulk_update(eventos, ['data_criacao'])
+        pendentes.clear()
+
+    for linha in conteudos.iterator(chunk_size=LOTE):
+        pendentes.append(linha)
+        if len(pendentes) >= LOTE:
+            gravar()
+    if pendentes:
+        gravar()
+
+    recibos = []
+    for pk, *conteudo in Notificacao.objects.order_by('pk').values_list(
+        'pk', *CAMPOS_EVENTO
+    ).iterator(chunk_size=LOTE):
+        recibos.append(Notificacao(pk=pk, evento_id=evento_por_conteudo[tuple(conteudo)]))
+        if len(recibos) >= LOTE:
+            Notificacao.objects.bulk_update(recibos, ['evento_id'])
+            recibos = []
+    if recibos:
+        Notificacao.objects.bulk_update(recibos, ['evento_id'])
+
+
+def restaurar_conteudo(apps, schema_editor):
+    """Reversão: copia o conteúdo do evento de volta para cada recibo"""
+    Notificacao = apps.get_model('alertas', 'Notificacao')
+
+    recibos = []
+    for pk, *conteudo in Notificacao.objects.order_by('pk').values_list(
+        'pk', *[f'evento__{c}' for c in CAMPOS_EVENTO]
+    ).iterator(chunk_size=LOTE):
+        recibos.append(Notificacao(pk=pk, **dict(zip(CAMPOS_EVENTO, conteudo))))
+        if len(recibos) >= LOTE:
+            Notificacao.objects.bulk_update(recibos, CAMPOS_EVENTO)
+            recibos = []
+    if recibos:
+        Notificacao.objects.bulk_update(recibos, CAMPOS_EVENTO)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0008_agendar_resumos_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacaoEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('tarefa_atrasada', 'Tarefa Atrasada'), ('tarefa_vencendo_hoje', 'Tarefa Vencendo Hoje'), ('tarefa_a_vencer', 'Tarefa a Vencer'), ('tarefa_nova', 'Nova Tarefa'), ('obrigacao_vencendo', 'Obrigação Vencendo'), ('instrumento_expirando', 'Instrumento Expirando'), ('comentario', 'Novo Comentário'), ('atribuicao', 'Tarefa Atribuída'), ('mudanca_status', 'Mudança de Status')], max_length=50, verbose_name='Tipo')),
+                ('prioridade', models.CharField(choices=[('baixa', 'Baixa'), ('media', 'Média'), ('alta', 'Alta'), ('urgente', 'Urgente')], default='media', max_length=20, verbose_name='Prioridade')),
+                ('titulo', models.CharField(max_length=200, verbose_name='Título')),
+                ('mensagem', models.TextField(blank=True, verbose_name='Mensagem')),
+                ('link', models.CharField(help_text='URL para onde a notificação leva', max_length=200, verbose_name='Link')),
+                ('tarefa_id', models.IntegerField(blank=True, null=True, verbose_name='ID da Tarefa')),
+                ('obrigacao_id', models.IntegerField(blank=True, null=True, verbose_name='ID da Obrigação')),
+                ('instrumento_id', models.IntegerField(blank=True, null=True, verbose_name='ID do Instrumento')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+            ],
+            options={
+                'verbose_name': 'Evento de Notificação',
+                'verbose_name_plural': 'Eventos de Notificação',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificacao',
+            name='evento',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recibos', to='alertas.notificacaoevento', verbose_name='Evento'),
+        ),
+        # Sem default: na reversão as colunas voltam vazias e só ficam
+        # obrigatórias depois de restaurar_conteudo preenchê-las
+        migrations.AlterField(
+            model_name='notificacao',
+            name='tipo',
+            field=models.CharField(choices=[('tarefa_atrasada', 'Tarefa Atrasada'), ('tarefa_vencendo_hoje', 'Tarefa Vencendo Hoje'), ('tarefa_a_vencer', 'Tarefa a Vencer'), ('tarefa_nova', 'Nova Tarefa'), ('obrigacao_vencendo', 'Obrigação Vencendo'), ('instrumento_expirando', 'Instrumento Expirando'), ('comentario', 'Novo Comentário'), ('atribuicao', 'Tarefa Atribuída'), ('mudanca_status', 'Mudança de Status')], max_length=50, null=True, verbose_name='Tipo'),
+        ),
+        migrations.AlterField(
+            model_name='notificacao',
+            name='titulo',
+            field=models.CharField(max_length=200, null=True, verbose_name='Título'),
+        ),
+        migrations.AlterField(
+            model_name='notificacao',
+            name='link',
+            field=models.CharField(help_text='URL para onde a notificação leva', max_length=200, null=True, verbose_name='Link'),
+        ),
+        migrations.RunPython(criar_eventos, restaurar_conteudo),
+        migrations.AlterField(
+            model_name='notificacao',
+            name='evento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recibos', to='alertas.notificacaoevento', verbose_name='Evento'),
+        ),
+        migrations.RemoveIndex(
+            model_name='notificacao',
+            name='alertas_not_tipo_a89ede_idx',
+        ),
+        migrations.RemoveField(model_name='notificacao', name='tipo'),
+        migrations.RemoveField(model_name='notificacao', name='prioridade'),
+        migrations.RemoveField(model_name='notificacao', name='titulo'),
+        migrations.RemoveField(model_name='notificacao', name='mensagem'),
+        migrations.RemoveField(model_name='notificacao', name='link'),
+        migrations.RemoveField(model_name='notificacao', name='tarefa_id'),
+        migrations.RemoveField(model_name='notificacao', name='obrigacao_id'),
+        migrations.RemoveField(model_name='notificacao', name='instrumento_id'),
+    ]
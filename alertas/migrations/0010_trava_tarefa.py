@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alertas', '0009_notificacao_evento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravaTarefa',
+            fields=[
+                ('nome', models.CharField(max_length=200, primary_key=True, serialize=False, verbose_name='Nome')),
+                ('token', models.CharField(max_length=32, verbose_name='Token')),
+                ('expira_em', models.DateTimeField(verbose_name='Expira em')),
+            ],
+            options={
+                'verbose_name': 'Trava de Tarefa',
+                'verbose_name_plural': 'Travas de Tarefas',
+            },
+        ),
+    ]
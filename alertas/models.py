@@ -1,18 +1,39 @@
 # ===== SISTEMA DE ALERTAS - VERSÃO 2: MODELO DE NOTIFICAÇÃO =====
-from django.db import models
+
+from django.db import IntegrityError, connection, models, transaction
 from django.conf import settings
 from django.utils import timezone
 
 
-class Notificacao(models.Model):
+def apagar_por_id(modelo, ids, lote=500):
+    """
+    DELETE direto por chave primária, sem o Collector do Django
+
+    Não carrega as linhas nem dispara pre/post_delete: quem chama cuida
+    das invalidações. Retorna o número de linhas removidas.
+    """
+    ids = list(ids)
+    tabela = connection.ops.quote_name(modelo._meta.db_table)
+    coluna = connection.ops.quote_name(modelo._meta.pk.column)
+
+    removidas = 0
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), lote):
+            parte = ids[inicio:inicio + lote]
+            cursor.execute(
+                f'DELETE FROM {tabela} WHERE {coluna} IN ({", ".join(["%s"] * len(parte))})', parte
+            )
+            removidas += cursor.rowcount
+    return removidas
+
+
+class NotificacaoEvento(models.Model):
     """
-    Modelo para persistir notificações no banco
+    Conteúdo de uma notificação, gravado uma única vez
     
-    Permite:
-    - Marcar como lida
-    - Histórico de notificações
-    - Notificações customizadas
-    - Diferentes tipos de alertas
+    Cada destinatário recebe apenas um recibo (Notificacao) apontando
+    para o evento, com o próprio estado de leitura: um alerta de obrigação
+    para dez responsáveis ocupa um evento e dez recibos.
     """
     
     TIPOS = [
@@ -34,14 +55,6 @@ class Notificacao(models.Model):
         ('urgente', 'Urgente'),
     ]
     
-    # Quem recebe a notificação
-    usuario = models.ForeignKey(
-        settings.AUTH_USER_MODEL, 
-        on_delete=models.CASCADE,
-        related_name='notificacoes',
-        verbose_name='Usuário'
-    )
-    
     # Tipo e prioridade
     tipo = models.CharField(
         max_length=50, 
@@ -93,6 +106,134 @@ class Notificacao(models.Model):
         verbose_name='ID do Instrumento'
     )
     
+    data_criacao = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Criação'
+    )
+    
+    class Meta:
+        verbose_name = 'Evento de Notificação'
+        verbose_name_plural = 'Eventos de Notificação'
+    
+    def __str__(self):
+        return self.titulo
+    
+    @classmethod
+    def publicar(cls, usuario_ids, batch_size=1000, **dados):
+        """
+        Cria o evento e um recibo por destinatário
+        
+        O evento é inserido uma vez e os recibos em um único INSERT por
+        lote; destinatários que já têm a mesma notificação não lida são
+        ignorados pela restrição única. Retorna os recibos inseridos (o
+        evento é descartado se nenhum for).
+        
+        Uso:
+            NotificacaoEvento.publicar(
+                [1, 2, 3],
+                tipo='obrigacao_vencendo',
+                titulo='Obrigação vencendo: X',
+                link='/instrumentos/4/editar/',
+                obrigacao_id=9,
+            )
+        """
+        usuario_ids = sorted(set(usuario_ids))
+        if not usuario_ids:
+            return []
+        
+        with transaction.atomic():
+            evento = cls.objects.create(**dados)
+            recibos = [
+                Notificacao(usuario_id=uid, evento=evento).preencher_chave_dedup()
+                for uid in usuario_ids
+            ]
+            Notificacao.objects.bulk_create(recibos, batch_size=batch_size, ignore_conflicts=True)
+            recibos = cls.confirmar_recibos([evento], recibos, batch_size)
+        # bulk_create não dispara post_save: invalida as versões em lote
+        Notificacao.invalidar_alertas((r.usuario_id for r in recibos), novas=recibos)
+        return recibos
+    
+    @classmethod
+    def confirmar_recibos(cls, eventos, recibos, batch_size=1000):
+        """
+        Recibos que o bulk_create(ignore_conflicts=True) de fato inseriu
+        
+        O INSERT não informa quais linhas a restrição única descartou: os
+        eventos são novos, então os recibos que apontam para eles no banco
+        são exatamente os inseridos. Eventos sem nenhum recibo são removidos.
+        Chamar na mesma transação da inserção.
+        """
+        evento_ids = [evento.pk for evento in eventos]
+        inseridos = set()
+        for inicio in range(0, len(evento_ids), batch_size):
+            inseridos.update(
+                Notificacao.objects.filter(evento_id__in=evento_ids[inicio:inicio + batch_size])
+                .values_list('usuario_id', 'evento_id')
+            )
+        
+        orfaos = set(evento_ids) - {evento_id for _, evento_id in inseridos}
+        apagar_por_id(cls, orfaos)
+        return [r for r in recibos if (r.usuario_id, r.evento_id) in inseridos]
+
+
+def conteudo_do_evento(campo):
+    """Leitura de um campo do evento pelo recibo (n.titulo, n.tipo, ...)"""
+    return property(lambda self: getattr(self.evento, campo))
+
+
+class Notificacao(models.Model):
+    """
+    Recibo de uma notificação para um usuário
+    
+    Permite:
+    - Marcar como lida
+    - Histórico de notificações
+    - Notificações customizadas
+    - Diferentes tipos de alertas
+    
+    O conteúdo (tipo, título, mensagem, link, ids relacionados) fica em
+    NotificacaoEvento e é compartilhado entre os destinatários; aqui ficam
+    só o destinatário e o estado de leitura. Os campos do evento continuam
+    acessíveis como atributos (n.titulo, n.get_tipo_display()) — use
+    select_related('evento') ao listar.
+    """
+    
+    TIPOS = NotificacaoEvento.TIPOS
+    PRIORIDADES = NotificacaoEvento.PRIORIDADES
+    
+    # Tipos que não podem ter duas notificações não lidas para o mesmo objeto
+    TIPOS_DEDUPLICADOS = {
+        'tarefa_atrasada',
+        'tarefa_vencendo_hoje',
+        'tarefa_a_vencer',
+        'tarefa_nova',
+        'atribuicao',
+        'obrigacao_vencendo',
+        'instrumento_expirando',
+    }
+    
+    # Campos lidos do evento
+    CAMPOS_EVENTO = (
+        'tipo', 'prioridade', 'titulo', 'mensagem', 'link',
+        'tarefa_id', 'obrigacao_id', 'instrumento_id',
+    )
+    
+    # Quem recebe a notificação
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, 
+        on_delete=models.CASCADE,
+        related_name='notificacoes',
+        verbose_name='Usuário'
+    )
+    
+    # O que foi notificado
+    evento = models.ForeignKey(
+        NotificacaoEvento,
+        on_delete=models.CASCADE,
+        related_name='recibos',
+        verbose_name='Evento'
+    )
+    
     # Estado
     lida = models.BooleanField(
         default=False,
@@ -118,6 +259,39 @@ class Notificacao(models.Model):
         help_text='Notificação será removida após esta data'
     )
     
+    # "tipo:tarefa_id:obrigacao_id:instrumento_id" dos TIPOS_DEDUPLICADOS;
+    # único entre as não lidas do usuário (ver Meta.constraints)
+    chave_dedup = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Chave de Deduplicação'
+    )
+    
+    # Preenchida quando a notificação sai em um e-mail (alertas/emails.py)
+    data_envio_email = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Enviada por E-mail em'
+    )
+    
+    # Cursor da sincronização incremental (/alertas/delta/)
+    data_atualizacao = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Atualização'
+    )
+    
+    tipo = conteudo_do_evento('tipo')
+    prioridade = conteudo_do_evento('prioridade')
+    titulo = conteudo_do_evento('titulo')
+    mensagem = conteudo_do_evento('mensagem')
+    link = conteudo_do_evento('link')
+    tarefa_id = conteudo_do_evento('tarefa_id')
+    obrigacao_id = conteudo_do_evento('obrigacao_id')
+    instrumento_id = conteudo_do_evento('instrumento_id')
+    
     class Meta:
         ordering = ['-data_criacao']
         verbose_name = 'Notificação'
@@ -125,28 +299,71 @@ class Notificacao(models.Model):
         indexes = [
             models.Index(fields=['usuario', 'lida']),
             models.Index(fields=['usuario', 'data_criacao']),
-            models.Index(fields=['tipo', 'usuario']),
+            models.Index(fields=['usuario', 'data_atualizacao', 'id']),
+            models.Index(
+                fields=['data_criacao'],
+                condition=models.Q(data_envio_email__isnull=True, lida=False),
+                name='alertas_notif_email_pendente',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'chave_dedup'],
+                condition=models.Q(lida=False, chave_dedup__isnull=False),
+                name='alertas_notificacao_nao_lida_unica',
+            ),
         ]
     
     def __str__(self):
         return f"{self.usuario.username} - {self.titulo}"
     
+    def get_tipo_display(self):
+        return self.evento.get_tipo_display()
+    
+    def get_prioridade_display(self):
+        return self.evento.get_prioridade_display()
+    
+    @classmethod
+    def gerar_chave_dedup(cls, tipo, tarefa_id=None, obrigacao_id=None, instrumento_id=None):
+        """Chave de deduplicação (None para tipos que podem se repetir)"""
+        if tipo not in cls.TIPOS_DEDUPLICADOS:
+            return None
+        return f'{tipo}:{tarefa_id or ""}:{obrigacao_id or ""}:{instrumento_id or ""}'
+    
+    def preencher_chave_dedup(self):
+        if self.chave_dedup is None:
+            self.chave_dedup = self.gerar_chave_dedup(
+                self.tipo, self.tarefa_id, self.obrigacao_id, self.instrumento_id
+            )
+        return self
+    
+    def save(self, *args, **kwargs):
+        self.preencher_chave_dedup()
+        super().save(*args, **kwargs)
+    
     def marcar_como_lida(self):
         """Marca notificação como lida"""
         if not self.lida:
             self.lida = True
             self.data_leitura = timezone.now()
-            self.save(update_fields=['lida', 'data_leitura'])
+            self.save(update_fields=['lida', 'data_leitura', 'data_atualizacao'])
     
     def marcar_como_nao_lida(self):
         """Marca notificação como não lida"""
         if self.lida:
             self.lida = False
             self.data_leitura = None
-            self.save(update_fields=['lida', 'data_leitura'])
+            try:
+                with transaction.atomic():
+                    self.save(update_fields=['lida', 'data_leitura', 'data_atualizacao'])
+            except IntegrityError:
+                # Já existe uma equivalente não lida: esta continua lida
+                self.refresh_from_db(fields=['lida', 'data_leitura', 'data_atualizacao'])
+                return False
+        return True
     
     @classmethod
-    def criar_notificacao(cls, usuario, tipo, titulo, mensagem, link, **kwargs):
+    def criar_notificacao(cls, usuario, tipo, titulo, mensagem, link, data_expiracao=None, **kwargs):
         """
         Método helper para criar notificações
         
@@ -160,32 +377,130 @@ class Notificacao(models.Model):
                 tarefa_id=1,
                 prioridade='alta'
             )
+        
+        Para vários destinatários use NotificacaoEvento.publicar.
         """
-        return cls.objects.create(
-            usuario=usuario,
+        evento = NotificacaoEvento(
             tipo=tipo,
             titulo=titulo,
             mensagem=mensagem,
             link=link,
             **kwargs
         )
+        notificacao = cls(
+            usuario=usuario,
+            evento=evento,
+            data_expiracao=data_expiracao,
+        ).preencher_chave_dedup()
+        
+        try:
+            with transaction.atomic():
+                evento.save(force_insert=True)
+                notificacao.save(force_insert=True)
+        except IntegrityError:
+            # Outra execução criou a mesma notificação não lida antes
+            # (o evento é desfeito junto)
+            if notificacao.chave_dedup is None:
+                raise
+            return cls.objects.select_related('evento').get(
+                usuario=usuario, chave_dedup=notificacao.chave_dedup, lida=False
+            )
+        return notificacao
+    
+    # ===== VERSÃO DOS ALERTAS POR USUÁRIO =====
+    # Derivada do banco (total de não lidas + última alteração entre elas),
+    # e não de um token em cache: notificações criadas pelo cron/Celery ou
+    # por outro worker mudam a versão mesmo sem cache compartilhado. Serve de
+    # ETag para o polling de /alertas/ (uma consulta agregada, sobre o índice
+    # (usuario, lida), em vez de montar a lista).
+    
+    @classmethod
+    def versoes_alertas(cls, usuario_ids):
+        """{usuario_id: (total de não lidas, versão)} numa consulta agrupada"""
+        linhas = (
+            cls.objects.filter(usuario_id__in=usuario_ids, lida=False)
+            .order_by().values('usuario_id')
+            .annotate(total=models.Count('id'), ultima=models.Max('data_atualizacao'))
+        )
+        versoes = {uid: (0, '0') for uid in usuario_ids}
+        for linha in linhas:
+            versoes[linha['usuario_id']] = (
+                linha['total'],
+                f"{linha['total']}.{int(linha['ultima'].timestamp() * 1_000_000)}",
+            )
+        return versoes
     
     @classmethod
-    def limpar_expiradas(cls):
-        """Remove notificações expiradas"""
+    def versao_alertas(cls, usuario_id):
+        """Versão atual dos alertas do usuário"""
+        return cls.versoes_alertas([usuario_id])[usuario_id][1]
+    
+    @classmethod
+    def invalidar_alertas(cls, usuario_ids, novas=()):
+        """
+        Publica o novo estado dos alertas dos usuários informados para quem
+        estiver conectado em /alertas/stream/ (a versão já muda no banco)
+        """
+        from .pubsub import publicar_alteracoes
+        
+        usuario_ids = set(usuario_ids)
+        if usuario_ids:
+            publicar_alteracoes(usuario_ids, novas)
+    
+    @classmethod
+    def limpar_expiradas(cls, **opcoes):
+        """
+        Remove notificações expiradas, em lotes (ver alertas/retencao.py)
+        
+        opcoes: lote, pausa, arquivar, arquivo
+        """
+        from .retencao import expurgar
+        
         agora = timezone.now()
-        return cls.objects.filter(
-            data_expiracao__lt=agora
-        ).delete()
+        return expurgar(cls.objects.filter(data_expiracao__lt=agora), **opcoes)
     
     @classmethod
-    def limpar_antigas_lidas(cls, dias=30):
-        """Remove notificações lidas há mais de X dias"""
+    def limpar_antigas_lidas(cls, dias=30, **opcoes):
+        """Remove notificações lidas há mais de X dias, em lotes"""
+        from .retencao import expurgar
+        
         data_limite = timezone.now() - timezone.timedelta(days=dias)
-        return cls.objects.filter(
-            lida=True,
-            data_leitura__lt=data_limite
-        ).delete()
+        return expurgar(
+            cls.objects.filter(lida=True, data_leitura__lt=data_limite),
+            **opcoes
+        )
+
+
+class NotificacaoArquivada(models.Model):
+    """
+    Cópia compacta das notificações removidas pela retenção
+    
+    Preenchida por alertas.retencao.expurgar(arquivar='tabela'); mantém o
+    id original e não tem chaves estrangeiras nem índices secundários.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    usuario_id = models.IntegerField(verbose_name='ID do Usuário')
+    tipo = models.CharField(max_length=50, verbose_name='Tipo')
+    prioridade = models.CharField(max_length=20, verbose_name='Prioridade')
+    titulo = models.CharField(max_length=200, verbose_name='Título')
+    mensagem = models.TextField(blank=True, verbose_name='Mensagem')
+    link = models.CharField(max_length=200, verbose_name='Link')
+    tarefa_id = models.IntegerField(null=True, blank=True, verbose_name='ID da Tarefa')
+    obrigacao_id = models.IntegerField(null=True, blank=True, verbose_name='ID da Obrigação')
+    instrumento_id = models.IntegerField(null=True, blank=True, verbose_name='ID do Instrumento')
+    lida = models.BooleanField(default=False, verbose_name='Lida')
+    data_leitura = models.DateTimeField(null=True, blank=True, verbose_name='Data de Leitura')
+    data_criacao = models.DateTimeField(verbose_name='Data de Criação')
+    data_expiracao = models.DateTimeField(null=True, blank=True, verbose_name='Data de Expiração')
+    data_arquivamento = models.DateTimeField(auto_now_add=True, verbose_name='Data de Arquivamento')
+    
+    class Meta:
+        verbose_name = 'Notificação Arquivada'
+        verbose_name_plural = 'Notificações Arquivadas'
+    
+    def __str__(self):
+        return f"{self.usuario_id} - {self.titulo}"
 
 
 class PreferenciaNotificacao(models.Model):
@@ -271,3 +586,24 @@ class PreferenciaNotificacao(models.Model):
     def __str__(self):
         return f"Preferências de {self.usuario.username}"
 
+
+
+class TravaTarefa(models.Model):
+    """
+    Trava exclusiva das tarefas periódicas (ver alertas.tasks.trava)
+
+    Fica no banco, visível a todos os workers e processos, independente do
+    backend de cache. Uma linha por trava ativa; expira_em permite que uma
+    trava abandonada (worker morto) seja retomada.
+    """
+
+    nome = models.CharField(max_length=200, primary_key=True, verbose_name='Nome')
+    token = models.CharField(max_length=32, verbose_name='Token')
+    expira_em = models.DateTimeField(verbose_name='Expira em')
+
+    class Meta:
+        verbose_name = 'Trava de Tarefa'
+        verbose_name_plural = 'Travas de Tarefas'
+
+    def __str__(self):
+        return self.nome
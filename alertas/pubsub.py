@@ -0,0 +1,201 @@
+# ===== SISTEMA DE ALERTAS - PUB/SUB PARA PUSH (SSE) =====
+"""
+Canal de publicação/assinatura dos eventos de alertas por usuário
+
+Usado pelo endpoint SSE /alertas/stream/ (alertas.views.stream_alertas):
+toda criação/leitura/remoção de Notificacao publica um evento no canal do
+usuário com o total de não lidas e as notificações novas.
+
+Backends:
+- BackendLocal: em memória, no próprio processo (desenvolvimento/testes,
+  ou um único processo ASGI)
+- BackendRedis: Redis Pub/Sub, para vários processos/servidores;
+  usado quando ALERTAS_PUBSUB_URL (ou REDIS_URL) está definido
+
+Uso:
+    from alertas.pubsub import publicar_alteracoes, get_backend
+    publicar_alteracoes([usuario.id], novas=[notificacao])
+
+    async with get_backend().assinar(usuario.id) as assinatura:
+        evento = await assinatura.proximo(timeout=25)  # dict ou None
+"""
+
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+
+def canal(usuario_id):
+    return f'alertas:eventos:{usuario_id}'
+
+
+class AssinaturaLocal:
+    def __init__(self, backend, usuario_id):
+        self.backend = backend
+        self.usuario_id = usuario_id
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue()
+        self.backend.registrar(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.backend.remover(self)
+
+    def entregar(self, evento):
+        # Publicação pode vir de outra thread (views síncronas)
+        self.loop.call_soon_threadsafe(self.fila.put_nowait, evento)
+
+    async def proximo(self, timeout):
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BackendLocal:
+    """Pub/sub em memória, restrito ao processo atual"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.assinaturas = {}
+
+    def com_assinantes(self, usuario_ids):
+        with self.lock:
+            return {uid for uid in usuario_ids if self.assinaturas.get(uid)}
+
+    def publicar(self, usuario_id, evento):
+        with self.lock:
+            assinaturas = list(self.assinaturas.get(usuario_id, ()))
+        for assinatura in assinaturas:
+            assinatura.entregar(evento)
+
+    def registrar(self, assinatura):
+        with self.lock:
+            self.assinaturas.setdefault(assinatura.usuario_id, set()).add(assinatura)
+
+    def remover(self, assinatura):
+        with self.lock:
+            restantes = self.assinaturas.get(assinatura.usuario_id, set())
+            restantes.discard(assinatura)
+            if not restantes:
+                self.assinaturas.pop(assinatura.usuario_id, None)
+
+    def assinar(self, usuario_id):
+        return AssinaturaLocal(self, usuario_id)
+
+
+class AssinaturaRedis:
+    def __init__(self, url, usuario_id):
+        self.url = url
+        self.usuario_id = usuario_id
+
+    async def __aenter__(self):
+        import redis.asyncio
+
+        self.cliente = redis.asyncio.Redis.from_url(self.url)
+        self.pubsub = self.cliente.pubsub()
+        await self.pubsub.subscribe(canal(self.usuario_id))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.pubsub.unsubscribe()
+        await self.pubsub.aclose()
+        await self.cliente.aclose()
+
+    async def proximo(self, timeout):
+        mensagem = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if mensagem is None:
+            return None
+        return json.loads(mensagem['data'])
+
+
+class BackendRedis:
+    """Pub/sub via Redis (compartilhado entre processos)"""
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self.cliente = redis.Redis.from_url(url)
+
+    def com_assinantes(self, usuario_ids):
+        usuario_ids = list(usuario_ids)
+        if not usuario_ids:
+            return set()
+        contagens = dict(self.cliente.pubsub_numsub(*[canal(uid) for uid in usuario_ids]))
+        return {
+            uid for uid in usuario_ids
+            if contagens.get(canal(uid).encode(), 0)
+        }
+
+    def publicar(self, usuario_id, evento):
+        self.cliente.publish(canal(usuario_id), json.dumps(evento))
+
+    def assinar(self, usuario_id):
+        return AssinaturaRedis(self.url, usuario_id)
+
+
+_backend = None
+
+
+def get_backend():
+    """Backend configurado (instanciado uma vez por processo)"""
+    global _backend
+    if _backend is None:
+        url = getattr(settings, 'ALERTAS_PUBSUB_URL', None)
+        _backend = BackendRedis(url) if url else BackendLocal()
+    return _backend
+
+
+def publicar_alteracoes(usuario_ids, novas=()):
+    """
+    Publica, após o commit, o novo estado dos alertas de cada usuário
+
+    Só usuários com alguém assinando recebem evento; o total de não lidas
+    e a versão de todos eles saem de uma única consulta agrupada.
+    """
+    from .models import Notificacao
+    from .views import serializar_notificacao
+
+    usuario_ids = set(usuario_ids)
+    novas = list(novas)
+    if not usuario_ids:
+        return
+
+    def publicar():
+        backend = get_backend()
+        destinatarios = backend.com_assinantes(usuario_ids)
+        if not destinatarios:
+            return
+
+        # Recibos inseridos com ignore_conflicts voltam sem id: relê apenas
+        # os dos usuários conectados, pelo evento
+        recentes = [n for n in novas if n.usuario_id in destinatarios]
+        sem_id = {n.evento_id for n in recentes if n.pk is None}
+        if sem_id:
+            recentes = [n for n in recentes if n.pk is not None] + list(
+                Notificacao.objects.filter(
+                    usuario_id__in=destinatarios, evento_id__in=sem_id, lida=False
+                ).select_related('evento')
+            )
+
+        versoes = Notificacao.versoes_alertas(destinatarios)
+        for usuario_id in destinatarios:
+            total, versao = versoes[usuario_id]
+            backend.publicar(usuario_id, {
+                'total': total,
+                'versao': versao,
+                'novas': [
+                    serializar_notificacao(n) for n in recentes
+                    if n.usuario_id == usuario_id and not n.lida
+                ],
+            })
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,133 @@
+# ===== SISTEMA DE ALERTAS - RETENÇÃO E ARQUIVAMENTO =====
+"""
+Remoção de notificações antigas em lotes de chave primária
+
+Em vez de um único DELETE (que trava o SQLite durante toda a execução e
+faz o Django carregar cada linha para disparar os signals), as linhas são
+removidas em lotes de ALERTAS_RETENCAO_LOTE ids, cada um em sua própria
+transação, com uma pausa de ALERTAS_RETENCAO_PAUSA segundos entre eles.
+Eventos (NotificacaoEvento) que ficam sem nenhum recibo são removidos
+no mesmo lote.
+
+Antes de remover, cada lote pode ser copiado para:
+- 'tabela': NotificacaoArquivada (sem índices além da chave primária)
+- 'arquivo': JSONL compactado (gzip), um objeto por linha
+
+Uso:
+    from alertas.retencao import expurgar
+    relatorio = expurgar(Notificacao.objects.filter(lida=True), arquivar='arquivo')
+    # {'removidas': 12000, 'arquivadas': 12000, 'lotes': 12,
+    #  'segundos': 3.4, 'por_segundo': 3529.4, 'arquivo': '...jsonl.gz'}
+"""
+
+import gzip
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Campos do recibo e, via evento, do conteúdo (ver NotificacaoArquivada)
+CAMPOS_RECIBO = ('id', 'usuario_id', 'lida', 'data_leitura', 'data_criacao', 'data_expiracao')
+CAMPOS_CONTEUDO = (
+    'tipo', 'prioridade', 'titulo', 'mensagem', 'link',
+    'tarefa_id', 'obrigacao_id', 'instrumento_id',
+)
+
+DESTINOS_ARQUIVO = ('tabela', 'arquivo')
+
+
+def caminho_arquivo_padrao():
+    """<ALERTAS_RETENCAO_DIRETORIO>/notificacoes-AAAAMMDD.jsonl.gz"""
+    diretorio = Path(settings.ALERTAS_RETENCAO_DIRETORIO)
+    return diretorio / f'notificacoes-{timezone.localdate():%Y%m%d}.jsonl.gz'
+
+
+def arquivar_em_tabela(linhas):
+    from .models import NotificacaoArquivada
+
+    # ignore_conflicts: um lote reprocessado não duplica o arquivo
+    NotificacaoArquivada.objects.bulk_create(
+        [NotificacaoArquivada(**linha) for linha in linhas],
+        ignore_conflicts=True,
+    )
+
+
+def arquivar_em_arquivo(linhas, caminho):
+    with gzip.open(caminho, 'at', encoding='utf-8') as destino:
+        for linha in linhas:
+            destino.write(json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False))
+            destino.write('\n')
+
+
+def expurgar(queryset, lote=None, pausa=None, arquivar=None, arquivo=None):
+    """
+    Remove as notificações do queryset em lotes de chave primária
+
+    arquivar: None, 'tabela' ou 'arquivo' (arquivo: caminho do .jsonl.gz,
+    por padrão caminho_arquivo_padrao()). Retorna o relatório da execução.
+    """
+    from .models import Notificacao, NotificacaoEvento, apagar_por_id
+
+    lote = lote or settings.ALERTAS_RETENCAO_LOTE
+    pausa = settings.ALERTAS_RETENCAO_PAUSA if pausa is None else pausa
+    if arquivar not in (None, *DESTINOS_ARQUIVO):
+        raise ValueError(f'Destino de arquivamento inválido: {arquivar}')
+
+    if arquivar == 'arquivo':
+        arquivo = Path(arquivo or caminho_arquivo_padrao())
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+
+    conteudo = {campo: F(f'evento__{campo}') for campo in CAMPOS_CONTEUDO} if arquivar else {}
+    relatorio = {'removidas': 0, 'arquivadas': 0, 'lotes': 0}
+    inicio = time.perf_counter()
+    ultimo_id = 0
+
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+
+        if relatorio['lotes']:
+            time.sleep(pausa)
+
+        with transaction.atomic():
+            # Critério reaplicado: a linha pode ter mudado desde a seleção
+            alvo = queryset.filter(pk__in=ids).order_by()
+            linhas = list(alvo.values(*CAMPOS_RECIBO, 'evento_id', **conteudo))
+            if not linhas:
+                continue
+            evento_ids = {linha.pop('evento_id') for linha in linhas}
+
+            if arquivar == 'tabela':
+                arquivar_em_tabela(linhas)
+            elif arquivar == 'arquivo':
+                arquivar_em_arquivo(linhas, arquivo)
+
+            # DELETE direto, sem o Collector: não carrega as linhas nem
+            # dispara post_delete, por isso a invalidação é feita aqui
+            removidas = apagar_por_id(Notificacao, [linha['id'] for linha in linhas])
+            orfaos = NotificacaoEvento.objects.filter(pk__in=evento_ids).exclude(
+                pk__in=Notificacao.objects.filter(evento_id__in=evento_ids).values('evento_id')
+            ).values_list('pk', flat=True)
+            apagar_por_id(NotificacaoEvento, orfaos)
+            Notificacao.invalidar_alertas({linha['usuario_id'] for linha in linhas})
+
+        relatorio['removidas'] += removidas
+        relatorio['arquivadas'] += len(linhas) if arquivar else 0
+        relatorio['lotes'] += 1
+
+    segundos = time.perf_counter() - inicio
+    relatorio['segundos'] = round(segundos, 2)
+    relatorio['por_segundo'] = round(relatorio['removidas'] / segundos, 1) if segundos else 0.0
+    if arquivar == 'arquivo':
+        relatorio['arquivo'] = str(arquivo)
+    return relatorio
@@ -0,0 +1,251 @@
+# ===== SISTEMA DE ALERTAS - GERAÇÃO POR EVENTOS =====
+"""
+Reavaliação incremental de notificações a partir de alterações
+
+Os receivers abaixo observam Tarefa, Acao e Obrigacao (incluindo mudanças
+em Tarefa.executores) e enfileiram apenas os objetos/usuários afetados.
+A fila fica numa ContextVar (isolada por requisição também sob ASGI, onde
+várias requisições compartilham a mesma thread) e é processada uma única vez:
+
+- dentro de uma requisição: ao final dela (alertas.middleware.
+  ReavaliacaoMiddleware), coalescendo o save() do form, o save_m2m() e o
+  formset do checklist em uma só reavaliação;
+- fora de requisições (shell, comandos): no commit da transação;
+- dentro de "with adiar_reavaliacao():": ao sair do bloco.
+
+Processar a fila é entregar os ids à tarefa Celery reavaliar_notificacoes
+(alertas/tasks.py), após o commit e com ALERTAS_REAVALIACAO_ATRASO segundos
+de espera; a geração roda fora da requisição. Com CELERY_TASK_ALWAYS_EAGER
+(ou com o broker fora do ar) a reavaliação roda ali mesmo.
+
+Somente alterações confirmadas (transaction.on_commit) entram na fila.
+O comando gerar_notificacoes continua responsável pela virada de data
+(tarefas que passam a vencer/atrasar sem nenhuma alteração).
+
+Também invalida a versão (ETag) dos alertas e publica o evento de push
+(alertas/pubsub.py) quando uma Notificacao é salva ou removida.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from acoes.models import Acao, Tarefa
+from acoes.signals import tarefas_alteradas
+from instrumentos.models import Obrigacao
+from .models import Notificacao
+
+logger = logging.getLogger(__name__)
+
+
+class FilaReavaliacao:
+    """Objetos e atribuições pendentes de reavaliação"""
+
+    def __init__(self, adiamentos=0):
+        self.adiamentos = adiamentos
+        self.limpar()
+
+    def limpar(self):
+        self.tarefa_ids = set()
+        self.obrigacao_ids = set()
+        self.tarefas_novas = set()
+        self.atribuicoes = set()
+
+    def vazia(self):
+        return not (self.tarefa_ids or self.obrigacao_ids or self.atribuicoes)
+
+
+_fila = ContextVar('alertas_fila_reavaliacao', default=None)
+
+
+def fila_atual():
+    """Fila do contexto atual (requisição, thread ou tarefa assíncrona)"""
+    fila = _fila.get()
+    if fila is None:
+        fila = FilaReavaliacao()
+        _fila.set(fila)
+    return fila
+
+
+def processar_fila(fila=None):
+    """Esvazia a fila pendente e agenda a reavaliação (após o commit)"""
+    from .tasks import reavaliar_notificacoes
+
+    fila = fila or fila_atual()
+    if fila.vazia():
+        return
+
+    # Listas: os argumentos da tarefa vão em JSON
+    dados = {
+        'tarefa_ids': list(fila.tarefa_ids),
+        'obrigacao_ids': list(fila.obrigacao_ids),
+        'atribuicoes': list(fila.atribuicoes),
+    }
+    fila.limpar()
+
+    if settings.CELERY_TASK_ALWAYS_EAGER:
+        reavaliar(**dados)
+        return
+
+    def agendar():
+        try:
+            reavaliar_notificacoes.apply_async(kwargs=dados, countdown=settings.ALERTAS_REAVALIACAO_ATRASO)
+        except Exception:
+            # Broker indisponível: as alterações não podem ficar sem alerta
+            logger.exception('Falha ao agendar a reavaliação de notificações')
+            reavaliar(**dados)
+
+    transaction.on_commit(agendar)
+
+
+def reavaliar(tarefa_ids=(), obrigacao_ids=(), atribuicoes=()):
+    """Gera as notificações dos objetos e atribuições informados"""
+    from .geracao import notificar_atribuicoes, reavaliar_objetos
+
+    try:
+        notificar_atribuicoes({tuple(atribuicao) for atribuicao in atribuicoes})
+        reavaliar_objetos(tarefa_ids=set(tarefa_ids), obrigacao_ids=set(obrigacao_ids))
+    except Exception:
+        logger.exception('Falha ao reavaliar notificações')
+
+
+def enfileirar(tarefa_ids=(), obrigacao_ids=(), atribuicoes=()):
+    """Adiciona à fila após o commit e agenda o processamento"""
+    # Fila de quem alterou, ainda que o commit rode em outro contexto
+    fila = fila_atual()
+
+    def adicionar():
+        fila.tarefa_ids.update(tarefa_ids)
+        fila.obrigacao_ids.update(obrigacao_ids)
+        for usuario_id, tarefa_id in atribuicoes:
+            # Executores incluídos junto com a criação recebem "tarefa_nova"
+            tipo = 'tarefa_nova' if tarefa_id in fila.tarefas_novas else 'atribuicao'
+            fila.atribuicoes.add((usuario_id, tipo, tarefa_id))
+        if not fila.adiamentos:
+            processar_fila(fila)
+
+    transaction.on_commit(adicionar)
+
+
+@contextmanager
+def adiar_reavaliacao():
+    """
+    Acumula as reavaliações do bloco e processa uma única vez ao final
+
+    Uso:
+        with adiar_reavaliacao():
+            for tarefa in tarefas:
+                tarefa.save()
+    """
+    fila = fila_atual()
+    fila.adiamentos += 1
+    try:
+        yield
+    finally:
+        fila.adiamentos -= 1
+        if not fila.adiamentos:
+            processar_fila(fila)
+
+
+@contextmanager
+def fila_da_requisicao():
+    """
+    Fila própria para uma requisição, processada ao final dela
+
+    Usada por alertas.middleware.ReavaliacaoMiddleware.
+    """
+    fila = FilaReavaliacao(adiamentos=1)
+    token = _fila.set(fila)
+    try:
+        yield fila
+    finally:
+        _fila.reset(token)
+        fila.adiamentos = 0
+        processar_fila(fila)
+
+
+# ===== TAREFA =====
+
+@receiver(post_init, sender=Tarefa)
+def guardar_responsavel_original(sender, instance, **kwargs):
+    # __dict__ evita disparar consulta quando o campo foi adiado (.only())
+    instance._responsavel_original = instance.__dict__.get('responsavel_id')
+
+
+@receiver(post_save, sender=Tarefa)
+def tarefa_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    responsavel_anterior = getattr(instance, '_responsavel_original', None)
+    instance._responsavel_original = instance.responsavel_id
+
+    atribuicoes = []
+    if created:
+        fila_atual().tarefas_novas.add(instance.id)
+        atribuicoes.append((instance.responsavel_id, instance.id))
+    elif responsavel_anterior is not None and responsavel_anterior != instance.responsavel_id:
+        atribuicoes.append((instance.responsavel_id, instance.id))
+
+    enfileirar(tarefa_ids=[instance.id], atribuicoes=atribuicoes)
+
+
+@receiver(m2m_changed, sender=Tarefa.executores.through)
+def executores_alterados(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+
+    if reverse:
+        # usuario.tarefas_executor.add(...): instance é o usuário
+        atribuicoes = [(instance.pk, tarefa_id) for tarefa_id in pk_set]
+    else:
+        atribuicoes = [(usuario_id, instance.pk) for usuario_id in pk_set]
+
+    enfileirar(
+        tarefa_ids={tarefa_id for _, tarefa_id in atribuicoes},
+        atribuicoes=atribuicoes,
+    )
+
+
+@receiver(tarefas_alteradas)
+def tarefas_alteradas_em_lote(sender, tarefa_ids, obrigacao_ids=(), **kwargs):
+    # Alterações por queryset.update() (ex.: transições do Kanban)
+    enfileirar(tarefa_ids=tarefa_ids, obrigacao_ids=obrigacao_ids)
+
+
+# ===== AÇÃO / OBRIGAÇÃO =====
+
+@receiver(post_save, sender=Acao)
+def acao_salva(sender, instance, raw=False, **kwargs):
+    # O responsável da ação é destinatário dos alertas da obrigação
+    if raw or not instance.obrigacao_id:
+        return
+    enfileirar(obrigacao_ids=[instance.obrigacao_id])
+
+
+@receiver(post_save, sender=Obrigacao)
+def obrigacao_salva(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    enfileirar(obrigacao_ids=[instance.id])
+
+
+# ===== NOTIFICAÇÃO =====
+
+@receiver(post_save, sender=Notificacao)
+def notificacao_salva(sender, instance, created=False, **kwargs):
+    # Invalida o ETag de /alertas/ e publica a notificação nova (SSE)
+    Notificacao.invalidar_alertas(
+        [instance.usuario_id],
+        novas=[instance] if created else (),
+    )
+
+
+@receiver(post_delete, sender=Notificacao)
+def notificacao_removida(sender, instance, **kwargs):
+    Notificacao.invalidar_alertas([instance.usuario_id])
@@ -0,0 +1,140 @@
+# ===== SISTEMA DE ALERTAS - TAREFAS CELERY =====
+"""
+Tarefas Celery da geração de notificações
+
+- gerar_notificacoes_todas: divide os usuários ativos em faixas de id
+  (ALERTAS_TAMANHO_FAIXA) e dispara uma gerar_notificacoes_faixa por
+  faixa, processadas em paralelo pelos workers
+- gerar_notificacoes_faixa: gera as notificações de uma faixa, protegida
+  por uma trava no banco para que execuções não se sobreponham
+- limpar_notificacoes: remove notificações lidas antigas e expiradas, em
+  lotes e opcionalmente arquivando (ver alertas/retencao.py)
+- reavaliar_notificacoes: reavalia os objetos alterados numa requisição
+  ou transação, agendada pelos signals (ver alertas/signals.py)
+- enviar_resumos_email: envia os e-mails de uma frequência (imediato,
+  diario ou semanal) por uma única conexão SMTP (ver alertas/emails.py)
+
+O agendamento fica no DatabaseScheduler do django_celery_beat
+(ver alertas/migrations/0003_agendar_tarefas_periodicas.py) e pode ser
+ajustado pela tela de Periodic Tasks.
+
+Com CELERY_TASK_ALWAYS_EAGER=True tudo roda na própria thread, sem Redis.
+"""
+
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from celery import group, shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .emails import enviar_resumos
+from .geracao import gerar_notificacoes
+from .models import Notificacao, TravaTarefa
+from .signals import reavaliar
+
+
+@contextmanager
+def trava(nome, timeout):
+    """
+    Trava exclusiva numa linha de TravaTarefa, compartilhada por todos os
+    processos (o cache padrão é LocMem, um por processo)
+
+    Retorna True se a trava foi obtida; uma trava vencida (dona morta ou
+    lenta demais) é retomada por UPDATE condicional. Só libera se ainda
+    for a dona.
+    """
+    token = uuid.uuid4().hex
+    agora = timezone.now()
+    expira_em = agora + timedelta(seconds=timeout)
+
+    obtida = bool(
+        TravaTarefa.objects.filter(nome=nome, expira_em__lte=agora).update(token=token, expira_em=expira_em)
+    )
+    if not obtida:
+        try:
+            with transaction.atomic():
+                TravaTarefa.objects.create(nome=nome, token=token, expira_em=expira_em)
+            obtida = True
+        except IntegrityError:
+            obtida = False
+    try:
+        yield obtida
+    finally:
+        if obtida:
+            TravaTarefa.objects.filter(nome=nome, token=token).delete()
+
+
+def calcular_faixas(tamanho):
+    """
+    Faixas [inicio, fim) de ids dos usuários ativos, alinhadas em múltiplos
+    de tamanho — execuções concorrentes calculam as mesmas faixas e,
+    portanto, disputam as mesmas travas
+    """
+    limites = get_user_model().objects.filter(is_active=True).aggregate(
+        inicio=Min('id'), fim=Max('id')
+    )
+    if limites['inicio'] is None:
+        return []
+
+    return [
+        (indice * tamanho, (indice + 1) * tamanho)
+        for indice in range(limites['inicio'] // tamanho, limites['fim'] // tamanho + 1)
+    ]
+
+
+@shared_task(ignore_result=True)
+def gerar_notificacoes_todas(tamanho_faixa=None):
+    """Dispara a geração de notificações particionada por faixa de usuários"""
+    faixas = calcular_faixas(tamanho_faixa or settings.ALERTAS_TAMANHO_FAIXA)
+    if faixas:
+        group(
+            gerar_notificacoes_faixa.s(inicio, fim) for inicio, fim in faixas
+        ).apply_async()
+    return len(faixas)
+
+
+@shared_task(ignore_result=True)
+def gerar_notificacoes_faixa(inicio, fim):
+    """Gera as notificações dos usuários com id em [inicio, fim)"""
+    with trava(f'faixa:{inicio}:{fim}', settings.ALERTAS_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True, 'faixa': [inicio, fim]}
+
+        resultado = gerar_notificacoes(faixa_usuarios=(inicio, fim))
+        resultado['faixa'] = [inicio, fim]
+        return resultado
+
+
+@shared_task(ignore_result=True)
+def reavaliar_notificacoes(tarefa_ids=(), obrigacao_ids=(), atribuicoes=()):
+    """Gera as notificações das tarefas, obrigações e atribuições alteradas"""
+    reavaliar(tarefa_ids=tarefa_ids, obrigacao_ids=obrigacao_ids, atribuicoes=atribuicoes)
+
+
+@shared_task(ignore_result=True)
+def limpar_notificacoes(dias=30):
+    """Remove notificações lidas há mais de X dias e as expiradas, em lotes"""
+    with trava('limpeza', settings.ALERTAS_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True}
+
+        arquivar = settings.ALERTAS_RETENCAO_ARQUIVAR
+        return {
+            'lidas': Notificacao.limpar_antigas_lidas(dias=dias, arquivar=arquivar),
+            'expiradas': Notificacao.limpar_expiradas(arquivar=arquivar),
+        }
+
+
+@shared_task(ignore_result=True)
+def enviar_resumos_email(frequencia):
+    """Envia os resumos por e-mail dos usuários com a frequência informada"""
+    with trava(f'email:{frequencia}', settings.ALERTAS_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True}
+
+        return enviar_resumos(frequencia)
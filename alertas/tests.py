@@ -1,3 +1,542 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from acoes.models import Tarefa
+from acoes.tests import HOJE, criar_estrutura, criar_tarefa
+from config.celery import app
+from instrumentos.models import Obrigacao
+
+from . import signals, tasks
+from .emails import enviar_resumos
+from .geracao import candidatos_obrigacoes, candidatos_tarefas, gerar_notificacoes
+from .models import (
+    Notificacao, NotificacaoArquivada, NotificacaoEvento, PreferenciaNotificacao, TravaTarefa,
+)
+from .retencao import expurgar
+
+
+class StreamAlertasTests(TestCase):
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user('alerta', password='x', perfil=0)
+        self.client.force_login(self.usuario)
+
+    def test_sse_desligado_responde_204(self):
+        resposta = self.client.get('/alertas/stream/')
+        self.assertEqual(resposta.status_code, 204)
+
+    @override_settings(ALERTAS_SSE_ATIVO=True, ALERTAS_PUBSUB_URL=None)
+    def test_sse_sem_pubsub_compartilhado_responde_204(self):
+        resposta = self.client.get('/alertas/stream/')
+        self.assertEqual(resposta.status_code, 204)
+
+
+class EtagAlertasTests(TestCase):
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user('etag', password='x', perfil=0)
+        self.client.force_login(self.usuario)
+
+    def notificar(self, titulo):
+        return Notificacao.criar_notificacao(
+            usuario=self.usuario, tipo='sistema', titulo=titulo, mensagem='m', link='/'
+        )
+
+    def test_304_enquanto_nada_muda(self):
+        self.notificar('A')
+        resposta = self.client.get('/alertas/')
+        self.assertEqual(resposta.status_code, 200)
+        etag = resposta['ETag']
+
+        with self.assertNumQueries(3):  # sessão, usuário e versão
+            resposta = self.client.get('/alertas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_versao_muda_com_escrita_de_outro_processo(self):
+        # Sem sinais nem cache: simula o cron/Celery ou outro worker
+        notificacao = self.notificar('A')
+        etag = self.client.get('/alertas/')['ETag']
+
+        Notificacao.objects.filter(pk=notificacao.pk).update(lida=True, data_atualizacao=timezone.now())
+        resposta = self.client.get('/alertas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['total'], 0)
+
+    def test_versao_muda_com_nova_notificacao(self):
+        antes = Notificacao.versao_alertas(self.usuario.pk)
+        self.notificar('B')
+        self.assertNotEqual(Notificacao.versao_alertas(self.usuario.pk), antes)
+
+
+class SincronizacaoNotificacoesTests(TestCase):
+    """Cursores de /alertas/delta/ e /alertas/historico/"""
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user('delta', password='x', perfil=0)
+        self.client.force_login(self.usuario)
+        self.notificacoes = [
+            Notificacao.criar_notificacao(
+                usuario=self.usuario, tipo='sistema', titulo=f'N{indice}', mensagem='m', link=f'/{indice}'
+            )
+            for indice in range(5)
+        ]
+        # Mesmo instante em todas: o desempate é pelo id
+        instante = timezone.now() - timedelta(minutes=5)
+        Notificacao.objects.update(data_criacao=instante, data_atualizacao=instante)
+
+    def delta(self, **parametros):
+        return self.client.get('/alertas/delta/', parametros).json()
+
+    def test_delta_pagina_pelo_cursor_sem_repetir(self):
+        titulos = []
+        dados = self.delta(limite=2)
+        while True:
+            titulos.extend(item['titulo'] for item in dados['itens'])
+            if not dados['mais']:
+                break
+            dados = self.delta(limite=2, cursor=dados['cursor'])
+        self.assertEqual(titulos, ['N0', 'N1', 'N2', 'N3', 'N4'])
+
+        # Nada mudou: o mesmo cursor volta e sem itens
+        vazio = self.delta(cursor=dados['cursor'])
+        self.assertEqual((vazio['itens'], vazio['cursor'], vazio['nao_lidas']), ([], dados['cursor'], 5))
+
+    def test_delta_traz_leituras_e_notificacoes_novas(self):
+        cursor = self.delta()['cursor']
+        self.notificacoes[1].marcar_como_lida()
+        nova = Notificacao.criar_notificacao(
+            usuario=self.usuario, tipo='sistema', titulo='Nova', mensagem='m', link='/nova'
+        )
+
+        dados = self.delta(cursor=cursor)
+        self.assertEqual(
+            [(item['id'], item['lida']) for item in dados['itens']],
+            [(self.notificacoes[1].pk, True), (nova.pk, False)],
+        )
+        self.assertEqual(dados['nao_lidas'], 5)
+
+    def test_delta_sem_cursor_comeca_pelas_nao_lidas(self):
+        self.notificacoes[0].marcar_como_lida()
+        dados = self.delta()
+        self.assertEqual([item['titulo'] for item in dados['itens']], ['N1', 'N2', 'N3', 'N4'])
+
+    def test_historico_pagina_do_mais_recente_para_o_mais_antigo(self):
+        self.notificacoes[4].marcar_como_lida()
+        titulos = []
+        parametros = {'limite': 2}
+        while True:
+            dados = self.client.get('/alertas/historico/', parametros).json()
+            titulos.extend(item['titulo'] for item in dados['notificacoes'])
+            if not dados['proximo']:
+                break
+            parametros['antes'] = dados['proximo']
+        self.assertEqual(titulos, ['N4', 'N3', 'N2', 'N1', 'N0'])
+
+        dados = self.client.get('/alertas/historico/', {'lidas': 'nao', 'limite': 2}).json()
+        self.assertEqual([item['titulo'] for item in dados['notificacoes']], ['N3', 'N2'])
+
+
+class RetencaoTests(TestCase):
+    def setUp(self):
+        self.usuarios = [
+            get_user_model().objects.create_user(f'ret{indice}', password='x', perfil=0) for indice in range(2)
+        ]
+        # Evento compartilhado pelos dois e um evento por notificação avulsa
+        NotificacaoEvento.publicar(
+            [u.pk for u in self.usuarios], tipo='obrigacao_vencendo', titulo='Comum', link='/o/1', obrigacao_id=1
+        )
+        for indice in range(3):
+            Notificacao.criar_notificacao(
+                usuario=self.usuarios[0], tipo='sistema', titulo=f'Avulsa {indice}', mensagem='m', link='/'
+            )
+        Notificacao.objects.update(lida=True)
+
+    def test_remove_em_lotes_e_os_eventos_sem_recibos(self):
+        relatorio = expurgar(Notificacao.objects.filter(usuario=self.usuarios[0]), lote=2, pausa=0)
+
+        self.assertEqual((relatorio['removidas'], relatorio['lotes'], relatorio['arquivadas']), (4, 2, 0))
+        # O evento comum continua: ainda há o recibo do outro usuário
+        self.assertEqual(list(NotificacaoEvento.objects.values_list('titulo', flat=True)), ['Comum'])
+        self.assertEqual(Notificacao.objects.get().usuario, self.usuarios[1])
+
+    def test_criterio_reaplicado_a_cada_lote(self):
+        # Alterada entre a seleção dos ids do lote e a remoção (na pausa)
+        def reabrir(segundos):
+            Notificacao.objects.filter(evento__titulo='Avulsa 0').update(lida=False)
+
+        with mock.patch('alertas.retencao.time.sleep', side_effect=reabrir):
+            relatorio = expurgar(Notificacao.objects.filter(lida=True), lote=2, pausa=1)
+        self.assertEqual(relatorio['removidas'], 4)
+        self.assertEqual(list(Notificacao.objects.values_list('evento__titulo', flat=True)), ['Avulsa 0'])
+
+    def test_arquiva_em_tabela(self):
+        relatorio = expurgar(Notificacao.objects.all(), lote=3, pausa=0, arquivar='tabela')
+
+        self.assertEqual((relatorio['removidas'], relatorio['arquivadas']), (5, 5))
+        self.assertFalse(NotificacaoEvento.objects.exists())
+        arquivadas = NotificacaoArquivada.objects.filter(titulo='Comum')
+        self.assertEqual(
+            sorted(arquivadas.values_list('usuario_id', 'tipo', 'link', 'obrigacao_id', 'lida')),
+            [(u.pk, 'obrigacao_vencendo', '/o/1', 1, True) for u in self.usuarios],
+        )
+
+    def test_arquiva_em_arquivo(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        caminho = Path(pasta.name) / 'sub' / 'notificacoes.jsonl.gz'
+
+        relatorio = expurgar(Notificacao.objects.all(), lote=2, pausa=0, arquivar='arquivo', arquivo=caminho)
+
+        self.assertEqual(relatorio['arquivo'], str(caminho))
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            linhas = [json.loads(linha) for linha in arquivo]
+        self.assertEqual(len(linhas), 5)
+        self.assertEqual(sorted(linha['titulo'] for linha in linhas)[:2], ['Avulsa 0', 'Avulsa 1'])
+        self.assertFalse(Notificacao.objects.exists())
+
+    def test_destino_invalido(self):
+        with self.assertRaises(ValueError):
+            expurgar(Notificacao.objects.all(), arquivar='s3')
+
+
+class FalhaNoEnvio(EmailBackend):
+    """locmem que aceita `aceitas` mensagens e depois derruba a conexão"""
+
+    aceitas = 1
+
+    def send_messages(self, messages):
+        if len(mail.outbox) >= self.aceitas:
+            raise ConnectionError('SMTP fora do ar')
+        return super().send_messages(messages)
+
+
+class ResumosEmailTests(TestCase):
+    def setUp(self):
+        self.usuarios = []
+        for indice in range(3):
+            usuario = get_user_model().objects.create_user(
+                f'email{indice}', email=f'email{indice}@agems.ms.gov.br', password='x', perfil=0
+            )
+            PreferenciaNotificacao.objects.update_or_create(
+                usuario=usuario, defaults={'enviar_email': True, 'frequencia_email': 'diario'}
+            )
+            for numero in range(2):
+                Notificacao.criar_notificacao(
+                    usuario=usuario, tipo='sistema', titulo=f'Aviso {indice}.{numero}', mensagem='m', link='/'
+                )
+            self.usuarios.append(usuario)
+
+    def enviadas(self):
+        return Notificacao.objects.filter(data_envio_email__isnull=False).count()
+
+    def test_um_resumo_por_usuario_e_nada_reenviado(self):
+        resultado = enviar_resumos('diario', lote=2)
+
+        self.assertEqual(resultado, {'emails': 3, 'notificacoes': 6})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [u.email for u in self.usuarios])
+        self.assertIn('Aviso 0.1', mail.outbox[0].body)
+        self.assertEqual(self.enviadas(), 6)
+
+        self.assertEqual(enviar_resumos('diario'), {'emails': 0, 'notificacoes': 0})
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_so_a_frequencia_pedida_e_as_nao_lidas(self):
+        PreferenciaNotificacao.objects.filter(usuario=self.usuarios[0]).update(frequencia_email='semanal')
+        Notificacao.objects.filter(usuario=self.usuarios[1]).update(lida=True)
+        get_user_model().objects.filter(pk=self.usuarios[2].pk).update(email='')
+
+        self.assertEqual(enviar_resumos('diario'), {'emails': 0, 'notificacoes': 0})
+        self.assertEqual(enviar_resumos('semanal')['emails'], 1)
+
+    def test_falha_no_meio_marca_so_o_que_saiu(self):
+        with override_settings(EMAIL_BACKEND='alertas.tests.FalhaNoEnvio'):
+            with self.assertRaises(ConnectionError):
+                enviar_resumos('diario', lote=100)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(
+            set(Notificacao.objects.filter(data_envio_email__isnull=False).values_list('usuario_id', flat=True)),
+            {self.usuarios[0].pk},
+        )
+        # A próxima execução envia só o que faltou
+        self.assertEqual(enviar_resumos('diario'), {'emails': 2, 'notificacoes': 4})
+
+    def test_mensagem_recusada_nao_e_marcada(self):
+        with mock.patch.object(EmailBackend, 'send_messages', return_value=0):
+            self.assertEqual(enviar_resumos('diario'), {'emails': 0, 'notificacoes': 0})
+        self.assertEqual(self.enviadas(), 0)
+
+
+class TravaTests(TestCase):
+    def test_exclusiva_enquanto_ativa(self):
+        with tasks.trava('teste', 60) as primeira:
+            with tasks.trava('teste', 60) as segunda:
+                self.assertTrue(primeira)
+                self.assertFalse(segunda)
+        self.assertFalse(TravaTarefa.objects.exists())
+
+    def test_retoma_trava_vencida(self):
+        TravaTarefa.objects.create(nome='teste', token='morto', expira_em=timezone.now() - timedelta(seconds=1))
+        with tasks.trava('teste', 60) as obtida:
+            self.assertTrue(obtida)
+            self.assertNotEqual(TravaTarefa.objects.get(nome='teste').token, 'morto')
+
+    def test_nao_libera_trava_de_outro_dono(self):
+        with tasks.trava('teste', 60) as obtida:
+            self.assertTrue(obtida)
+            # Trava retomada por outro worker depois de vencer
+            TravaTarefa.objects.filter(nome='teste').update(token='outro')
+        self.assertTrue(TravaTarefa.objects.filter(nome='teste', token='outro').exists())
+
+
+class TarefasEagerTests(TestCase):
+    """Tarefas Celery com CELERY_TASK_ALWAYS_EAGER: tudo na própria thread"""
+
+    def setUp(self):
+        # Conf do Celery lida de settings com o prefixo CELERY_
+        eager = app.conf.CELERY_TASK_ALWAYS_EAGER
+        app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, app.conf, 'CELERY_TASK_ALWAYS_EAGER', eager)
+
+        self.dados = criar_estrutura()
+        hoje = timezone.now().date()
+        criar_tarefa(self.dados.acao, 'vence hoje', hoje - timedelta(days=3), hoje)
+        # Começa sem as notificações criadas pelos signals
+        Notificacao.objects.all().delete()
+
+    def test_gera_notificacoes_de_todas_as_faixas(self):
+        tasks.gerar_notificacoes_todas.delay(tamanho_faixa=1)
+        self.assertEqual(Notificacao.objects.filter(usuario=self.dados.usuario).count(), 1)
+        self.assertFalse(TravaTarefa.objects.exists())
+
+        # Segunda execução: nada novo (deduplicação) e travas livres
+        tasks.gerar_notificacoes_todas.delay(tamanho_faixa=1)
+        self.assertEqual(Notificacao.objects.filter(usuario=self.dados.usuario).count(), 1)
+
+    def test_faixa_travada_e_ignorada(self):
+        inicio = self.dados.usuario.pk
+        with tasks.trava(f'faixa:{inicio}:{inicio + 1}', 60):
+            resultado = tasks.gerar_notificacoes_faixa.delay(inicio, inicio + 1).get()
+        self.assertEqual(resultado, {'ignorada': True, 'faixa': [inicio, inicio + 1]})
+        self.assertFalse(Notificacao.objects.exists())
+
+    def test_limpeza(self):
+        resultado = tasks.limpar_notificacoes.delay().get()
+        self.assertEqual(set(resultado), {'lidas', 'expiradas'})
+
+
+class CandidatosPorFaixaTests(TestCase):
+    """Cada partição lê só os objetos dos seus usuários"""
+
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.outra = criar_estrutura('2')
+        self.minha = criar_tarefa(self.dados.acao, 'minha', HOJE - timedelta(days=3), HOJE)
+        self.alheia = criar_tarefa(self.outra.acao, 'alheia', HOJE - timedelta(days=3), HOJE)
+        Tarefa.objects.update(status='em_andamento')
+        Obrigacao.objects.update(status='pendente', data_vencimento=HOJE + timedelta(days=2))
+
+    def faixa(self, usuario):
+        return (usuario.pk, usuario.pk + 1)
+
+    def test_tarefas_do_responsavel_ou_executor_na_faixa(self):
+        tarefas, candidatos = candidatos_tarefas(HOJE, faixa_usuarios=self.faixa(self.dados.usuario))
+        self.assertEqual(set(tarefas), {self.minha.pk})
+        self.assertEqual(candidatos, {(self.dados.usuario.pk, 'tarefa_vencendo_hoje', self.minha.pk)})
+
+        self.alheia.executores.add(self.dados.usuario)
+        tarefas, candidatos = candidatos_tarefas(HOJE, faixa_usuarios=self.faixa(self.dados.usuario))
+        self.assertEqual(set(tarefas), {self.minha.pk, self.alheia.pk})
+        # O responsável de fora da faixa fica para a partição dele
+        self.assertNotIn((self.outra.usuario.pk, 'tarefa_vencendo_hoje', self.alheia.pk), candidatos)
+
+    def test_obrigacoes_com_acao_de_responsavel_na_faixa(self):
+        obrigacoes, candidatos = candidatos_obrigacoes(HOJE, faixa_usuarios=self.faixa(self.outra.usuario))
+        self.assertEqual(set(obrigacoes), {self.outra.obrigacao.pk})
+        self.assertEqual(candidatos, {(self.outra.usuario.pk, 'obrigacao_vencendo', self.outra.obrigacao.pk)})
+
+    def test_particoes_somam_o_mesmo_que_a_execucao_inteira(self):
+        _, todos = candidatos_tarefas(HOJE)
+        _, primeira = candidatos_tarefas(HOJE, faixa_usuarios=self.faixa(self.dados.usuario))
+        _, segunda = candidatos_tarefas(HOJE, faixa_usuarios=self.faixa(self.outra.usuario))
+        self.assertEqual(primeira | segunda, todos)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+@mock.patch('alertas.geracao.notificar_atribuicoes')
+@mock.patch('alertas.geracao.reavaliar_objetos')
+class FilaReavaliacaoTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+
+    def test_requisicao_reavalia_uma_vez_ao_final(self, reavaliar, notificar):
+        with signals.fila_da_requisicao():
+            with self.captureOnCommitCallbacks(execute=True):
+                tarefa = criar_tarefa(self.dados.acao, 'A', timezone.now().date(), timezone.now().date())
+                tarefa.executores.add(self.dados.usuario)
+            reavaliar.assert_not_called()
+
+        reavaliar.assert_called_once_with(tarefa_ids={tarefa.pk}, obrigacao_ids=set())
+        self.assertEqual(
+            notificar.call_args.args[0], {(self.dados.usuario.pk, 'tarefa_nova', tarefa.pk)}
+        )
+
+    def test_fora_de_requisicao_reavalia_no_commit(self, reavaliar, notificar):
+        with self.captureOnCommitCallbacks(execute=True):
+            tarefa = criar_tarefa(self.dados.acao, 'A', timezone.now().date(), timezone.now().date())
+        reavaliar.assert_called_once_with(tarefa_ids={tarefa.pk}, obrigacao_ids=set())
+
+    def test_requisicoes_na_mesma_thread_nao_compartilham_fila(self, reavaliar, notificar):
+        # Sob ASGI as requisições se intercalam no mesmo event loop
+        async def requisicao(tarefa_id):
+            with signals.fila_da_requisicao() as fila:
+                signals.fila_atual().tarefa_ids.add(tarefa_id)
+                await asyncio.sleep(0)
+                self.assertEqual(fila.tarefa_ids, {tarefa_id})
+
+        async def concorrentes():
+            await asyncio.gather(requisicao(1), requisicao(2))
+
+        asyncio.run(concorrentes())
+        self.assertEqual(
+            sorted(sorted(c.kwargs['tarefa_ids']) for c in reavaliar.call_args_list), [[1], [2]]
+        )
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    @mock.patch('dashboards.snapshots.agendar_atualizacao')
+    def test_fora_do_modo_eager_agenda_a_tarefa_apos_o_commit(self, _snapshots, reavaliar, notificar):
+        with mock.patch.object(tasks.reavaliar_notificacoes, 'apply_async') as agendar:
+            with self.captureOnCommitCallbacks() as callbacks:
+                with signals.fila_da_requisicao():
+                    with self.captureOnCommitCallbacks(execute=True):
+                        tarefa = criar_tarefa(self.dados.acao, 'A', timezone.now().date(), timezone.now().date())
+            # Ao final da requisição o agendamento espera o commit
+            agendar.assert_not_called()
+            callbacks[-1]()
+
+        reavaliar.assert_not_called()
+        agendar.assert_called_once()
+        dados = agendar.call_args.kwargs['kwargs']
+        self.assertEqual(dados['tarefa_ids'], [tarefa.pk])
+        self.assertEqual(dados['atribuicoes'], [(self.dados.usuario.pk, 'tarefa_nova', tarefa.pk)])
+
+        # Executada pelo worker, com os argumentos vindos do JSON
+        tasks.reavaliar_notificacoes(**json.loads(json.dumps(dados)))
+        reavaliar.assert_called_once_with(tarefa_ids={tarefa.pk}, obrigacao_ids=set(dados['obrigacao_ids']))
+        notificar.assert_called_once_with({(self.dados.usuario.pk, 'tarefa_nova', tarefa.pk)})
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    @mock.patch('dashboards.snapshots.agendar_atualizacao')
+    def test_sem_broker_reavalia_na_hora(self, _snapshots, reavaliar, notificar):
+        with mock.patch.object(tasks.reavaliar_notificacoes, 'apply_async', side_effect=ConnectionError):
+            with self.assertLogs('alertas.signals', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                tarefa = criar_tarefa(self.dados.acao, 'A', timezone.now().date(), timezone.now().date())
+        reavaliar.assert_any_call(tarefa_ids={tarefa.pk}, obrigacao_ids=set())
+
+class GeracaoConflitosTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+        criar_tarefa(self.dados.acao, 'vence hoje', HOJE - timedelta(days=3), HOJE)
+        Notificacao.objects.all().delete()
+        NotificacaoEvento.objects.all().delete()
+
+    def test_reexecucao_nao_cria_nada(self):
+        self.assertEqual(gerar_notificacoes(hoje=HOJE)['total'], 1)
+        self.assertEqual(gerar_notificacoes(hoje=HOJE), {'total': 0, 'por_tipo': {}})
+        self.assertEqual(NotificacaoEvento.objects.count(), 1)
+
+    def test_conta_so_o_que_a_restricao_unica_deixou_inserir(self):
+        gerar_notificacoes(hoje=HOJE)
+        # Execução concorrente: leu as não lidas antes da outra gravar
+        with mock.patch('alertas.geracao.notificacoes_nao_lidas', return_value=set()):
+            resultado = gerar_notificacoes(hoje=HOJE)
+
+        self.assertEqual(resultado, {'total': 0, 'por_tipo': {}})
+        self.assertEqual(Notificacao.objects.count(), 1)
+        # Sem eventos órfãos (todos os recibos conflitaram)
+        self.assertEqual(NotificacaoEvento.objects.count(), 1)
+
+    def test_publicar_devolve_os_recibos_inseridos(self):
+        outro = get_user_model().objects.create_user('outro', password='x', perfil=0)
+        dados = {'tipo': 'obrigacao_vencendo', 'titulo': 'T', 'link': '/', 'obrigacao_id': 1}
+        NotificacaoEvento.publicar([self.dados.usuario.pk], **dados)
+
+        recibos = NotificacaoEvento.publicar([self.dados.usuario.pk, outro.pk], **dados)
+        self.assertEqual([r.usuario_id for r in recibos], [outro.pk])
+        self.assertEqual(NotificacaoEvento.publicar([outro.pk], **dados), [])
+        self.assertEqual(NotificacaoEvento.objects.count(), 2)
+
+
+class MigracoesTests(TransactionTestCase):
+    """Migrações de dados de alertas, aplicadas e revertidas"""
+
+    def setUp(self):
+        self.addCleanup(self.migrar)
+
+    def migrar(self, *destino):
+        """Leva alertas ao destino informado (padrão: a última migração)"""
+        executor = MigrationExecutor(connection)
+        alvos = [destino] if destino else executor.loader.graph.leaf_nodes()
+        executor.migrate(alvos)
+        executor.loader.build_graph()
+        return executor.loader.project_state(alvos).apps
+
+    def test_reverter_eventos_devolve_o_conteudo_aos_recibos(self):
+        usuarios = [
+            get_user_model().objects.create_user(f'mig{indice}', password='x', perfil=0) for indice in range(2)
+        ]
+        NotificacaoEvento.publicar(
+            [u.pk for u in usuarios], tipo='obrigacao_vencendo', titulo='Vence', mensagem='m',
+            link='/o/1', obrigacao_id=1,
+        )
+
+        apps = self.migrar('alertas', '0008_agendar_resumos_email')
+        Antiga = apps.get_model('alertas', 'Notificacao')
+        self.assertEqual(
+            sorted(Antiga.objects.values_list('usuario_id', 'tipo', 'titulo', 'link', 'obrigacao_id')),
+            [(u.pk, 'obrigacao_vencendo', 'Vence', '/o/1', 1) for u in usuarios],
+        )
+
+        self.migrar()
+        self.assertEqual(NotificacaoEvento.objects.count(), 1)
+        self.assertEqual(Notificacao.objects.filter(evento__titulo='Vence').count(), 2)
+
+    def test_chave_dedup_colapsa_as_nao_lidas_repetidas(self):
+        apps = self.migrar('alertas', '0004_notificacao_data_atualizacao')
+        Antiga = apps.get_model('alertas', 'Notificacao')
+        usuario = get_user_model().objects.create_user('dedup', password='x', perfil=0)
+
+        def criar(tipo, lida=False, tarefa_id=None):
+            return Antiga.objects.create(
+                usuario_id=usuario.pk, tipo=tipo, titulo=tipo, mensagem='', link='/',
+                lida=lida, tarefa_id=tarefa_id,
+            ).pk
+
+        repetidas = [criar('tarefa_atrasada', tarefa_id=1) for _ in range(3)]
+        lida = criar('tarefa_atrasada', lida=True, tarefa_id=1)
+        outra_tarefa = criar('tarefa_atrasada', tarefa_id=2)
+        sistema = [criar('sistema'), criar('sistema')]
+
+        apps = self.migrar('alertas', '0005_notificacao_chave_dedup')
+        Antiga = apps.get_model('alertas', 'Notificacao')
+        self.assertEqual(
+            dict(Antiga.objects.values_list('pk', 'chave_dedup')),
+            {
+                repetidas[-1]: 'tarefa_atrasada:1::',
+                lida: 'tarefa_atrasada:1::',
+                outra_tarefa: 'tarefa_atrasada:2::',
+                sistema[0]: None,
+                sistema[1]: None,
+            },
+        )
@@ -6,12 +6,18 @@ urlpatterns = [
     # Alertas do usuário (não lidas)
     path('', views.alertas_usuario, name='alertas_usuario'),
     
+    # Push via Server-Sent Events
+    path('stream/', views.stream_alertas, name='stream_alertas'),
+    
     # Marcar como lida
     path('<int:notificacao_id>/marcar-lida/', views.marcar_como_lida, name='marcar_notificacao_lida'),
     
     # Marcar todas como lidas
     path('marcar-todas-lidas/', views.marcar_todas_como_lidas, name='marcar_todas_notificacoes_lidas'),
     
+    # Sincronização incremental (cursor)
+    path('delta/', views.delta_notificacoes, name='delta_notificacoes'),
+    
     # Histórico (incluindo lidas)
     path('historico/', views.historico_notificacoes, name='historico_notificacoes'),
     
@@ -1,67 +1,124 @@
 # ===== SISTEMA DE ALERTAS - VERSÃO 2: SISTEMA COMPLETO =====
-from django.http import JsonResponse
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import etag, require_POST
 from django.shortcuts import get_object_or_404
 
 from acoes.models import Tarefa
+from core.paginacao import codificar_cursor, decodificar_cursor, fatiar_pagina, ler_limite
 from instrumentos.models import Obrigacao
 from .models import Notificacao, PreferenciaNotificacao
+from .pubsub import get_backend
+
+
+def serializar_notificacao(n):
+    """Formato de uma notificação no dropdown de alertas"""
+    return {
+        'id': n.id,
+        'titulo': n.titulo,
+        'mensagem': n.mensagem,
+        'link': n.link,
+        'prioridade': n.prioridade,
+        'tipo': n.get_tipo_display(),
+        'data_criacao': n.data_criacao.strftime('%d/%m/%Y %H:%M'),
+    }
+
+
+def etag_alertas(request, *args, **kwargs):
+    """ETag de /alertas/: versão dos alertas do usuário, derivada do banco"""
+    if not request.user.is_authenticated:
+        return None
+    return f'{request.user.pk}-{Notificacao.versao_alertas(request.user.pk)}'
 
 
 @login_required
+@etag(etag_alertas)
 def alertas_usuario(request):
     """
     Retorna os alertas do usuário logado
     
     VERSÃO 2: Sistema Completo com Notificações Persistidas
+    
+    Responde 304 (If-None-Match) enquanto a versão dos alertas do usuário
+    não mudar, com uma única consulta agregada e sem montar a lista.
     """
     user = request.user
     
     # Buscar notificações não lidas
-    notificacoes = Notificacao.objects.filter(
+    notificacoes = list(Notificacao.objects.filter(
         usuario=user,
         lida=False
-    ).order_by('-prioridade', '-data_criacao')[:50]  # Limitar a 50
+    ).select_related('evento').order_by('-evento__prioridade', '-data_criacao')[:50])  # Limitar a 50
+    
+    todas = [serializar_notificacao(n) for n in notificacoes]
     
     # Agrupar por tipo
     por_tipo = {}
-    for notif in notificacoes:
-        tipo = notif.tipo
-        if tipo not in por_tipo:
-            por_tipo[tipo] = []
-        
-        por_tipo[tipo].append({
-            'id': notif.id,
-            'titulo': notif.titulo,
-            'mensagem': notif.mensagem,
-            'link': notif.link,
-            'prioridade': notif.prioridade,
-            'data_criacao': notif.data_criacao.strftime('%d/%m/%Y %H:%M'),
-            'tipo': notif.get_tipo_display(),
-        })
+    for notif, item in zip(notificacoes, todas):
+        por_tipo.setdefault(notif.tipo, []).append(item)
     
     # Retornar JSON
     data = {
-        'total': notificacoes.count(),
+        'total': len(notificacoes),
         'notificacoes': por_tipo,
-        'todas': [
-            {
-                'id': n.id,
-                'titulo': n.titulo,
-                'mensagem': n.mensagem,
-                'link': n.link,
-                'prioridade': n.prioridade,
-                'tipo': n.get_tipo_display(),
-                'data_criacao': n.data_criacao.strftime('%d/%m/%Y %H:%M'),
-            }
-            for n in notificacoes
-        ]
+        'todas': todas,
     }
     
-    return JsonResponse(data)
+    response = JsonResponse(data)
+    # Navegador sempre revalida (If-None-Match) antes de reutilizar
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def sse_ativo():
+    """Push habilitado e com pub/sub entre processos (ver settings)"""
+    return settings.ALERTAS_SSE_ATIVO and bool(settings.ALERTAS_PUBSUB_URL)
+
+
+@login_required
+async def stream_alertas(request):
+    """
+    Push dos alertas via Server-Sent Events (text/event-stream)
+    
+    Cada evento "alertas" traz o total de não lidas, a versão (mesmo valor
+    do ETag de /alertas/) e as notificações novas. Comentários de
+    keep-alive são enviados a cada ALERTAS_SSE_KEEPALIVE segundos e a
+    conexão é encerrada após ALERTAS_SSE_DURACAO segundos (o EventSource
+    reconecta sozinho). Servir via ASGI (config/asgi.py) para não
+    prender um worker por conexão.
+    
+    Sem ALERTAS_SSE_ATIVO (ou sem pub/sub compartilhado) responde 204: o
+    EventSource não reconecta e o script de alertas fica no polling.
+    """
+    if not sse_ativo():
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    backend = get_backend()
+    
+    async def eventos():
+        loop = asyncio.get_running_loop()
+        fim = loop.time() + settings.ALERTAS_SSE_DURACAO
+        
+        async with backend.assinar(user.pk) as assinatura:
+            yield f'retry: {settings.ALERTAS_SSE_RETRY_MS}\n\n'
+            while loop.time() < fim:
+                evento = await assinatura.proximo(settings.ALERTAS_SSE_KEEPALIVE)
+                if evento is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f'event: alertas\ndata: {json.dumps(evento)}\n\n'
+    
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # desativa buffer do nginx
+    return response
 
 
 @login_required
@@ -83,48 +140,130 @@ def marcar_como_lida(request, notificacao_id):
 @require_POST
 def marcar_todas_como_lidas(request):
     """Marca todas as notificações do usuário como lidas"""
+    agora = timezone.now()
     count = Notificacao.objects.filter(
         usuario=request.user,
         lida=False
     ).update(
         lida=True,
-        data_leitura=timezone.now()
+        data_leitura=agora,
+        data_atualizacao=agora,
     )
     
+    if count:
+        Notificacao.invalidar_alertas([request.user.pk])
+    
     return JsonResponse({
         'success': True,
         'count': count
     })
 
 
+
+
+@login_required
+def delta_notificacoes(request):
+    """
+    Sincronização incremental das notificações do usuário
+    
+    GET /alertas/delta/?cursor=<cursor>&limite=<n>
+    
+    Retorna apenas as notificações criadas ou alteradas (inclusive leitura)
+    depois do cursor, ordenadas por (data_atualizacao, id). O cliente guarda
+    o "cursor" da resposta e repete a chamada enquanto "mais" for true.
+    Sem cursor, começa pelas não lidas atuais.
+    """
+    user = request.user
+    limite = ler_limite(request)
+    cursor = decodificar_cursor(request.GET.get('cursor'))
+    
+    notificacoes = Notificacao.objects.filter(usuario=user).select_related('evento')
+    if cursor:
+        data, pk = cursor
+        notificacoes = notificacoes.filter(
+            Q(data_atualizacao__gt=data) | Q(data_atualizacao=data, id__gt=pk)
+        )
+    else:
+        notificacoes = notificacoes.filter(lida=False)
+    
+    pagina = list(notificacoes.order_by('data_atualizacao', 'id')[:limite + 1])
+    mais = len(pagina) > limite
+    pagina = pagina[:limite]
+    
+    if pagina:
+        ultimo = pagina[-1]
+        proximo = codificar_cursor(ultimo.data_atualizacao, ultimo.pk)
+    else:
+        proximo = request.GET.get('cursor') if cursor else None
+    
+    # Formato compacto: uma lista, tipo como código e datas ISO
+    data = {
+        'cursor': proximo,
+        'mais': mais,
+        'nao_lidas': Notificacao.objects.filter(usuario=user, lida=False).count(),
+        'itens': [
+            {
+                'id': n.id,
+                'tipo': n.tipo,
+                'prioridade': n.prioridade,
+                'titulo': n.titulo,
+                'mensagem': n.mensagem,
+                'link': n.link,
+                'lida': n.lida,
+                'criada': n.data_criacao.isoformat(),
+            }
+            for n in pagina
+        ],
+    }
+    
+    return JsonResponse(data)
+
+
 @login_required
 def historico_notificacoes(request):
-    """Retorna histórico de notificações (incluindo lidas)"""
+    """
+    Retorna histórico de notificações (incluindo lidas)
+    
+    Paginação por keyset em (data_criacao, id): envie ?antes=<proximo>
+    da resposta anterior para buscar a página seguinte.
+    """
     user = request.user
     
     # Filtros
     tipo = request.GET.get('tipo')
     lidas = request.GET.get('lidas', 'todas')  # 'sim', 'nao', 'todas'
-    limite = int(request.GET.get('limite', 100))
+    limite = ler_limite(request)
+    antes = decodificar_cursor(request.GET.get('antes'))
     
     # Query base
-    notificacoes = Notificacao.objects.filter(usuario=user)
+    notificacoes = Notificacao.objects.filter(usuario=user).select_related('evento')
     
     # Aplicar filtros
     if tipo:
-        notificacoes = notificacoes.filter(tipo=tipo)
+        notificacoes = notificacoes.filter(evento__tipo=tipo)
     
     if lidas == 'sim':
         notificacoes = notificacoes.filter(lida=True)
     elif lidas == 'nao':
         notificacoes = notificacoes.filter(lida=False)
     
-    # Ordenar e limitar
-    notificacoes = notificacoes.order_by('-data_criacao')[:limite]
+    if antes:
+        data, pk = antes
+        notificacoes = notificacoes.filter(
+            Q(data_criacao__lt=data) | Q(data_criacao=data, id__lt=pk)
+        )
+    
+    # Ordenar e limitar (uma linha extra indica se há próxima página)
+    notificacoes, proximo = fatiar_pagina(
+        list(notificacoes.order_by('-data_criacao', '-id')[:limite + 1]),
+        limite,
+        lambda n: (n.data_criacao, n.pk),
+    )
     
     # Formatar
     data = {
-        'total': notificacoes.count(),
+        'total': len(notificacoes),
+        'proximo': proximo,
         'notificacoes': [
             {
                 'id': n.id,
@@ -184,19 +323,97 @@ def preferencias_notificacao(request):
 
 
 # ===== FUNÇÕES AUXILIARES PARA CRIAR NOTIFICAÇÕES =====
+#
+# Cada tipo tem um "dados_notificacao_*" que monta os campos da notificação
+# sem tocar no banco (usado também pelo gerador em lote em alertas/geracao.py)
+# e um "criar_notificacao_*" que persiste uma notificação individual.
+
+def dados_notificacao_tarefa_atrasada(tarefa, hoje=None):
+    """Campos da notificação de tarefa atrasada"""
+    hoje = hoje or timezone.now().date()
+    dias_atraso = (hoje - tarefa.data_fim).days if tarefa.data_fim else 0
+    
+    return {
+        'tipo': 'tarefa_atrasada',
+        'titulo': f'Tarefa atrasada: {tarefa.nome}',
+        'mensagem': f'Esta tarefa está atrasada há {dias_atraso} dias.',
+        'link': f'/tarefas/{tarefa.id}/editar/',
+        'tarefa_id': tarefa.id,
+        'prioridade': 'alta' if dias_atraso > 7 else 'media',
+    }
+
+
+def dados_notificacao_tarefa_vencendo_hoje(tarefa, hoje=None):
+    """Campos da notificação de tarefa vencendo hoje"""
+    return {
+        'tipo': 'tarefa_vencendo_hoje',
+        'titulo': f'Tarefa vence hoje: {tarefa.nome}',
+        'mensagem': 'Esta tarefa vence hoje! Não esqueça de concluí-la.',
+        'link': f'/tarefas/{tarefa.id}/editar/',
+        'tarefa_id': tarefa.id,
+        'prioridade': 'urgente',
+    }
+
+
+def dados_notificacao_tarefa_a_vencer(tarefa, hoje=None):
+    """Campos da notificação de tarefa a vencer"""
+    hoje = hoje or timezone.now().date()
+    dias_restantes = (tarefa.data_fim - hoje).days if tarefa.data_fim else 0
+    
+    return {
+        'tipo': 'tarefa_a_vencer',
+        'titulo': f'Tarefa a vencer: {tarefa.nome}',
+        'mensagem': f'Esta tarefa vence em {dias_restantes} dias.',
+        'link': f'/tarefas/{tarefa.id}/editar/',
+        'tarefa_id': tarefa.id,
+        'prioridade': 'media',
+    }
+
+
+def dados_notificacao_obrigacao_vencendo(obrigacao, hoje=None):
+    """Campos da notificação de obrigação vencendo"""
+    hoje = hoje or timezone.now().date()
+    dias_restantes = (obrigacao.data_vencimento - hoje).days if obrigacao.data_vencimento else 0
+    
+    return {
+        'tipo': 'obrigacao_vencendo',
+        'titulo': f'Obrigação vencendo: {obrigacao.titulo}',
+        'mensagem': f'Esta obrigação vence em {dias_restantes} dias.',
+        'link': f'/instrumentos/{obrigacao.instrumento_id}/editar/' if obrigacao.instrumento_id else '#',
+        'obrigacao_id': obrigacao.id,
+        'prioridade': 'alta' if dias_restantes <= 3 else 'media',
+    }
+
+
+def dados_notificacao_tarefa_nova(tarefa, hoje=None):
+    """Campos da notificação de nova tarefa atribuída"""
+    return {
+        'tipo': 'tarefa_nova',
+        'titulo': f'Nova tarefa atribuída: {tarefa.nome}',
+        'mensagem': f'Você foi atribuído como responsável/executor desta tarefa.',
+        'link': f'/tarefas/{tarefa.id}/editar/',
+        'tarefa_id': tarefa.id,
+        'prioridade': 'media',
+    }
+
+
+def dados_notificacao_atribuicao(tarefa, hoje=None):
+    """Campos da notificação de atribuição a uma tarefa existente"""
+    return {
+        'tipo': 'atribuicao',
+        'titulo': f'Tarefa atribuída a você: {tarefa.nome}',
+        'mensagem': 'Você foi adicionado como responsável/executor desta tarefa.',
+        'link': f'/tarefas/{tarefa.id}/editar/',
+        'tarefa_id': tarefa.id,
+        'prioridade': 'media',
+    }
+
 
 def criar_notificacao_tarefa_atrasada(tarefa, usuario):
     """Cria notificação de tarefa atrasada"""
-    dias_atraso = (timezone.now().date() - tarefa.data_fim).days if tarefa.data_fim else 0
-    
     return Notificacao.criar_notificacao(
         usuario=usuario,
-        tipo='tarefa_atrasada',
-        titulo=f'Tarefa atrasada: {tarefa.nome}',
-        mensagem=f'Esta tarefa está atrasada há {dias_atraso} dias.',
-        link=f'/tarefas/{tarefa.id}/editar/',
-        tarefa_id=tarefa.id,
-        prioridade='alta' if dias_atraso > 7 else 'media',
+        **dados_notificacao_tarefa_atrasada(tarefa)
     )
 
 
@@ -204,42 +421,23 @@ def criar_notificacao_tarefa_vencendo_hoje(tarefa, usuario):
     """Cria notificação de tarefa vencendo hoje"""
     return Notificacao.criar_notificacao(
         usuario=usuario,
-        tipo='tarefa_vencendo_hoje',
-        titulo=f'Tarefa vence hoje: {tarefa.nome}',
-        mensagem='Esta tarefa vence hoje! Não esqueça de concluí-la.',
-        link=f'/tarefas/{tarefa.id}/editar/',
-        tarefa_id=tarefa.id,
-        prioridade='urgente',
+        **dados_notificacao_tarefa_vencendo_hoje(tarefa)
     )
 
 
 def criar_notificacao_tarefa_a_vencer(tarefa, usuario):
     """Cria notificação de tarefa a vencer"""
-    dias_restantes = (tarefa.data_fim - timezone.now().date()).days if tarefa.data_fim else 0
-    
     return Notificacao.criar_notificacao(
         usuario=usuario,
-        tipo='tarefa_a_vencer',
-        titulo=f'Tarefa a vencer: {tarefa.nome}',
-        mensagem=f'Esta tarefa vence em {dias_restantes} dias.',
-        link=f'/tarefas/{tarefa.id}/editar/',
-        tarefa_id=tarefa.id,
-        prioridade='media',
+        **dados_notificacao_tarefa_a_vencer(tarefa)
     )
 
 
 def criar_notificacao_obrigacao_vencendo(obrigacao, usuario):
     """Cria notificação de obrigação vencendo"""
-    dias_restantes = (obrigacao.data_vencimento - timezone.now().date()).days if obrigacao.data_vencimento else 0
-    
     return Notificacao.criar_notificacao(
         usuario=usuario,
-        tipo='obrigacao_vencendo',
-        titulo=f'Obrigação vencendo: {obrigacao.titulo}',
-        mensagem=f'Esta obrigação vence em {dias_restantes} dias.',
-        link=f'/instrumentos/{obrigacao.instrumento_id}/editar/' if obrigacao.instrumento_id else '#',
-        obrigacao_id=obrigacao.id,
-        prioridade='alta' if dias_restantes <= 3 else 'media',
+        **dados_notificacao_obrigacao_vencendo(obrigacao)
     )
 
 
@@ -247,11 +445,13 @@ def criar_notificacao_tarefa_nova(tarefa, usuario):
     """Cria notificação de nova tarefa atribuída"""
     return Notificacao.criar_notificacao(
         usuario=usuario,
-        tipo='tarefa_nova',
-        titulo=f'Nova tarefa atribuída: {tarefa.nome}',
-        mensagem=f'Você foi atribuído como responsável/executor desta tarefa.',
-        link=f'/tarefas/{tarefa.id}/editar/',
-        tarefa_id=tarefa.id,
-        prioridade='media',
+        **dados_notificacao_tarefa_nova(tarefa)
     )
 
+
+def criar_notificacao_atribuicao(tarefa, usuario):
+    """Cria notificação de atribuição a uma tarefa existente"""
+    return Notificacao.criar_notificacao(
+        usuario=usuario,
+        **dados_notificacao_atribuicao(tarefa)
+    )
@@ -3,6 +3,14 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Required for the alerts push channel (/alertas/stream/, Server-Sent Events),
+which keeps one long-lived async response per open tab. The channel is off
+by default (the shipped compose runs gunicorn/WSGI); to enable it, set
+ALERTAS_SSE_ATIVO=True and ALERTAS_PUBSUB_URL (Redis), and run with an ASGI
+server, e.g.:
+
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
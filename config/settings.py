@@ -61,6 +61,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,6 +69,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'alertas.middleware.ReavaliacaoMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -190,9 +192,94 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Executa as tarefas na própria thread (testes/desenvolvimento sem Redis)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Cache compartilhado (painéis, calendário); use Redis em produção
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+
+# Alertas: ids de usuário por partição e validade das travas (segundos)
+ALERTAS_TAMANHO_FAIXA = int(os.environ.get('ALERTAS_TAMANHO_FAIXA', 2500))
+ALERTAS_TRAVA_TIMEOUT = int(os.environ.get('ALERTAS_TRAVA_TIMEOUT', 30 * 60))
+# Espera (segundos) antes da reavaliação agendada pelas alterações
+ALERTAS_REAVALIACAO_ATRASO = int(os.environ.get('ALERTAS_REAVALIACAO_ATRASO', 5))
+
+# Alertas: push via SSE (/alertas/stream/). Desligado por padrão: cada conexão
+# prende um worker sob WSGI (gunicorn). Só ative servindo via ASGI
+# (config/asgi.py) e com um pub/sub compartilhado (ALERTAS_PUBSUB_URL), para
+# receber os eventos publicados pelo cron/Celery e pelos outros processos.
+# Desligado, /alertas/stream/ responde 204 e o navegador fica no polling
+ALERTAS_SSE_ATIVO = os.environ.get('ALERTAS_SSE_ATIVO', 'False') == 'True'
+ALERTAS_PUBSUB_URL = os.environ.get('ALERTAS_PUBSUB_URL', os.environ.get('REDIS_URL'))
+ALERTAS_SSE_KEEPALIVE = 25
+ALERTAS_SSE_DURACAO = 10 * 60
+ALERTAS_SSE_RETRY_MS = 5000
+
+# Alertas: retenção em lotes (alertas/retencao.py). ARQUIVAR: '', 'tabela' ou 'arquivo'
+ALERTAS_RETENCAO_LOTE = int(os.environ.get('ALERTAS_RETENCAO_LOTE', 1000))
+ALERTAS_RETENCAO_PAUSA = float(os.environ.get('ALERTAS_RETENCAO_PAUSA', 0.1))
+ALERTAS_RETENCAO_ARQUIVAR = os.environ.get('ALERTAS_RETENCAO_ARQUIVAR') or None
+ALERTAS_RETENCAO_DIRETORIO = os.environ.get(
+    'ALERTAS_RETENCAO_DIRETORIO', str(BASE_DIR / 'arquivo' / 'notificacoes')
+)
 
 # Email Configuration (para alertas)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# Alertas: resumos por e-mail (alertas/emails.py); URL_BASE prefixa os links
+ALERTAS_EMAIL_URL_BASE = os.environ.get('ALERTAS_EMAIL_URL_BASE', '')
+ALERTAS_EMAIL_MAX_ITENS = 50
+
+# Dashboard: snapshots (dashboards/snapshots.py). ATRASO agrupa as alterações
+# em um único recálculo; TRAVA_TIMEOUT limita execuções sobrepostas;
+# IDADE_MAXIMA: acima dela a leitura agenda um novo recálculo
+DASHBOARD_SNAPSHOT_ATRASO = int(os.environ.get('DASHBOARD_SNAPSHOT_ATRASO', 30))
+DASHBOARD_SNAPSHOT_IDADE_MAXIMA = int(os.environ.get('DASHBOARD_SNAPSHOT_IDADE_MAXIMA', 5 * 60))
+DASHBOARD_SNAPSHOT_TRAVA_TIMEOUT = int(os.environ.get('DASHBOARD_SNAPSHOT_TRAVA_TIMEOUT', 10 * 60))
+
+# Dashboard: cache do painel por escopo (dashboards/escopos.py), em segundos
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 60))
+
+# Calendário de tarefas: validade do cache por janela (acoes/calendario.py)
+ACOES_CALENDARIO_CACHE_TIMEOUT = int(os.environ.get('ACOES_CALENDARIO_CACHE_TIMEOUT', 10 * 60))
+
+# Varredura de prazos vencidos (acoes/varredura.py): registros por UPDATE,
+# dias de histórico das execuções e validade da trava
+ACOES_VARREDURA_LOTE = int(os.environ.get('ACOES_VARREDURA_LOTE', 1000))
+ACOES_VARREDURA_RETENCAO_DIAS = int(os.environ.get('ACOES_VARREDURA_RETENCAO_DIAS', 30))
+ACOES_VARREDURA_TRAVA_TIMEOUT = int(os.environ.get('ACOES_VARREDURA_TRAVA_TIMEOUT', 600))
+
+# Ocorrências de ações periódicas (acoes/recorrencia.py): horizonte móvel em
+# dias e cópia das tarefas da ação modelo
+ACOES_RECORRENCIA_HORIZONTE_DIAS = int(os.environ.get('ACOES_RECORRENCIA_HORIZONTE_DIAS', 90))
+ACOES_RECORRENCIA_COPIAR_TAREFAS = os.environ.get('ACOES_RECORRENCIA_COPIAR_TAREFAS', 'True') == 'True'
+
+# Métricas (core/metricas.py, exportadas em /metrics). Orçamento de consultas
+# SQL por nome de URL (None desativa para a view). TOKEN libera o coletor sem login
+METRICAS_ORCAMENTO_PADRAO = int(os.environ.get('METRICAS_ORCAMENTO_PADRAO', 50))
+METRICAS_ORCAMENTO_CONSULTAS = {
+    'dashboard': 10,
+    'tarefas_json': 10,
+    'tarefa_kanban': 15,
+}
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+# Diretório compartilhado pelos workers do gunicorn: cada processo grava os
+# seus acumulados e /metrics soma todos. Vazio: só o processo que atendeu
+METRICAS_DIRETORIO = os.environ.get('METRICAS_DIRETORIO', '')
+METRICAS_INTERVALO_GRAVACAO = float(os.environ.get('METRICAS_INTERVALO_GRAVACAO', 1))
 
 # Login URLs
 LOGIN_URL = 'login'
@@ -3,9 +3,11 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from django.shortcuts import redirect
-from dashboards.views import dashboard_principal
+from dashboards.views import dashboard_principal, historico_status_json
 from acoes import views as acoes_views
 from core.config_views import configuracoes
+from core.metricas_views import metricas_prometheus
+from core.autocomplete import autocomplete
 from usuarios import views as usuarios_views
 from alertas import views as alertas_views
 
@@ -67,12 +69,16 @@ urlpatterns = [
     # 🔒 Redireciona qualquer tentativa de /admin/ para o login moderno
     path('admin/', redirect_to_login, name='redirect_admin'),
 
+    # Métricas (Prometheus), restritas a administradores
+    path('metrics', metricas_prometheus, name='metricas'),
+
     # Autenticação moderna
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
 
     # Dashboard
     path('', dashboard_principal, name='dashboard'),
+    path('dashboard/historico/json/', historico_status_json, name='dashboard_historico_json'),
 
     # Instrumentos
     path('instrumentos/', InstrumentoListView.as_view(), name='instrumento_list'),
@@ -84,6 +90,7 @@ urlpatterns = [
     path('api/tipo-instrumento/criar/', tipo_instrumento_create, name='tipo_instrumento_create'),
     path('api/diretoria/criar/', diretoria_create, name='diretoria_create'),
     path('api/instrumento/<int:instrumento_id>/arquivo/upload/', arquivo_upload, name='arquivo_upload'),
+    path('api/autocomplete/<str:fonte>/', autocomplete, name='autocomplete'),
 
     # Entidades
     path('entidades/', EntidadeListView.as_view(), name='entidade_list'),
@@ -106,10 +113,14 @@ urlpatterns = [
     # Calendário de Tarefas
     path('tarefas/calendario/', acoes_views.TarefaCalendarioView.as_view(), name='tarefa_calendario'),
     path('tarefas/json/', acoes_views.tarefas_json, name='tarefas_json'),
+    path('tarefas/gantt/json/', acoes_views.tarefas_gantt_json, name='tarefas_gantt_json'),
+    path('tarefas/<int:pk>/reprogramar/', acoes_views.tarefa_reprogramar, name='tarefa_reprogramar'),
 
     # ===== KANBAN DE TAREFAS =====
     path('tarefas/kanban/', views_kanban.tarefa_kanban_view, name='tarefa_kanban'),
+    path('tarefas/kanban/coluna/<str:status>/', views_kanban.tarefa_kanban_coluna, name='tarefa_kanban_coluna'),
     path('tarefas/<int:pk>/update-status/', views_kanban.tarefa_update_status, name='tarefa_update_status'),
+    path('tarefas/status/', views_kanban.tarefa_transicoes_status, name='tarefa_transicoes_status'),
     path('tarefas/<int:pk>/edit-ajax/', views_kanban.tarefa_edit_ajax, name='tarefa_edit_ajax'),
 
     # Indicadores
@@ -0,0 +1,182 @@
+# ===== BUSCA ASSÍNCRONA PARA FILTROS E FORMULÁRIOS =====
+"""
+Endpoint de autocomplete paginado, usado pelos selects com
+data-autocomplete (static/js/autocomplete.js) no lugar de listas com
+todos os registros do sistema.
+
+GET /api/autocomplete/<fonte>/?q=<termo>&depois=<cursor>&limite=<n>
+    {"resultados": [{"id": 1, "texto": "..."}], "proximo": "<cursor>" | null}
+
+Cada fonte (FONTES) define o modelo, os campos de busca, o campo de
+ordenação (indexado; a paginação é por chave: (ordem, id) > cursor, sem
+OFFSET), os filtros aceitos na URL, filtros fixos e o(s) caminho(s) até a
+diretoria, usados para restringir os resultados ao escopo do usuário
+(dashboards/escopos.py; None = fonte sem diretoria, visível a todos).
+Uma consulta por página.
+
+Os formulários usam as mesmas fontes pelos widgets de core/widgets.py.
+"""
+
+from django.apps import apps
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import JsonResponse
+
+from dashboards.escopos import escopo_do_usuario
+
+from .paginacao import decodificar_cursor, fatiar_pagina, ler_limite
+
+LIMITE_AUTOCOMPLETE = 20
+
+
+def texto_usuario(linha):
+    """Nome | Subunidade | Diretoria, como em TarefaForm.formatar_usuario"""
+    nome = f"{linha['first_name']} {linha['last_name']}".strip() or linha['username']
+    return f"{nome} | {linha['subunidade__nome'] or 'Sem subunidade'} | {linha['subunidade__diretoria__sigla'] or 'Sem diretoria'}"
+
+
+FONTES = {
+    'instrumentos': {
+        'modelo': 'instrumentos.Instrumento',
+        'busca': ['numero', 'objeto'],
+        'ordem': 'numero',
+        'campos': ['numero', 'tipo_instrumento__nome'],
+        'texto': lambda linha: f"{linha['numero']} - {linha['tipo_instrumento__nome']}",
+        'filtros': {},
+        'diretoria': 'diretoria_id',
+    },
+    'obrigacoes': {
+        'modelo': 'instrumentos.Obrigacao',
+        'busca': ['titulo', 'clausula_referencia'],
+        'ordem': 'titulo',
+        'campos': ['titulo'],
+        'texto': lambda linha: linha['titulo'],
+        'filtros': {'instrumento': 'instrumento_id'},
+        'diretoria': 'instrumento__diretoria_id',
+    },
+    'acoes': {
+        'modelo': 'acoes.Acao',
+        'busca': ['nome'],
+        'ordem': 'nome',
+        'campos': ['obrigacao__titulo'],
+        'texto': lambda linha: f"{linha['nome']} - {linha['obrigacao__titulo']}",
+        'filtros': {'instrumento': 'instrumento_id', 'obrigacao': 'obrigacao_id'},
+        'diretoria': 'obrigacao__instrumento__diretoria_id',
+    },
+    'tarefas': {
+        'modelo': 'acoes.Tarefa',
+        'busca': ['nome'],
+        'ordem': 'nome',
+        'campos': ['acao__nome'],
+        'texto': lambda linha: f"{linha['nome']} - {linha['acao__nome']}",
+        'filtros': {'acao': 'acao_id'},
+        'diretoria': 'acao__obrigacao__instrumento__diretoria_id',
+    },
+    'usuarios': {
+        'modelo': 'usuarios.Usuario',
+        'busca': ['username', 'first_name', 'last_name'],
+        'ordem': 'username',
+        'campos': ['first_name', 'last_name', 'subunidade__nome', 'subunidade__diretoria__sigla'],
+        'texto': texto_usuario,
+        'filtros': {},
+        'fixos': {'is_active': True},
+        'diretoria': ('diretoria_id', 'subunidade__diretoria_id'),
+    },
+    'entidades': {
+        'modelo': 'entidades.Entidade',
+        'busca': ['razao_social', 'nome_fantasia', 'cnpj'],
+        'ordem': 'razao_social',
+        'campos': ['tipo_entidade__nome'],
+        'texto': lambda linha: f"{linha['razao_social']} ({linha['tipo_entidade__nome']})",
+        'filtros': {},
+        'diretoria': None,
+    },
+}
+
+
+
+def queryset_da_fonte(fonte, usuario):
+    """Registros da fonte visíveis ao usuário"""
+    config = FONTES[fonte]
+    queryset = apps.get_model(config['modelo']).objects.filter(**config.get('fixos', {}))
+
+    diretorias = escopo_do_usuario(usuario)['diretorias']
+    caminhos = config['diretoria']
+    if diretorias is not None and caminhos:
+        if isinstance(caminhos, str):
+            caminhos = (caminhos,)
+        escopo = Q()
+        for caminho in caminhos:
+            escopo |= Q(**{f'{caminho}__in': diretorias})
+        queryset = queryset.filter(escopo)
+    return queryset
+
+
+def selecionados(fonte, usuario, ids):
+    """[{'id', 'texto'}] dos ids informados (opções já escolhidas de um select)"""
+    config = FONTES[fonte]
+    ids = [pk for pk in ids if str(pk).isdigit()]
+    if not ids:
+        return []
+    linhas = queryset_da_fonte(fonte, usuario).filter(pk__in=ids).values('pk', config['ordem'], *config['campos'])
+    return [{'id': linha['pk'], 'texto': config['texto'](linha)} for linha in linhas]
+
+
+def buscar(fonte, usuario, termo='', filtros=None, depois=None, limite=LIMITE_AUTOCOMPLETE):
+    """
+    Uma página de resultados da fonte: ([{'id', 'texto'}], proximo)
+
+    ValueError se um filtro não for um id.
+    """
+    config = FONTES[fonte]
+    ordem = config['ordem']
+    queryset = queryset_da_fonte(fonte, usuario)
+
+    for parametro, campo in config['filtros'].items():
+        valor = (filtros or {}).get(parametro)
+        if valor:
+            queryset = queryset.filter(**{campo: int(valor)})
+
+    if termo:
+        busca = Q()
+        for campo in config['busca']:
+            busca |= Q(**{f'{campo}__icontains': termo})
+        queryset = queryset.filter(busca)
+
+    if depois:
+        valor, pk = depois
+        queryset = queryset.filter(Q(**{f'{ordem}__gt': valor}) | Q(**{ordem: valor, 'pk__gt': pk}))
+
+    # Uma linha extra indica se há próxima página
+    linhas, proximo = fatiar_pagina(
+        list(queryset.order_by(ordem, 'pk').values('pk', ordem, *config['campos'])[:limite + 1]),
+        limite,
+        lambda linha: (linha[ordem], linha['pk']),
+    )
+
+    return [{'id': linha['pk'], 'texto': config['texto'](linha)} for linha in linhas], proximo
+
+
+@login_required
+def autocomplete(request, fonte):
+    if fonte not in FONTES:
+        return JsonResponse({'error': f'Fonte desconhecida: {fonte}'}, status=404)
+
+    depois = None
+    if request.GET.get('depois'):
+        depois = decodificar_cursor(request.GET['depois'])
+        if depois is None:
+            return JsonResponse({'error': 'Cursor inválido'}, status=400)
+
+    try:
+        resultados, proximo = buscar(
+            fonte,
+            request.user,
+            termo=request.GET.get('q', '').strip(),
+            filtros=request.GET,
+            depois=depois,
+            limite=ler_limite(request, padrao=LIMITE_AUTOCOMPLETE, maximo=50),
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Filtro inválido'}, status=400)
+    return JsonResponse({'resultados': resultados, 'proximo': proximo})
@@ -0,0 +1,261 @@
+# ===== OBSERVABILIDADE - MÉTRICAS DAS REQUISIÇÕES =====
+"""
+Registro em memória das métricas por view, exportado em /metrics
+
+Preenchido pelo core.middleware.MetricasMiddleware:
+- agems_http_requisicoes_total{view,metodo,status}
+- agems_http_duracao_segundos{view} (histograma)
+- agems_http_resposta_bytes{view} (histograma; respostas em streaming
+  não entram)
+- agems_sql_consultas{view} (histograma de consultas por requisição)
+- agems_sql_duracao_segundos_total{view}
+- agems_sql_orcamento_excedido_total{view}
+
+O registro é por processo. Com vários workers (gunicorn --workers 3) o
+coletor atinge um worker qualquer a cada coleta, então os processos
+compartilham os valores por METRICAS_DIRETORIO: cada um grava os seus
+acumulados em <diretorio>/<pid>.json (no máximo a cada
+METRICAS_INTERVALO_GRAVACAO segundos) e /metrics soma os arquivos de
+todos. Arquivos de workers encerrados continuam somando (os contadores
+não podem diminuir); limpe o diretório ao iniciar o servidor (ver
+docker-entrypoint.sh). Sem METRICAS_DIRETORIO, /metrics mostra só o
+processo que atendeu.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+FAIXAS_DURACAO = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAIXAS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+FAIXAS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores)) + ([extra] if extra else [])
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador com rótulos (valor acumulado por combinação de rótulos)"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.valores = {}
+        self.trava = threading.Lock()
+
+    def somar(self, *rotulos, valor=1):
+        with self.trava:
+            self.valores[rotulos] = self.valores.get(rotulos, 0) + valor
+
+    def dados(self):
+        with self.trava:
+            return dict(self.valores)
+
+    @staticmethod
+    def mesclar(total, dados):
+        for rotulos, valor in dados.items():
+            total[rotulos] = total.get(rotulos, 0) + valor
+        return total
+
+    def linhas(self, dados=None):
+        valores = sorted((self.dados() if dados is None else dados).items())
+        for rotulos, valor in valores:
+            yield f'{self.nome}{formatar_rotulos(self.rotulos, rotulos)} {formatar_numero(valor)}'
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus (_bucket, _sum, _count)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos, faixas):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.faixas = tuple(faixas)
+        self.series = {}
+        self.trava = threading.Lock()
+
+    def observar(self, *rotulos, valor):
+        indice = bisect_left(self.faixas, valor)
+        with self.trava:
+            serie = self.series.get(rotulos)
+            if serie is None:
+                # contagens por faixa (+Inf no fim), soma
+                serie = self.series[rotulos] = [[0] * (len(self.faixas) + 1), 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def dados(self):
+        with self.trava:
+            return {rotulos: [list(contagens), soma] for rotulos, (contagens, soma) in self.series.items()}
+
+    @staticmethod
+    def mesclar(total, dados):
+        for rotulos, (contagens, soma) in dados.items():
+            serie = total.setdefault(rotulos, [[0] * len(contagens), 0])
+            serie[0] = [a + b for a, b in zip(serie[0], contagens)]
+            serie[1] += soma
+        return total
+
+    def linhas(self, dados=None):
+        series = sorted((self.dados() if dados is None else dados).items())
+        for rotulos, (contagens, soma) in series:
+            acumulado = 0
+            for limite, contagem in zip(self.faixas + (float('inf'),), contagens):
+                acumulado += contagem
+                extra = ('le', formatar_numero(limite))
+                yield f'{self.nome}_bucket{formatar_rotulos(self.rotulos, rotulos, extra)} {acumulado}'
+            yield f'{self.nome}_sum{formatar_rotulos(self.rotulos, rotulos)} {formatar_numero(soma)}'
+            yield f'{self.nome}_count{formatar_rotulos(self.rotulos, rotulos)} {acumulado}'
+
+
+requisicoes = Contador(
+    'agems_http_requisicoes_total', 'Requisições atendidas', ('view', 'metodo', 'status')
+)
+duracao = Histograma(
+    'agems_http_duracao_segundos', 'Tempo de resposta da view', ('view',), FAIXAS_DURACAO
+)
+tamanho_resposta = Histograma(
+    'agems_http_resposta_bytes', 'Tamanho do corpo da resposta', ('view',), FAIXAS_BYTES
+)
+consultas = Histograma(
+    'agems_sql_consultas', 'Consultas SQL por requisição', ('view',), FAIXAS_CONSULTAS
+)
+duracao_sql = Contador(
+    'agems_sql_duracao_segundos_total', 'Tempo gasto em consultas SQL', ('view',)
+)
+orcamento_excedido = Contador(
+    'agems_sql_orcamento_excedido_total',
+    'Requisições acima do orçamento de consultas (METRICAS_ORCAMENTO_CONSULTAS)',
+    ('view',),
+)
+
+METRICAS = [requisicoes, duracao, tamanho_resposta, consultas, duracao_sql, orcamento_excedido]
+
+
+# ===== COMPARTILHAMENTO ENTRE PROCESSOS =====
+
+class Gravacao:
+    """Controle da gravação periódica do arquivo deste processo"""
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.ultima = 0.0
+        self.agendada = False
+
+
+gravacao = Gravacao()
+
+
+def diretorio():
+    return settings.METRICAS_DIRETORIO or None
+
+
+def gravar_processo():
+    """Grava os acumulados deste processo em <diretorio>/<pid>.json"""
+    pasta = diretorio()
+    if pasta is None:
+        return
+    with gravacao.trava:
+        gravacao.ultima = time.monotonic()
+        gravacao.agendada = False
+    conteudo = {
+        metrica.nome: [[list(rotulos), valor] for rotulos, valor in metrica.dados().items()]
+        for metrica in METRICAS
+    }
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    temporario = pasta / f'{os.getpid()}.json.tmp'
+    temporario.write_text(json.dumps(conteudo))
+    os.replace(temporario, pasta / f'{os.getpid()}.json')
+
+
+def gravar_se_preciso():
+    """
+    Grava no máximo uma vez por METRICAS_INTERVALO_GRAVACAO; dentro do
+    intervalo, agenda uma gravação para o fim dele (o último trecho de um
+    worker que ficou ocioso não se perde)
+    """
+    if diretorio() is None:
+        return
+    intervalo = settings.METRICAS_INTERVALO_GRAVACAO
+    with gravacao.trava:
+        restante = gravacao.ultima + intervalo - time.monotonic()
+        if restante > 0:
+            if gravacao.agendada:
+                return
+            gravacao.agendada = True
+    if restante > 0:
+        temporizador = threading.Timer(restante, gravar_processo)
+        temporizador.daemon = True
+        temporizador.start()
+    else:
+        gravar_processo()
+
+
+def ler_processos():
+    """Soma dos arquivos de todos os processos: {nome da métrica: dados}"""
+    totais = {metrica.nome: {} for metrica in METRICAS}
+    tipos = {metrica.nome: metrica for metrica in METRICAS}
+    for arquivo in Path(diretorio()).glob('*.json'):
+        try:
+            conteudo = json.loads(arquivo.read_text())
+        except (OSError, ValueError):
+            continue  # worker encerrado no meio da gravação
+        for nome, series in conteudo.items():
+            if nome in tipos:
+                tipos[nome].mesclar(totais[nome], {tuple(rotulos): valor for rotulos, valor in series})
+    return totais
+
+
+def registrar(view, metodo, status, segundos, total_consultas, segundos_sql, bytes_resposta=None, excedeu=False):
+    requisicoes.somar(view, metodo, str(status))
+    duracao.observar(view, valor=segundos)
+    consultas.observar(view, valor=total_consultas)
+    duracao_sql.somar(view, valor=segundos_sql)
+    if bytes_resposta is not None:
+        tamanho_resposta.observar(view, valor=bytes_resposta)
+    if excedeu:
+        orcamento_excedido.somar(view)
+    gravar_se_preciso()
+
+
+def exportar():
+    """
+    Texto no formato de exposição do Prometheus (versão 0.0.4), com a soma
+    de todos os processos quando há METRICAS_DIRETORIO
+    """
+    totais = None
+    if diretorio() is not None:
+        gravar_processo()
+        totais = ler_processos()
+
+    linhas = []
+    for metrica in METRICAS:
+        linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+        linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+        linhas.extend(metrica.linhas(None if totais is None else totais[metrica.nome]))
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,28 @@
+"""
+Endpoint de métricas no formato do Prometheus (ver core/metricas.py)
+"""
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from . import metricas
+
+
+def pode_ver_metricas(request):
+    """Admin logado ou coletor com o token de METRICAS_TOKEN (Bearer)"""
+    token = settings.METRICAS_TOKEN
+    autorizacao = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(autorizacao, f'Bearer {token}'):
+        return True
+    return request.user.is_authenticated and request.user.perfil == 0
+
+
+def metricas_prometheus(request):
+    if not pode_ver_metricas(request):
+        raise PermissionDenied
+    return HttpResponse(
+        metricas.exportar(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
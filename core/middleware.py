@@ -0,0 +1,90 @@
+# ===== OBSERVABILIDADE - MIDDLEWARE DE MÉTRICAS =====
+"""
+Mede cada requisição: tempo total, consultas SQL (quantidade e tempo) e
+tamanho da resposta, agregados por view em core/metricas.py.
+
+Orçamento de consultas: METRICAS_ORCAMENTO_CONSULTAS ({'nome_da_url': n})
+e METRICAS_ORCAMENTO_PADRAO. Requisições acima do orçamento são contadas
+em agems_sql_orcamento_excedido_total e registradas no log
+'core.metricas' (WARNING). Com DEBUG, a resposta leva o cabeçalho
+Server-Timing (visível nas ferramentas do navegador).
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metricas
+
+logger = logging.getLogger('core.metricas')
+
+
+class ContadorConsultas:
+    """execute_wrapper que conta e cronometra as consultas da requisição"""
+
+    def __init__(self):
+        self.total = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.total += 1
+
+
+def nome_da_view(request):
+    # Nome da URL (cardinalidade baixa); caminhos sem rota viram "nao_resolvida"
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'nao_resolvida'
+    return match.view_name or match._func_path
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contador = ContadorConsultas()
+        inicio = time.perf_counter()
+
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(contador))
+            response = self.get_response(request)
+
+        segundos = time.perf_counter() - inicio
+        view = nome_da_view(request)
+
+        orcamento = settings.METRICAS_ORCAMENTO_CONSULTAS.get(view, settings.METRICAS_ORCAMENTO_PADRAO)
+        excedeu = orcamento is not None and contador.total > orcamento
+        if excedeu:
+            logger.warning(
+                '%s %s (%s): %d consultas SQL, orçamento %d (%.1f ms em SQL, %.1f ms no total)',
+                request.method, request.path, view, contador.total, orcamento,
+                contador.segundos * 1000, segundos * 1000,
+            )
+
+        metricas.registrar(
+            view,
+            request.method,
+            response.status_code,
+            segundos,
+            contador.total,
+            contador.segundos,
+            bytes_resposta=None if response.streaming else len(response.content),
+            excedeu=excedeu,
+        )
+
+        if settings.DEBUG:
+            response['Server-Timing'] = (
+                f'sql;dur={contador.segundos * 1000:.1f};desc="{contador.total} consultas", '
+                f'total;dur={segundos * 1000:.1f}'
+            )
+        return response
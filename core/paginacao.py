@@ -0,0 +1,65 @@
+# ===== PAGINAÇÃO POR CHAVE (KEYSET) =====
+"""
+Cursores e limite de página das listagens paginadas por chave: delta e
+histórico de alertas (alertas/views.py), colunas do Kanban
+(acoes/views_kanban.py) e autocomplete (core/autocomplete.py)
+
+O cursor é opaco (base64 de JSON) e guarda o par (valor de ordenação, id)
+do último item entregue. Datas com hora viram microssegundos desde a
+época, para comparar com a mesma precisão gravada no banco; textos e
+números vão como estão.
+
+Uso:
+    depois = decodificar_cursor(request.GET.get('depois'))
+    if depois:
+        valor, pk = depois
+        queryset = queryset.filter(Q(nome__gt=valor) | Q(nome=valor, pk__gt=pk))
+    linhas = list(queryset.order_by('nome', 'pk')[:limite + 1])
+    pagina, proximo = fatiar_pagina(linhas, limite, lambda t: (t.nome, t.pk))
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+LIMITE_PAGINA = 200
+
+
+def codificar_cursor(valor, pk):
+    if isinstance(valor, datetime):
+        valor = {'us': (valor - EPOCA) // timedelta(microseconds=1)}
+    return base64.urlsafe_b64encode(json.dumps([valor, pk]).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Retorna (valor, id) ou None se o cursor for inválido"""
+    try:
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if isinstance(valor, dict):
+            valor = EPOCA + timedelta(microseconds=int(valor['us']))
+        return valor, int(pk)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def ler_limite(request, padrao=100, maximo=LIMITE_PAGINA):
+    """Parâmetro ?limite= limitado a [1, maximo]"""
+    try:
+        limite = int(request.GET.get('limite', padrao))
+    except ValueError:
+        limite = padrao
+    return max(1, min(limite, maximo))
+
+
+def fatiar_pagina(linhas, limite, chave):
+    """
+    (página, cursor da próxima) a partir das limite + 1 linhas lidas
+
+    A linha extra só indica que há próxima página. chave: função que
+    retorna o par (valor de ordenação, id) de uma linha.
+    """
+    if len(linhas) <= limite:
+        return linhas, None
+    linhas = linhas[:limite]
+    return linhas, codificar_cursor(*chave(linhas[-1]))
@@ -1,3 +1,123 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from acoes.tests import HOJE, criar_estrutura, criar_tarefa
+
+from . import metricas
+from .paginacao import codificar_cursor, decodificar_cursor, fatiar_pagina, ler_limite
+
+
+class MetricasMultiprocessoTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = Path(pasta.name)
+
+    def linha(self, texto, inicio):
+        return next(linha for linha in texto.splitlines() if linha.startswith(inicio))
+
+    def test_soma_os_arquivos_de_todos_os_processos(self):
+        with override_settings(METRICAS_DIRETORIO=str(self.pasta)):
+            metricas.registrar('teste_soma', 'GET', 200, 0.02, 3, 0.01)
+            metricas.gravar_processo()
+            # Outro worker com os mesmos acumulados
+            os.replace(self.pasta / f'{os.getpid()}.json', self.pasta / '1.json')
+            texto = metricas.exportar()
+
+        self.assertEqual(
+            self.linha(texto, 'agems_http_requisicoes_total{view="teste_soma"'),
+            'agems_http_requisicoes_total{view="teste_soma",metodo="GET",status="200"} 2',
+        )
+        self.assertEqual(
+            self.linha(texto, 'agems_sql_consultas_count{view="teste_soma"}'),
+            'agems_sql_consultas_count{view="teste_soma"} 2',
+        )
+        self.assertEqual(
+            self.linha(texto, 'agems_sql_consultas_bucket{view="teste_soma",le="5"}'),
+            'agems_sql_consultas_bucket{view="teste_soma",le="5"} 2',
+        )
+
+    def test_arquivo_corrompido_e_ignorado(self):
+        (self.pasta / '2.json').write_text('{')
+        with override_settings(METRICAS_DIRETORIO=str(self.pasta)):
+            metricas.registrar('teste_corrompido', 'GET', 200, 0.02, 3, 0.01)
+            texto = metricas.exportar()
+        self.assertIn('agems_http_requisicoes_total{view="teste_corrompido",metodo="GET",status="200"} 1', texto)
+
+    def test_sem_diretorio_exporta_o_processo(self):
+        with override_settings(METRICAS_DIRETORIO=''):
+            metricas.registrar('teste_local', 'POST', 302, 0.02, 1, 0.01)
+            texto = metricas.exportar()
+        self.assertIn('agems_http_requisicoes_total{view="teste_local",metodo="POST",status="302"} 1', texto)
+        self.assertEqual(list(self.pasta.iterdir()), [])
+
+
+class PaginacaoTests(SimpleTestCase):
+    def test_cursor_de_data_preserva_microssegundos(self):
+        data = datetime(2025, 3, 10, 14, 30, 5, 123456, tzinfo=dt_timezone.utc)
+        self.assertEqual(decodificar_cursor(codificar_cursor(data, 7)), (data, 7))
+
+    def test_cursor_de_texto(self):
+        self.assertEqual(decodificar_cursor(codificar_cursor('Relatório "A"', 3)), ('Relatório "A"', 3))
+
+    def test_cursor_invalido(self):
+        for cursor in (None, '', 'abc', codificar_cursor('x', 'y')):
+            self.assertIsNone(decodificar_cursor(cursor))
+
+    def test_ler_limite(self):
+        fabrica = RequestFactory()
+        self.assertEqual(ler_limite(fabrica.get('/')), 100)
+        self.assertEqual(ler_limite(fabrica.get('/', {'limite': 'x'}), padrao=20), 20)
+        self.assertEqual(ler_limite(fabrica.get('/', {'limite': 0})), 1)
+        self.assertEqual(ler_limite(fabrica.get('/', {'limite': 500}), maximo=50), 50)
+
+    def test_fatiar_pagina(self):
+        self.assertEqual(fatiar_pagina([1, 2], 2, lambda n: (n, n)), ([1, 2], None))
+        pagina, proximo = fatiar_pagina([1, 2, 3], 2, lambda n: (n * 10, n))
+        self.assertEqual(pagina, [1, 2])
+        self.assertEqual(decodificar_cursor(proximo), (20, 2))
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.outra = criar_estrutura('2')
+        for indice in range(5):
+            criar_tarefa(self.dados.acao, f'Tarefa {indice}', HOJE, HOJE)
+        criar_tarefa(self.outra.acao, 'Tarefa de outra diretoria', HOJE, HOJE)
+        self.client.force_login(self.dados.usuario)
+
+    def buscar(self, fonte, **parametros):
+        return self.client.get(reverse('autocomplete', args=[fonte]), parametros)
+
+    def test_pagina_pelo_cursor(self):
+        nomes = []
+        depois = None
+        while True:
+            parametros = {'limite': 2, **({'depois': depois} if depois else {})}
+            with self.assertNumQueries(3):  # sessão, usuário e a página
+                dados = self.buscar('tarefas', **parametros).json()
+            nomes.extend(item['texto'] for item in dados['resultados'])
+            depois = dados['proximo']
+            if not depois:
+                break
+        self.assertEqual(nomes, [f'Tarefa {indice} - Ação 1' for indice in range(5)])
+
+    def test_restringe_ao_escopo_e_aos_filtros(self):
+        dados = self.buscar('instrumentos').json()
+        self.assertEqual([item['id'] for item in dados['resultados']], [self.dados.instrumento.pk])
+
+        dados = self.buscar('obrigacoes', instrumento=self.outra.instrumento.pk).json()
+        self.assertEqual(dados['resultados'], [])
+        dados = self.buscar('tarefas', q='3').json()
+        self.assertEqual([item['texto'] for item in dados['resultados']], ['Tarefa 3 - Ação 1'])
+
+    def test_erros(self):
+        self.assertEqual(self.buscar('desconhecida').status_code, 404)
+        self.assertEqual(self.buscar('tarefas', depois='abc').status_code, 400)
+        self.assertEqual(self.buscar('obrigacoes', instrumento='x').status_code, 400)
@@ -0,0 +1,73 @@
+# ===== SELECTS ASSÍNCRONOS PARA FORMULÁRIOS =====
+"""
+Widgets para ForeignKey/ManyToMany com muitos registros possíveis
+
+O select renderiza só as opções já escolhidas (uma consulta com pk__in),
+e não o queryset inteiro do campo; as demais vêm do autocomplete
+(core/autocomplete.py), por página, conforme o usuário digita. A
+validação continua a do ModelChoiceField (busca apenas os ids enviados).
+
+Uso:
+    class Meta:
+        widgets = {
+            'responsavel': SelectAssincrono('usuarios', relacionados=['subunidade__diretoria']),
+            'executores': SelectMultiploAssincrono('usuarios'),
+            'obrigacao': SelectAssincrono('obrigacoes', filtros={'instrumento': '#id_instrumento'}),
+        }
+
+filtros: parâmetro do autocomplete -> seletor do campo de onde vem o valor.
+relacionados: select_related usado ao montar o texto das opções escolhidas.
+"""
+
+import json
+
+from django import forms
+from django.urls import reverse
+
+
+class AssincronoMixin:
+    placeholder = 'Digite para buscar...'
+
+    def __init__(self, fonte, filtros=None, relacionados=(), attrs=None):
+        super().__init__(attrs)
+        self.fonte = fonte
+        self.filtros = filtros or {}
+        self.relacionados = list(relacionados)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context['widget']['attrs']
+        widget_attrs['data-autocomplete'] = reverse('autocomplete', args=[self.fonte])
+        widget_attrs.setdefault('data-placeholder', self.placeholder)
+        if self.filtros:
+            widget_attrs['data-autocomplete-filtros'] = json.dumps(self.filtros)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        """Opção vazia (se houver) + as escolhidas, sem percorrer self.choices"""
+        escolhidos = [str(v) for v in value if str(v).isdigit()]
+        campo = getattr(self.choices, 'field', None)
+
+        opcoes = []
+        if not self.allow_multiple_selected and campo is not None and campo.empty_label is not None:
+            opcoes.append(('', campo.empty_label))
+        if escolhidos and campo is not None:
+            queryset = self.choices.queryset.filter(pk__in=escolhidos)
+            if self.relacionados:
+                queryset = queryset.select_related(*self.relacionados)
+            opcoes.extend((campo.prepare_value(objeto), campo.label_from_instance(objeto)) for objeto in queryset)
+
+        return [
+            (None, [self.create_option(
+                name, valor, texto, str(valor) in escolhidos or (valor == '' and not escolhidos), indice, attrs=attrs
+            )], indice)
+            for indice, (valor, texto) in enumerate(opcoes)
+        ]
+
+
+class SelectAssincrono(AssincronoMixin, forms.Select):
+    pass
+
+
+class SelectMultiploAssincrono(AssincronoMixin, forms.SelectMultiple):
+    pass
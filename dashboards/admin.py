@@ -1,3 +1,43 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DashboardSnapshot, HistoricoStatus
+
+
+@admin.register(DashboardSnapshot)
+class DashboardSnapshotAdmin(admin.ModelAdmin):
+    """Snapshots calculados em segundo plano (somente leitura)"""
+
+    list_display = ['chave', 'escopo', 'diretoria', 'subunidade', 'pendente', 'atualizado_em']
+    list_filter = ['escopo', 'pendente']
+    list_select_related = ['diretoria', 'subunidade']
+    search_fields = ['chave']
+    actions = ['marcar_como_pendente']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def marcar_como_pendente(self, request, queryset):
+        from .snapshots import agendar_atualizacao
+
+        count = queryset.update(pendente=True)
+        agendar_atualizacao()
+        self.message_user(request, f'{count} snapshots marcados para recálculo.')
+    marcar_como_pendente.short_description = 'Recalcular'
+
+
+@admin.register(HistoricoStatus)
+class HistoricoStatusAdmin(admin.ModelAdmin):
+    """Histórico diário de status (somente leitura)"""
+
+    list_display = ['data', 'modelo', 'status', 'diretoria', 'tipo', 'total', 'reconstruido']
+    list_filter = ['modelo', 'status', 'reconstruido']
+    date_hierarchy = 'data'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DashboardsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboards'
+
+    def ready(self):
+        # Marca os snapshots afetados por alterações
+        from . import signals  # noqa: F401
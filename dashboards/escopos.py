@@ -0,0 +1,114 @@
+# ===== DASHBOARD - ESCOPO DE VISUALIZAÇÃO =====
+"""
+Dashboard restrito ao que cada usuário pode ver
+
+As regras são as do FiltrarPorDiretoriaMixin (usuarios/mixins.py):
+- Admin (0): global
+- Diretoria (1): "diretoria:<id>"
+- Assessoria, Coordenação, Usuário Comum (2, 3, 4): "subunidade:<id>"
+  (instrumentos/obrigações da diretoria da subunidade)
+- Visualizador (5): "visualizador:<ids>" (soma das diretorias permitidas)
+- demais casos: "vazio"
+
+O painel (indicadores + listagens) fica em cache por chave de escopo, e
+não por usuário: todos os usuários de uma mesma diretoria compartilham o
+mesmo cálculo. A chave inclui a versão dos snapshots do escopo (lida do
+banco junto com eles, válida em todos os processos), então o cache muda
+junto com os indicadores; as listagens valem por até
+DASHBOARD_CACHE_TIMEOUT segundos.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import DashboardSnapshot
+from .snapshots import contexto_indicadores, obter_snapshots, versao_snapshots
+
+ESCOPO_VAZIO = {'chave': 'vazio', 'snapshots': [], 'diretorias': []}
+
+
+def escopo_do_usuario(usuario):
+    """
+    Escopo visível ao usuário
+
+    Retorna {'chave', 'snapshots' (chaves de DashboardSnapshot),
+    'diretorias' (ids; None = todas)}.
+    """
+    if usuario.perfil == 0:
+        chave = DashboardSnapshot.chave_global()
+        return {'chave': chave, 'snapshots': [chave], 'diretorias': None}
+
+    if usuario.perfil == 1 and usuario.diretoria_id:
+        chave = DashboardSnapshot.chave_diretoria(usuario.diretoria_id)
+        return {'chave': chave, 'snapshots': [chave], 'diretorias': [usuario.diretoria_id]}
+
+    if usuario.perfil in [2, 3, 4] and usuario.subunidade_id:
+        chave = DashboardSnapshot.chave_subunidade(usuario.subunidade_id)
+        return {'chave': chave, 'snapshots': [chave], 'diretorias': [usuario.subunidade.diretoria_id]}
+
+    if usuario.perfil == 5:
+        ids = sorted(usuario.diretorias_visualizacao.values_list('pk', flat=True))
+        if ids:
+            return {
+                'chave': 'visualizador:' + ','.join(map(str, ids)),
+                'snapshots': [DashboardSnapshot.chave_diretoria(pk) for pk in ids],
+                'diretorias': ids,
+            }
+
+    return ESCOPO_VAZIO
+
+
+def listagens_do_escopo(diretorias):
+    """Últimas obrigações e ações do escopo (já avaliadas, para o cache)"""
+    from acoes.models import Acao
+    from instrumentos.models import Obrigacao
+
+    filtro_obrigacao = filtro_acao = Q()
+    if diretorias is not None:
+        filtro_obrigacao = Q(instrumento__diretoria_id__in=diretorias)
+        filtro_acao = Q(obrigacao__instrumento__diretoria_id__in=diretorias)
+
+    # A primeira ação (ordenação padrão de Acao) vem por subconsulta,
+    # sem carregar todas as ações de cada obrigação
+    primeira_acao = Acao.objects.filter(obrigacao=OuterRef('pk')).order_by(
+        *Acao._meta.ordering
+    )
+    obrigacoes = Obrigacao.objects.filter(filtro_obrigacao).select_related(
+        'instrumento',
+        'tipo_obrigacao'
+    ).annotate(
+        primeira_acao_nome=Subquery(primeira_acao.values('nome')[:1]),
+        primeira_acao_tipo=Subquery(primeira_acao.values('tipo_acao__nome')[:1]),
+    ).order_by('-data_vencimento')[:10]
+
+    acoes_recentes = Acao.objects.filter(filtro_acao).select_related(
+        'obrigacao', 'tipo_acao', 'responsavel'
+    ).order_by('-data_cadastro')[:10]
+
+    return {
+        'obrigacoes_usuario': list(obrigacoes),
+        'acoes_recentes': list(acoes_recentes),
+    }
+
+
+def calcular_painel(escopo, snapshots):
+    if escopo['snapshots']:
+        indicadores = contexto_indicadores(snapshots)
+        listagens = listagens_do_escopo(escopo['diretorias'])
+    else:
+        # Sem escopo: zeros e listagens vazias, sem consultar o banco
+        indicadores = contexto_indicadores([])
+        listagens = {'obrigacoes_usuario': [], 'acoes_recentes': []}
+    return {**indicadores, **listagens}
+
+
+def painel_do_escopo(escopo):
+    """Contexto do dashboard para o escopo, em cache por chave de escopo"""
+    snapshots = obter_snapshots(escopo['snapshots']) if escopo['snapshots'] else []
+    chave_cache = f"dashboards:painel:{escopo['chave']}:{versao_snapshots(snapshots)}"
+    painel = cache.get(chave_cache)
+    if painel is None:
+        painel = calcular_painel(escopo, snapshots)
+        cache.set(chave_cache, painel, settings.DASHBOARD_CACHE_TIMEOUT)
+    return painel
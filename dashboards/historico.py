@@ -0,0 +1,159 @@
+# ===== DASHBOARD - HISTÓRICO DIÁRIO DE STATUS =====
+"""
+Série temporal de status (HistoricoStatus)
+
+- registrar_dia(): grava a fotografia do dia — uma consulta de agregação
+  por modelo (Tarefa, Acao, Obrigacao), agrupada por status × diretoria ×
+  tipo. Executada todas as noites pelo Celery beat
+  (dashboards/migrations/0004_agendar_historico_status.py).
+- preencher_historico(): preenche dias passados. O sistema não guarda
+  trilha de auditoria das mudanças de status, então o status de cada dia é
+  reconstruído a partir das datas dos próprios registros (cadastro, início,
+  fim/vencimento, conclusão). Status que não deixam rastro em data
+  (em_validacao, em_andamento da obrigação) não aparecem nesses dias; as
+  linhas ficam marcadas como reconstruido=True.
+- serie_historica(): totais por dia e status para os gráficos de tendência.
+
+Uso:
+    from dashboards.historico import preencher_historico, serie_historica
+    preencher_historico(date(2024, 1, 1))    # {'dias': 290, 'linhas': 4120}
+    serie_historica('tarefa', inicio, fim, diretorias=[3])
+"""
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import HistoricoStatus
+
+# modelo: (model, caminho da diretoria, caminho do nome do tipo)
+DIMENSOES = {
+    'tarefa': ('acoes.Tarefa', 'acao__obrigacao__instrumento__diretoria_id', 'acao__tipo_acao__nome'),
+    'acao': ('acoes.Acao', 'obrigacao__instrumento__diretoria_id', 'tipo_acao__nome'),
+    'obrigacao': ('instrumentos.Obrigacao', 'instrumento__diretoria_id', 'tipo_obrigacao__nome'),
+}
+
+
+def _concluida_ate(dia, campo_data, concluida):
+    # Sem a data de conclusão, usa a última atualização do registro
+    return concluida & (
+        Q(**{f'{campo_data}__lte': dia})
+        | Q(**{f'{campo_data}__isnull': True, 'data_atualizacao__date__lte': dia})
+    )
+
+
+def status_reconstruido(modelo, dia):
+    """Expressão com o status provável do registro no fim do dia"""
+    if modelo == 'tarefa':
+        regras = [
+            When(_concluida_ate(dia, 'data_conclusao', Q(status='finalizado')), then=Value('finalizado')),
+            When(data_fim__lt=dia, then=Value('atrasado')),
+            When(data_inicio__lte=dia, then=Value('em_andamento')),
+        ]
+        padrao = 'a_iniciar'
+    elif modelo == 'acao':
+        regras = [
+            When(_concluida_ate(dia, 'data_fim_real', Q(status='finalizado')), then=Value('finalizado')),
+            When(data_fim_prevista__lt=dia, then=Value('atrasado')),
+            When(data_inicio__lte=dia, then=Value('em_andamento')),
+        ]
+        padrao = 'a_iniciar'
+    else:
+        regras = [
+            When(
+                _concluida_ate(dia, 'data_cumprimento', Q(cumprida=True) | Q(status='cumprida')),
+                then=Value('cumprida'),
+            ),
+            When(data_vencimento__lt=dia, then=Value('vencida')),
+        ]
+        padrao = 'pendente'
+    return Case(*regras, default=Value(padrao), output_field=CharField())
+
+
+def contar(modelo, dia=None):
+    """
+    Totais por status × diretoria × tipo (uma consulta)
+
+    dia=None: status atual; com dia: status reconstruído para aquele dia.
+    """
+    caminho, campo_diretoria, campo_tipo = DIMENSOES[modelo]
+    queryset = apps.get_model(caminho).objects.order_by()
+
+    if dia is None:
+        status = F('status')
+    else:
+        queryset = queryset.filter(data_cadastro__date__lte=dia)
+        status = status_reconstruido(modelo, dia)
+
+    return (
+        queryset.annotate(status_dia=status)
+        .values('status_dia', diretoria_dia=F(campo_diretoria), tipo_dia=F(campo_tipo))
+        .annotate(total=Count('pk'))
+    )
+
+
+def registrar_dia(data=None, reconstruir=False):
+    """
+    Grava (substituindo) as linhas do dia para os três modelos
+
+    Sem reconstruir, registra o status atual com a data informada (padrão:
+    hoje). Retorna a quantidade de linhas gravadas.
+    """
+    data = data or timezone.localdate()
+    linhas = [
+        HistoricoStatus(
+            data=data,
+            modelo=modelo,
+            status=item['status_dia'],
+            diretoria_id=item['diretoria_dia'],
+            tipo=item['tipo_dia'] or '',
+            total=item['total'],
+            reconstruido=reconstruir,
+        )
+        for modelo in DIMENSOES
+        for item in contar(modelo, data if reconstruir else None)
+    ]
+
+    with transaction.atomic():
+        HistoricoStatus.objects.filter(data=data).delete()
+        HistoricoStatus.objects.bulk_create(linhas)
+    return len(linhas)
+
+
+def preencher_historico(inicio, fim=None, sobrescrever=False):
+    """
+    Reconstrói os dias de [inicio, fim] (padrão: até ontem)
+
+    Dias já registrados são mantidos, a menos que sobrescrever=True.
+    """
+    fim = fim or timezone.localdate() - timedelta(days=1)
+    existentes = set() if sobrescrever else set(
+        HistoricoStatus.objects.filter(data__range=(inicio, fim))
+        .values_list('data', flat=True).distinct()
+    )
+
+    resultado = {'dias': 0, 'linhas': 0}
+    dia = inicio
+    while dia <= fim:
+        if dia not in existentes:
+            resultado['linhas'] += registrar_dia(dia, reconstruir=True)
+            resultado['dias'] += 1
+        dia += timedelta(days=1)
+    return resultado
+
+
+def serie_historica(modelo, inicio, fim, diretorias=None):
+    """
+    Totais por dia e status no período (somando diretorias e tipos)
+
+    diretorias: ids para restringir (None = todas).
+    """
+    linhas = HistoricoStatus.objects.filter(modelo=modelo, data__range=(inicio, fim))
+    if diretorias is not None:
+        linhas = linhas.filter(diretoria_id__in=diretorias)
+    return list(
+        linhas.values('data', 'status').annotate(total=Sum('total')).order_by('data', 'status')
+    )
@@ -0,0 +1,66 @@
+# ===== COMANDO PARA PREENCHER O HISTÓRICO DE STATUS =====
+"""
+Preenche retroativamente o histórico diário de status (ver dashboards/historico.py)
+
+Uso:
+    python manage.py preencher_historico_status --inicio 2024-01-01
+    python manage.py preencher_historico_status --inicio 2024-01-01 --fim 2024-06-30 --sobrescrever
+    python manage.py preencher_historico_status --hoje
+
+Em produção o registro diário é agendado pelo Celery beat
+(dashboards/migrations/0004_agendar_historico_status.py).
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboards.historico import preencher_historico, registrar_dia
+
+
+class Command(BaseCommand):
+    help = 'Preenche o histórico diário de status de tarefas, ações e obrigações'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inicio',
+            type=date.fromisoformat,
+            help='Primeiro dia a reconstruir (AAAA-MM-DD)',
+        )
+
+        parser.add_argument(
+            '--fim',
+            type=date.fromisoformat,
+            help='Último dia a reconstruir (padrão: ontem)',
+        )
+
+        parser.add_argument(
+            '--sobrescrever',
+            action='store_true',
+            help='Reconstrói também os dias já registrados',
+        )
+
+        parser.add_argument(
+            '--hoje',
+            action='store_true',
+            help='Registra o status atual como o dia de hoje (o mesmo da tarefa noturna)',
+        )
+
+    def handle(self, *args, **options):
+        if options['hoje']:
+            linhas = registrar_dia()
+            self.stdout.write(self.style.SUCCESS(f'✅ Dia de hoje registrado: {linhas} linhas'))
+            return
+
+        if not options['inicio']:
+            raise CommandError('Informe --inicio ou --hoje')
+
+        self.stdout.write(self.style.SUCCESS('📈 Reconstruindo histórico de status...'))
+
+        resultado = preencher_historico(
+            options['inicio'], options['fim'], sobrescrever=options['sobrescrever']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado["dias"]} dias preenchidos ({resultado["linhas"]} linhas)'
+        ))
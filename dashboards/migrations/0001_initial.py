@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0002_subunidade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=50, unique=True, verbose_name='Chave')),
+                ('escopo', models.CharField(choices=[('global', 'Global'), ('diretoria', 'Diretoria'), ('subunidade', 'Subunidade')], max_length=20, verbose_name='Escopo')),
+                ('dados', models.JSONField(default=dict, verbose_name='Indicadores')),
+                ('pendente', models.BooleanField(default=True, verbose_name='Recalcular')),
+                ('atualizado_em', models.DateTimeField(blank=True, null=True, verbose_name='Atualizado em')),
+                ('diretoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to='core.diretoria', verbose_name='Diretoria')),
+                ('subunidade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to='core.subunidade', verbose_name='Subunidade')),
+            ],
+            options={
+                'verbose_name': 'Snapshot do Dashboard',
+                'verbose_name_plural': 'Snapshots do Dashboard',
+                'indexes': [models.Index(fields=['pendente'], name='dashboards__pendent_106f0d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_subunidade'),
+        ('dashboards', '0002_agendar_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('modelo', models.CharField(choices=[('tarefa', 'Tarefa'), ('acao', 'Ação'), ('obrigacao', 'Obrigação')], max_length=20, verbose_name='Modelo')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('tipo', models.CharField(blank=True, max_length=100, verbose_name='Tipo')),
+                ('total', models.PositiveIntegerField(verbose_name='Total')),
+                ('reconstruido', models.BooleanField(default=False, help_text='Preenchido retroativamente a partir das datas dos registros', verbose_name='Reconstruído')),
+                ('diretoria', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.diretoria', verbose_name='Diretoria')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Status',
+                'verbose_name_plural': 'Histórico de Status',
+                'ordering': ['data', 'modelo', 'status'],
+                'indexes': [models.Index(fields=['modelo', 'data'], name='dashboards__modelo_bdba57_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,117 @@
 from django.db import models
 
-# Models will be added here
+
+class DashboardSnapshot(models.Model):
+    """
+    Indicadores do dashboard pré-calculados por escopo
+
+    Um registro global, um por diretoria e um por subunidade, com os
+    contadores e as séries dos gráficos em "dados". Recalculados em segundo
+    plano (dashboards/snapshots.py): periodicamente e, após alterações em
+    Tarefa/Obrigacao/Instrumento, apenas os escopos marcados como pendentes.
+    """
+
+    ESCOPOS = [
+        ('global', 'Global'),
+        ('diretoria', 'Diretoria'),
+        ('subunidade', 'Subunidade'),
+    ]
+
+    # "global", "diretoria:<id>" ou "subunidade:<id>"
+    chave = models.CharField('Chave', max_length=50, unique=True)
+    escopo = models.CharField('Escopo', max_length=20, choices=ESCOPOS)
+
+    # Subunidades também guardam a diretoria (marcação de pendências por diretoria)
+    diretoria = models.ForeignKey(
+        'core.Diretoria',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='dashboard_snapshots',
+        verbose_name='Diretoria'
+    )
+    subunidade = models.ForeignKey(
+        'core.Subunidade',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='dashboard_snapshots',
+        verbose_name='Subunidade'
+    )
+
+    dados = models.JSONField('Indicadores', default=dict)
+    pendente = models.BooleanField('Recalcular', default=True)
+    atualizado_em = models.DateTimeField('Atualizado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Snapshot do Dashboard'
+        verbose_name_plural = 'Snapshots do Dashboard'
+        indexes = [
+            models.Index(fields=['pendente']),
+        ]
+
+    def __str__(self):
+        return f"{self.chave} ({self.atualizado_em:%d/%m/%Y %H:%M})" if self.atualizado_em else self.chave
+
+    @staticmethod
+    def chave_global():
+        return 'global'
+
+    @staticmethod
+    def chave_diretoria(diretoria_id):
+        return f'diretoria:{diretoria_id}'
+
+    @staticmethod
+    def chave_subunidade(subunidade_id):
+        return f'subunidade:{subunidade_id}'
+
+
+class HistoricoStatus(models.Model):
+    """
+    Fato diário: quantidade de registros por status × diretoria × tipo
+
+    Uma linha por (data, modelo, status, diretoria, tipo) com total > 0,
+    gravada todas as noites (dashboards/historico.py). Gráficos de tendência
+    leem algumas centenas de linhas em vez de varrer Tarefa/Acao/Obrigacao.
+
+    tipo: nome do tipo da ação (Tarefa/Acao) ou da obrigação (Obrigacao).
+    A diretoria não tem restrição de chave estrangeira: o histórico de uma
+    diretoria removida é preservado.
+    """
+
+    MODELOS = [
+        ('tarefa', 'Tarefa'),
+        ('acao', 'Ação'),
+        ('obrigacao', 'Obrigação'),
+    ]
+
+    data = models.DateField('Data')
+    modelo = models.CharField('Modelo', max_length=20, choices=MODELOS)
+    status = models.CharField('Status', max_length=20)
+    diretoria = models.ForeignKey(
+        'core.Diretoria',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Diretoria'
+    )
+    tipo = models.CharField('Tipo', max_length=100, blank=True)
+    total = models.PositiveIntegerField('Total')
+    reconstruido = models.BooleanField(
+        'Reconstruído',
+        default=False,
+        help_text='Preenchido retroativamente a partir das datas dos registros'
+    )
+
+    class Meta:
+        verbose_name = 'Histórico de Status'
+        verbose_name_plural = 'Histórico de Status'
+        ordering = ['data', 'modelo', 'status']
+        indexes = [
+            models.Index(fields=['modelo', 'data']),
+        ]
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} {self.modelo} {self.status}: {self.total}"
@@ -0,0 +1,106 @@
+# ===== DASHBOARD - INVALIDAÇÃO DOS SNAPSHOTS =====
+"""
+Marca como pendentes os snapshots afetados por alterações
+
+Tarefa, Obrigacao e Instrumento: o global, a diretoria (atual e anterior)
+e, conforme o caso, as subunidades. Cada alteração custa um único UPDATE
+(as diretorias/subunidades entram como subconsultas); o recálculo fica
+para a tarefa agendada em dashboards/snapshots.py:agendar_atualizacao().
+
+Alterações em lote chegam pelo sinal acoes.signals.tarefas_alteradas.
+Outras feitas com queryset.update() ou em Acao (mudança de obrigação) não
+passam por aqui e são cobertas pela atualização periódica completa.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from acoes.models import Acao, Tarefa
+from acoes.signals import tarefas_alteradas
+from instrumentos.models import Instrumento, Obrigacao
+from .snapshots import marcar_pendentes
+
+
+def valores_originais(instance, *campos):
+    # __dict__ evita disparar consulta quando o campo foi adiado (.only())
+    return {campo: instance.__dict__.get(campo) for campo in campos}
+
+
+# ===== TAREFA =====
+
+@receiver(post_init, sender=Tarefa)
+def guardar_escopo_tarefa(sender, instance, **kwargs):
+    instance._snapshot_original = valores_originais(instance, 'acao_id', 'responsavel_id')
+
+
+@receiver(post_save, sender=Tarefa)
+@receiver(post_delete, sender=Tarefa)
+def tarefa_alterada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    original = getattr(instance, '_snapshot_original', {})
+    acao_ids = {instance.acao_id, original.get('acao_id')} - {None}
+    responsavel_ids = {instance.responsavel_id, original.get('responsavel_id')} - {None}
+    instance._snapshot_original = valores_originais(instance, 'acao_id', 'responsavel_id')
+
+    marcar_pendentes(
+        diretoria_ids=Acao.objects.filter(pk__in=acao_ids)
+        .values('obrigacao__instrumento__diretoria_id'),
+        subunidade_ids=get_user_model().objects.filter(pk__in=responsavel_ids)
+        .values('subunidade_id'),
+    )
+
+
+@receiver(tarefas_alteradas)
+def tarefas_alteradas_em_lote(sender, tarefa_ids, acao_ids=(), **kwargs):
+    marcar_pendentes(
+        diretoria_ids=Acao.objects.filter(pk__in=acao_ids)
+        .values('obrigacao__instrumento__diretoria_id'),
+        subunidade_ids=get_user_model().objects.filter(tarefas_responsavel__in=tarefa_ids)
+        .values('subunidade_id'),
+    )
+
+
+# ===== OBRIGAÇÃO =====
+
+@receiver(post_init, sender=Obrigacao)
+def guardar_escopo_obrigacao(sender, instance, **kwargs):
+    instance._snapshot_original = valores_originais(instance, 'instrumento_id')
+
+
+@receiver(post_save, sender=Obrigacao)
+@receiver(post_delete, sender=Obrigacao)
+def obrigacao_alterada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    original = getattr(instance, '_snapshot_original', {})
+    instrumento_ids = {instance.instrumento_id, original.get('instrumento_id')} - {None}
+    instance._snapshot_original = valores_originais(instance, 'instrumento_id')
+
+    marcar_pendentes(
+        diretoria_ids=Instrumento.objects.filter(pk__in=instrumento_ids).values('diretoria_id'),
+        incluir_subunidades=True,
+    )
+
+
+# ===== INSTRUMENTO =====
+
+@receiver(post_init, sender=Instrumento)
+def guardar_escopo_instrumento(sender, instance, **kwargs):
+    instance._snapshot_original = valores_originais(instance, 'diretoria_id')
+
+
+@receiver(post_save, sender=Instrumento)
+@receiver(post_delete, sender=Instrumento)
+def instrumento_alterado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    original = getattr(instance, '_snapshot_original', {})
+    diretoria_ids = {instance.diretoria_id, original.get('diretoria_id')} - {None}
+    instance._snapshot_original = valores_originais(instance, 'diretoria_id')
+
+    marcar_pendentes(diretoria_ids=list(diretoria_ids), incluir_subunidades=True)
@@ -0,0 +1,296 @@
+# ===== DASHBOARD - SNAPSHOTS =====
+"""
+Cálculo e atualização dos snapshots do dashboard (DashboardSnapshot)
+
+Escopos:
+- global: todo o sistema
+- diretoria: instrumentos/obrigações da diretoria e tarefas cujas ações
+  pertencem a instrumentos da diretoria
+- subunidade: instrumentos/obrigações da diretoria da subunidade (mesma
+  regra do FiltrarPorDiretoriaMixin) e tarefas cujo responsável é da
+  subunidade
+
+Atualização:
+- atualizar_snapshots(): recalcula todos (tarefa periódica); cada recálculo
+  grava atualizado_em, de onde vem a versão do cache por escopo
+  (versao_snapshots(), escopos.py)
+- marcar_pendentes(): chamada pelos sinais (dashboards/signals.py); marca
+  apenas os escopos afetados com um UPDATE e agenda um recálculo único,
+  após DASHBOARD_SNAPSHOT_ATRASO segundos, que junta as alterações do
+  intervalo (atualizar_snapshots(apenas_pendentes=True))
+- obter_snapshots(): serve os que a fila não atualizou (pendentes há mais
+  de DASHBOARD_SNAPSHOT_ATRASO, calculados há mais de
+  DASHBOARD_SNAPSHOT_IDADE_MAXIMA ou em outro dia) como estão e agenda o
+  recálculo deles; só calcula na hora um snapshot que ainda não existe
+"""
+
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import DashboardSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Tarefas em aberto; 'atrasado' é posto pela varredura (acoes/varredura.py)
+# nas vencidas, que continuam contando como vencidas/a vencer
+STATUS_ABERTOS = ['a_iniciar', 'em_andamento', 'atrasado']
+
+
+def filtros_escopo(snapshot):
+    """Filtros (instrumento, obrigacao, tarefa) do escopo do snapshot"""
+    if snapshot.escopo == 'diretoria':
+        return (
+            Q(diretoria_id=snapshot.diretoria_id),
+            Q(instrumento__diretoria_id=snapshot.diretoria_id),
+            Q(acao__obrigacao__instrumento__diretoria_id=snapshot.diretoria_id),
+        )
+    if snapshot.escopo == 'subunidade':
+        return (
+            Q(diretoria_id=snapshot.diretoria_id),
+            Q(instrumento__diretoria_id=snapshot.diretoria_id),
+            Q(responsavel__subunidade_id=snapshot.subunidade_id),
+        )
+    return Q(), Q(), Q()
+
+
+def calcular_indicadores(filtro_instrumento=Q(), filtro_obrigacao=Q(), filtro_tarefa=Q(), hoje=None):
+    """
+    Contadores e séries do dashboard (uma consulta de agregação por modelo)
+
+    Retorna um dict serializável em JSON.
+    """
+    from acoes.models import Tarefa
+    from instrumentos.models import Instrumento, Obrigacao
+
+    hoje = hoje or timezone.now().date()
+
+    # Instrumentos: distribuição por tipo e vigentes
+    instrumentos_por_tipo = list(
+        Instrumento.objects.filter(filtro_instrumento)
+        .values('tipo_instrumento__nome')
+        .annotate(total=Count('id'), vigentes=Count('id', filter=Q(status='vigente')))
+        .order_by('tipo_instrumento__nome')
+    )
+    total_instrumentos = sum(item.pop('vigentes') for item in instrumentos_por_tipo)
+
+    total_obrigacoes = Obrigacao.objects.filter(filtro_obrigacao).count()
+
+    # Vencidas, a vencer e totais por status
+    metricas = Tarefa.objects.filter(filtro_tarefa).aggregate(
+        vencidas=Count('id', filter=Q(data_fim__lt=hoje, status__in=STATUS_ABERTOS)),
+        a_vencer=Count('id', filter=Q(
+            data_fim__gte=hoje, data_fim__lte=hoje + timedelta(days=7),
+            status__in=STATUS_ABERTOS,
+        )),
+        **{
+            f'status_{status}': Count('id', filter=Q(status=status))
+            for status, _ in Tarefa.STATUS_CHOICES
+        }
+    )
+
+    # Mesmo formato do values/annotate: só status com tarefas, em ordem
+    tarefas_por_status = [
+        {'status': status, 'total': metricas[f'status_{status}']}
+        for status in sorted(status for status, _ in Tarefa.STATUS_CHOICES)
+        if metricas[f'status_{status}']
+    ]
+
+    return {
+        'total_instrumentos': total_instrumentos,
+        'total_obrigacoes': total_obrigacoes,
+        'tarefas_vencidas': metricas['vencidas'],
+        'tarefas_a_vencer': metricas['a_vencer'],
+        'tarefas_por_status': tarefas_por_status,
+        'instrumentos_por_tipo': instrumentos_por_tipo,
+        'data_referencia': hoje.isoformat(),
+    }
+
+
+def garantir_snapshots():
+    """Cria os registros que faltam (global, diretorias e subunidades ativas)"""
+    from core.models import Diretoria, Subunidade
+
+    esperados = [DashboardSnapshot(chave=DashboardSnapshot.chave_global(), escopo='global')]
+    esperados += [
+        DashboardSnapshot(chave=DashboardSnapshot.chave_diretoria(pk), escopo='diretoria', diretoria_id=pk)
+        for pk in Diretoria.objects.values_list('pk', flat=True)
+    ]
+    esperados += [
+        DashboardSnapshot(
+            chave=DashboardSnapshot.chave_subunidade(pk), escopo='subunidade',
+            subunidade_id=pk, diretoria_id=diretoria_id,
+        )
+        for pk, diretoria_id in Subunidade.objects.filter(ativa=True).values_list('pk', 'diretoria_id')
+    ]
+    DashboardSnapshot.objects.bulk_create(esperados, ignore_conflicts=True)
+
+
+def atualizar_snapshot(snapshot, hoje=None):
+    """Recalcula um snapshot (a marca de pendente é limpa antes do cálculo)"""
+    # Alterações feitas durante o cálculo voltam a marcá-lo como pendente
+    DashboardSnapshot.objects.filter(pk=snapshot.pk).update(pendente=False)
+    snapshot.dados = calcular_indicadores(*filtros_escopo(snapshot), hoje=hoje)
+    snapshot.atualizado_em = timezone.now()
+    snapshot.pendente = False
+    DashboardSnapshot.objects.filter(pk=snapshot.pk).update(
+        dados=snapshot.dados, atualizado_em=snapshot.atualizado_em
+    )
+    return snapshot
+
+
+def atualizar_snapshots(apenas_pendentes=False):
+    """Recalcula os snapshots (todos ou só os pendentes); retorna quantos"""
+    if not apenas_pendentes:
+        garantir_snapshots()
+
+    snapshots = DashboardSnapshot.objects.all()
+    if apenas_pendentes:
+        snapshots = snapshots.filter(pendente=True)
+
+    hoje = timezone.now().date()
+    total = 0
+    for snapshot in snapshots:
+        atualizar_snapshot(snapshot, hoje)
+        total += 1
+    return total
+
+
+def desatualizado(snapshot, agora):
+    """O snapshot precisa de um novo recálculo?"""
+    if snapshot.dados.get('data_referencia') != agora.date().isoformat():
+        return True  # virada do dia: vencidas/a vencer mudam sem alterações
+    idade = (agora - snapshot.atualizado_em).total_seconds()
+    if snapshot.pendente and idade > settings.DASHBOARD_SNAPSHOT_ATRASO:
+        return True  # o recálculo agendado não rodou
+    return idade > settings.DASHBOARD_SNAPSHOT_IDADE_MAXIMA
+
+
+def obter_snapshots(chaves):
+    """
+    Snapshots prontos para leitura (uma consulta)
+
+    Os desatualizados (ver desatualizado()) são servidos como estão e
+    marcados como pendentes para o próximo recálculo agendado; só os que
+    nunca foram calculados são calculados na hora.
+    """
+    snapshots = list(DashboardSnapshot.objects.filter(chave__in=chaves))
+    if len(snapshots) < len(set(chaves)):
+        garantir_snapshots()
+        snapshots = list(DashboardSnapshot.objects.filter(chave__in=chaves))
+
+    agora = timezone.now()
+    desatualizados = []
+    for snapshot in snapshots:
+        if snapshot.atualizado_em is None:
+            atualizar_snapshot(snapshot, agora.date())
+        elif desatualizado(snapshot, agora):
+            desatualizados.append(snapshot)
+
+    if desatualizados:
+        novos = [snapshot.pk for snapshot in desatualizados if not snapshot.pendente]
+        if novos:
+            DashboardSnapshot.objects.filter(pk__in=novos).update(pendente=True)
+        agendar_atualizacao()
+    return snapshots
+
+
+def versao_snapshots(snapshots):
+    """
+    Versão de um conjunto de snapshots, derivada do banco: muda a cada
+    recálculo de qualquer um deles (atualizado_em)
+    """
+    atualizacoes = [s.atualizado_em for s in snapshots if s.atualizado_em]
+    if not atualizacoes:
+        return '0'
+    return f"{len(atualizacoes)}.{int(max(atualizacoes).timestamp() * 1_000_000)}"
+
+
+def somar_indicadores(lista_dados):
+    """
+    Indicadores de vários escopos disjuntos (ex.: diretorias do visualizador)
+
+    Contadores são somados e as séries, somadas por chave.
+    """
+    por_tipo, por_status = {}, {}
+    soma = {'total_instrumentos': 0, 'total_obrigacoes': 0, 'tarefas_vencidas': 0, 'tarefas_a_vencer': 0}
+    for dados in lista_dados:
+        for campo in soma:
+            soma[campo] += dados[campo]
+        for item in dados['instrumentos_por_tipo']:
+            chave = item['tipo_instrumento__nome']
+            por_tipo[chave] = por_tipo.get(chave, 0) + item['total']
+        for item in dados['tarefas_por_status']:
+            por_status[item['status']] = por_status.get(item['status'], 0) + item['total']
+
+    soma['instrumentos_por_tipo'] = [
+        {'tipo_instrumento__nome': nome, 'total': total}
+        for nome, total in sorted(por_tipo.items(), key=lambda item: (item[0] is None, item[0] or ''))
+    ]
+    soma['tarefas_por_status'] = [
+        {'status': status, 'total': total} for status, total in sorted(por_status.items())
+    ]
+    return soma
+
+
+def contexto_indicadores(snapshots):
+    """Variáveis de template do dashboard a partir de um ou mais snapshots"""
+    if len(snapshots) == 1:
+        dados = snapshots[0].dados
+    else:
+        dados = somar_indicadores([snapshot.dados for snapshot in snapshots])
+    atualizacoes = [snapshot.atualizado_em for snapshot in snapshots if snapshot.atualizado_em]
+
+    return {
+        'total_instrumentos': dados['total_instrumentos'],
+        'total_obrigacoes': dados['total_obrigacoes'],
+        'tarefas_a_vencer': dados['tarefas_a_vencer'],
+        'tarefas_vencidas': dados['tarefas_vencidas'],
+        'instrumentos_por_tipo': json.dumps(dados['instrumentos_por_tipo']),
+        'tarefas_por_status': json.dumps(dados['tarefas_por_status']),
+        # O mais antigo entre os snapshots combinados
+        'snapshot_atualizado_em': min(atualizacoes) if atualizacoes else None,
+    }
+
+
+def marcar_pendentes(diretoria_ids=(), subunidade_ids=(), incluir_subunidades=False):
+    """
+    Marca como pendentes o global e os escopos afetados e agenda o recálculo
+
+    diretoria_ids/subunidade_ids: listas ou querysets de values() (viram
+    subconsultas do mesmo UPDATE). incluir_subunidades: as subunidades das
+    diretorias também são afetadas (instrumentos e obrigações contam para a
+    subunidade pela diretoria).
+    """
+    afetados = Q(escopo='global') | Q(escopo='diretoria', diretoria_id__in=diretoria_ids)
+    if incluir_subunidades:
+        afetados |= Q(escopo='subunidade', diretoria_id__in=diretoria_ids)
+    afetados |= Q(escopo='subunidade', subunidade_id__in=subunidade_ids)
+
+    DashboardSnapshot.objects.filter(afetados, pendente=False).update(pendente=True)
+    agendar_atualizacao()
+
+
+def agendar_atualizacao():
+    """Agenda um único recálculo dos pendentes por intervalo (após o commit)"""
+    from .tasks import atualizar_snapshots_pendentes
+
+    atraso = settings.DASHBOARD_SNAPSHOT_ATRASO
+
+    def enfileirar():
+        try:
+            atualizar_snapshots_pendentes.apply_async(countdown=atraso)
+        except Exception:
+            # Broker indisponível não pode derrubar a gravação: os pendentes
+            # entram na próxima atualização periódica
+            cache.delete('dashboards:atualizacao_agendada')
+            logger.exception('Falha ao agendar a atualização dos snapshots')
+
+    if settings.CELERY_TASK_ALWAYS_EAGER or cache.add('dashboards:atualizacao_agendada', True, atraso):
+        transaction.on_commit(enfileirar)
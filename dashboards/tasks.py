@@ -0,0 +1,47 @@
+# ===== DASHBOARD - TAREFAS CELERY =====
+"""
+Tarefas Celery do dashboard
+
+- atualizar_snapshots: recalcula todos os snapshots (agendada no
+  DatabaseScheduler, ver dashboards/migrations/0002_agendar_snapshots.py);
+  cobre a virada de data e alterações feitas sem signals
+- atualizar_snapshots_pendentes: recalcula só os marcados como pendentes,
+  disparada pelos signals após DASHBOARD_SNAPSHOT_ATRASO segundos
+- registrar_historico_status: grava o histórico diário de status
+  (dashboards/historico.py), agendada para o fim do dia
+"""
+
+from celery import shared_task
+from django.conf import settings
+
+from alertas.tasks import trava
+from . import historico, snapshots
+
+
+@shared_task(ignore_result=True)
+def atualizar_snapshots():
+    """Recalcula todos os snapshots do dashboard"""
+    with trava('dashboard:snapshots', settings.DASHBOARD_SNAPSHOT_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True}
+        return {'atualizados': snapshots.atualizar_snapshots()}
+
+
+@shared_task(ignore_result=True)
+def atualizar_snapshots_pendentes():
+    """Recalcula apenas os snapshots marcados como pendentes"""
+    with trava('dashboard:snapshots', settings.DASHBOARD_SNAPSHOT_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            # Os pendentes continuam marcados: entram na execução em andamento
+            # ou na próxima
+            return {'ignorada': True}
+        return {'atualizados': snapshots.atualizar_snapshots(apenas_pendentes=True)}
+
+
+@shared_task(ignore_result=True)
+def registrar_historico_status():
+    """Grava o status do dia de Tarefa, Acao e Obrigacao"""
+    with trava('dashboard:historico', settings.DASHBOARD_SNAPSHOT_TRAVA_TIMEOUT) as obtida:
+        if not obtida:
+            return {'ignorada': True}
+        return {'linhas': historico.registrar_dia()}
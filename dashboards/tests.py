@@ -1,3 +1,242 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from acoes.models import Acao, Tarefa
+from acoes.tests import HOJE, criar_estrutura, criar_tarefa
+from acoes.varredura import varrer_status
+
+from .historico import preencher_historico, registrar_dia, serie_historica
+from .models import DashboardSnapshot, HistoricoStatus
+from .snapshots import atualizar_snapshots, calcular_indicadores, obter_snapshots
+
+
+class IndicadoresTests(TestCase):
+    def setUp(self):
+        acao = criar_estrutura().acao
+        criar_tarefa(acao, 'vencida', HOJE - timedelta(days=5), HOJE - timedelta(days=1))
+        criar_tarefa(acao, 'a vencer', HOJE, HOJE + timedelta(days=3))
+        criar_tarefa(acao, 'finalizada', HOJE - timedelta(days=5), HOJE - timedelta(days=1), status='finalizado')
+
+    def test_tarefas_atrasadas_pela_varredura_continuam_vencidas(self):
+        antes = calcular_indicadores(hoje=HOJE)
+        varrer_status(hoje=HOJE)
+        depois = calcular_indicadores(hoje=HOJE)
+
+        self.assertEqual(antes['tarefas_vencidas'], 1)
+        self.assertEqual(depois['tarefas_vencidas'], 1)
+        self.assertEqual(depois['tarefas_a_vencer'], 1)
+
+
+class ConsultasDashboardTests(TestCase):
+    """Total de consultas por renderização do dashboard (regressão de N+1)"""
+
+    def setUp(self):
+        cache.clear()
+        self.dados = criar_estrutura()
+        for indice in range(5):
+            criar_tarefa(self.dados.acao, f'T{indice}', HOJE, HOJE + timedelta(days=indice))
+        atualizar_snapshots()
+        self.admin = get_user_model().objects.create_user('admin', password='x', perfil=0)
+        self.client.force_login(self.admin)
+
+    def test_dashboard_principal(self):
+        # Sessão, usuário, snapshot do escopo e as duas listagens
+        with self.assertNumQueries(5):
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        # Painel em cache: sessão, usuário e snapshot (versão do cache)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('dashboard'))
+
+    def test_dashboard_nao_cresce_com_os_dados(self):
+        for indice in range(20):
+            criar_tarefa(self.dados.acao, f'N{indice}', HOJE, HOJE + timedelta(days=indice))
+        cache.clear()
+        with self.assertNumQueries(5):
+            self.client.get(reverse('dashboard'))
+
+    def test_dashboard_da_diretoria(self):
+        outra = criar_estrutura('2')
+        for indice in range(3):
+            criar_tarefa(outra.acao, f'O{indice}', HOJE - timedelta(days=5), HOJE - timedelta(days=1))
+        atualizar_snapshots()
+        cache.clear()
+
+        self.client.force_login(self.dados.usuario)
+        with self.assertNumQueries(5):
+            resposta = self.client.get(reverse('dashboard'))
+
+        # Só os dados da própria diretoria, nem indicadores nem listagens da outra
+        self.assertEqual(resposta.context['total_instrumentos'], 1)
+        self.assertEqual(resposta.context['total_obrigacoes'], 1)
+        # HOJE já passou: as cinco tarefas do setUp estão vencidas
+        self.assertEqual(resposta.context['tarefas_vencidas'], 5)
+        self.assertEqual(
+            [obrigacao.pk for obrigacao in resposta.context['obrigacoes_usuario']], [self.dados.obrigacao.pk]
+        )
+        self.assertEqual([acao.pk for acao in resposta.context['acoes_recentes']], [self.dados.acao.pk])
+
+        # O administrador continua vendo as duas
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse('dashboard'))
+        self.assertEqual(resposta.context['total_instrumentos'], 2)
+        self.assertEqual(resposta.context['tarefas_vencidas'], 8)
+
+    def test_historico_status_json(self):
+        # Sessão, usuário e a série agregada
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(reverse('dashboard_historico_json')).status_code, 200)
+
+
+@override_settings(DASHBOARD_SNAPSHOT_ATRASO=30, DASHBOARD_SNAPSHOT_IDADE_MAXIMA=300)
+class SnapshotsDesatualizadosTests(TestCase):
+    """A leitura serve o snapshot que a fila não atualizou e agenda o recálculo"""
+
+    def setUp(self):
+        cache.clear()
+        self.dados = criar_estrutura()
+        atualizar_snapshots()
+        self.chave = DashboardSnapshot.chave_global()
+        agendar = mock.patch('dashboards.snapshots.agendar_atualizacao')
+        self.agendar = agendar.start()
+        self.addCleanup(agendar.stop)
+
+    def envelhecer(self, segundos, **campos):
+        DashboardSnapshot.objects.filter(chave=self.chave).update(
+            atualizado_em=timezone.now() - timedelta(seconds=segundos), **campos
+        )
+
+    def nova_tarefa_sem_sinais(self):
+        # Tarefa contada no banco, mas não no snapshot
+        criar_tarefa(self.dados.acao, 'nova', HOJE, HOJE)
+        DashboardSnapshot.objects.update(pendente=False)
+        self.agendar.reset_mock()
+
+    def total_de_tarefas(self):
+        (snapshot,) = obter_snapshots([self.chave])
+        return sum(item['total'] for item in snapshot.dados['tarefas_por_status'])
+
+    def pendente(self):
+        return DashboardSnapshot.objects.get(chave=self.chave).pendente
+
+    def test_recente_e_lido_como_esta(self):
+        self.nova_tarefa_sem_sinais()
+        self.envelhecer(10)
+        self.assertEqual(self.total_de_tarefas(), 0)
+        self.agendar.assert_not_called()
+        self.assertFalse(self.pendente())
+
+    def test_acima_da_idade_maxima_agenda_o_recalculo(self):
+        self.nova_tarefa_sem_sinais()
+        self.envelhecer(301)
+        with self.assertNumQueries(2):  # leitura e a marca de pendente
+            self.assertEqual(self.total_de_tarefas(), 0)
+        self.agendar.assert_called_once()
+        self.assertTrue(self.pendente())
+
+        # O recálculo agendado atualiza o que foi servido
+        atualizar_snapshots(apenas_pendentes=True)
+        self.assertEqual(self.total_de_tarefas(), 1)
+
+    def test_pendente_sem_recalculo_volta_a_ser_agendado(self):
+        self.nova_tarefa_sem_sinais()
+        self.envelhecer(10, pendente=True)
+        self.assertEqual(self.total_de_tarefas(), 0)
+        self.agendar.assert_not_called()
+
+        self.envelhecer(31, pendente=True)
+        with self.assertNumQueries(1):  # já pendente: só a leitura
+            self.assertEqual(self.total_de_tarefas(), 0)
+        self.agendar.assert_called_once()
+
+    def test_outro_dia_agenda_o_recalculo(self):
+        self.nova_tarefa_sem_sinais()
+        snapshot = DashboardSnapshot.objects.get(chave=self.chave)
+        DashboardSnapshot.objects.filter(pk=snapshot.pk).update(dados={**snapshot.dados, 'data_referencia': '2000-01-01'})
+        self.assertEqual(self.total_de_tarefas(), 0)
+        self.assertTrue(self.pendente())
+
+    def test_sem_snapshot_calcula_na_hora(self):
+        self.nova_tarefa_sem_sinais()
+        DashboardSnapshot.objects.all().delete()
+        self.assertEqual(self.total_de_tarefas(), 1)
+        self.agendar.assert_not_called()
+
+    def test_recalculo_troca_o_painel_em_cache(self):
+        admin = get_user_model().objects.create_user('admin', password='x', perfil=0)
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_obrigacoes'], 1)
+
+        criar_estrutura('2')
+        # Recálculo feito por outro processo: só o banco muda
+        atualizar_snapshots()
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_obrigacoes'], 2)
+
+
+class HistoricoStatusTests(TestCase):
+    def setUp(self):
+        self.dados = criar_estrutura()
+        self.outra = criar_estrutura('2')
+        self.tarefa = criar_tarefa(self.dados.acao, 'T', HOJE - timedelta(days=5), HOJE - timedelta(days=1))
+        criar_tarefa(self.outra.acao, 'U', HOJE, HOJE + timedelta(days=5))
+        # Status e cadastro fixos (os rollups usam a data real)
+        cadastro = timezone.make_aware(datetime(2025, 1, 1))
+        Tarefa.objects.update(status='em_andamento', data_cadastro=cadastro)
+        Acao.objects.update(data_cadastro=cadastro)
+
+    def totais(self, dia, modelo='tarefa'):
+        return {
+            (linha.status, linha.diretoria_id): linha.total
+            for linha in HistoricoStatus.objects.filter(data=dia, modelo=modelo)
+        }
+
+    def test_registra_o_status_atual_por_diretoria(self):
+        registrar_dia(HOJE)
+        self.assertEqual(self.totais(HOJE), {
+            ('em_andamento', self.dados.diretoria.pk): 1,
+            ('em_andamento', self.outra.diretoria.pk): 1,
+        })
+        linha = HistoricoStatus.objects.filter(data=HOJE, modelo='tarefa').first()
+        self.assertEqual((linha.tipo, linha.reconstruido), ('Entrega', False))
+
+    def test_registrar_de_novo_substitui_o_dia(self):
+        registrar_dia(HOJE)
+        Tarefa.objects.filter(pk=self.tarefa.pk).update(status='finalizado')
+        registrar_dia(HOJE)
+        self.assertEqual(self.totais(HOJE)[('finalizado', self.dados.diretoria.pk)], 1)
+        self.assertEqual(HistoricoStatus.objects.filter(data=HOJE, modelo='tarefa').count(), 2)
+
+    def test_reconstroi_os_dias_pelas_datas(self):
+        resultado = preencher_historico(HOJE - timedelta(days=6), HOJE)
+        self.assertEqual(resultado['dias'], 7)
+
+        diretoria = self.dados.diretoria.pk
+        self.assertEqual(self.totais(HOJE - timedelta(days=6)), {
+            ('a_iniciar', diretoria): 1, ('a_iniciar', self.outra.diretoria.pk): 1,
+        })
+        self.assertEqual(self.totais(HOJE - timedelta(days=3))[('em_andamento', diretoria)], 1)
+        self.assertEqual(self.totais(HOJE)[('atrasado', diretoria)], 1)
+        self.assertFalse(HistoricoStatus.objects.filter(reconstruido=False).exists())
+
+    def test_dias_ja_registrados_sao_mantidos(self):
+        registrar_dia(HOJE)
+        self.assertEqual(preencher_historico(HOJE - timedelta(days=1), HOJE)['dias'], 1)
+        self.assertFalse(HistoricoStatus.objects.filter(data=HOJE, reconstruido=True).exists())
+        self.assertEqual(preencher_historico(HOJE, HOJE, sobrescrever=True)['dias'], 1)
+        self.assertTrue(HistoricoStatus.objects.filter(data=HOJE, reconstruido=True).exists())
+
+    def test_serie_soma_e_filtra_diretorias(self):
+        registrar_dia(HOJE)
+        self.assertEqual(
+            serie_historica('tarefa', HOJE, HOJE),
+            [{'data': HOJE, 'status': 'em_andamento', 'total': 2}],
+        )
+        self.assertEqual(
+            serie_historica('tarefa', HOJE, HOJE, diretorias=[self.outra.diretoria.pk]),
+            [{'data': HOJE, 'status': 'em_andamento', 'total': 1}],
+        )
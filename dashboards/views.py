@@ -1,14 +1,17 @@
-import json
+from datetime import timedelta
+
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
 from django.utils import timezone
-from datetime import timedelta
 
 from instrumentos.models import Instrumento, Obrigacao
 from indicadores.models import IndicadorContratual, ValorIndicador
 from entidades.models import Entidade
 
+from .escopos import escopo_do_usuario, painel_do_escopo
+from .historico import DIMENSOES, serie_historica
+
 # Aliases para compatibilidade
 Contrato = Instrumento
 ObrigacaoContratual = Obrigacao
@@ -20,83 +23,54 @@ def dashboard_principal(request):
     """
     Dashboard principal do sistema.
     
-    CONFIGURAÇÃO ATUAL: Mostra TODAS as tarefas do sistema (visão geral)
+    CONFIGURAÇÃO ATUAL: visão geral do escopo do usuário (admin vê tudo)
     
     Para mudar para visão individual do usuário, substitua este arquivo por:
     views_OPCAO2_tarefas_usuario.py
-    """
-    from acoes.models import Acao, Tarefa
     
+    Restrito ao escopo visível ao usuário (mesmas regras do
+    FiltrarPorDiretoriaMixin). Os indicadores vêm dos snapshots do escopo
+    (DashboardSnapshot) e o painel fica em cache por escopo, compartilhado
+    pelos usuários da mesma diretoria/subunidade (dashboards/escopos.py).
+    """
     usuario = request.user
-    hoje = timezone.now().date()
-
-    # Instrumentos vigentes
-    total_instrumentos = Instrumento.objects.filter(status='vigente').count()
-
-    # --- Distribuição de Instrumentos por Tipo ---
-    instrumentos_por_tipo = list(
-        Instrumento.objects
-        .values('tipo_instrumento__nome')
-        .annotate(total=Count('id'))
-        .order_by('tipo_instrumento__nome')
-    )
-
-    # ✅ CORREÇÃO: Total de obrigações do SISTEMA (não apenas do usuário)
-    total_obrigacoes = Obrigacao.objects.count()
-
-    # ✅ CORREÇÃO: TODAS as tarefas do sistema (não filtrar por usuário)
-    tarefas = Tarefa.objects.all()
-
-    tarefas_vencidas = tarefas.filter(
-        data_fim__lt=hoje, status__in=['a_iniciar', 'em_andamento']
-    ).count()
-
-    tarefas_a_vencer = tarefas.filter(
-        data_fim__gte=hoje, data_fim__lte=hoje + timedelta(days=7),
-        status__in=['a_iniciar', 'em_andamento']
-    ).count()
-
-    # ✅ TODAS as obrigações do sistema (visão geral)
-    obrigacoes_usuario = Obrigacao.objects.select_related(
-        'instrumento',
-        'tipo_obrigacao'
-    ).prefetch_related(
-        'acoes'
-    ).order_by('-data_vencimento')[:10]
-    
-    # Ações recentes
-    acoes_recentes = Acao.objects.select_related(
-        'obrigacao', 'tipo_acao', 'responsavel'
-    ).order_by('-data_cadastro')[:10]
-
-    # Tarefas por status
-    tarefas_por_status = list(
-        tarefas.values('status')
-        .annotate(total=Count('id'))
-        .order_by('status')
-    )
-
-    # ✅ LOG para debug
-    print(f"=== DEBUG DASHBOARD (TODAS AS TAREFAS DO SISTEMA) ===")
-    print(f"Total de tarefas: {tarefas.count()}")
-    print(f"Tarefas por status: {tarefas_por_status}")
-    print(f"Tarefas vencidas: {tarefas_vencidas}")
-    print(f"Tarefas a vencer: {tarefas_a_vencer}")
-    print(f"Total de obrigações: {total_obrigacoes}")
-    print(f"Instrumentos por tipo: {instrumentos_por_tipo}")
-    print(f"======================================================")
+    escopo = escopo_do_usuario(usuario)
 
     context = {
         'usuario': usuario,
-        'total_instrumentos': total_instrumentos,
-        'total_obrigacoes': total_obrigacoes,
-        'instrumentos_por_tipo': json.dumps(instrumentos_por_tipo),
-        'tarefas_por_status': json.dumps(tarefas_por_status),
-        'tarefas_a_vencer': tarefas_a_vencer,
-        'tarefas_vencidas': tarefas_vencidas,
-        'obrigacoes_usuario': obrigacoes_usuario,  # ✅ Nova variável
-        'acoes_recentes': acoes_recentes,
+        'escopo_dashboard': escopo['chave'],
+        **painel_do_escopo(escopo),
     }
 
     return render(request, 'dashboards/dashboard_modern.html', context)
 
+
+@login_required
+def historico_status_json(request):
+    """
+    Série diária de status para gráficos de tendência (HistoricoStatus)
+
+    ?modelo=tarefa|acao|obrigacao&dias=90, restrita às diretorias do escopo
+    do usuário.
+    """
+    modelo = request.GET.get('modelo', 'tarefa')
+    if modelo not in DIMENSOES:
+        return JsonResponse({'erro': f'Modelo inválido: {modelo}'}, status=400)
+
+    try:
+        dias = min(max(int(request.GET.get('dias', 90)), 1), 3660)
+    except ValueError:
+        dias = 90
+
+    fim = timezone.localdate()
+    inicio = fim - timedelta(days=dias)
+    escopo = escopo_do_usuario(request.user)
+    serie = serie_historica(modelo, inicio, fim, escopo['diretorias']) if escopo['snapshots'] else []
+
+    return JsonResponse({
+        'modelo': modelo,
+        'escopo': escopo['chave'],
+        'inicio': inicio,
+        'fim': fim,
+        'serie': serie,
+    })
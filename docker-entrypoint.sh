@@ -64,6 +64,14 @@ else:
     print("ℹ️ Superusuário admin já existe.")
 EOF
 
+# ==========================================
+# 📈 Métricas: descarta os arquivos dos workers anteriores
+# ==========================================
+if [ -n "$METRICAS_DIRETORIO" ]; then
+  rm -rf "$METRICAS_DIRETORIO"
+  mkdir -p "$METRICAS_DIRETORIO"
+fi
+
 # ==========================================
 # ✅ Inicialização concluída
 # ==========================================
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_subunidade'),
+        ('entidades', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entidade',
+            index=models.Index(fields=['razao_social'], name='entidades_razao_social_idx'),
+        ),
+    ]
@@ -71,6 +71,10 @@ class Entidade(models.Model):
         verbose_name = 'Entidade'
         verbose_name_plural = 'Entidades'
         ordering = ['razao_social']
+        indexes = [
+            # Listagem e autocomplete (core/autocomplete.py) ordenados por razão social
+            models.Index(fields=['razao_social'], name='entidades_razao_social_idx'),
+        ]
     
     def __str__(self):
         return f"{self.razao_social} ({self.tipo_entidade})"
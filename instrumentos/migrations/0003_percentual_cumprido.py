@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instrumentos', '0002_instrumento_nup_arquivoinstrumento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instrumento',
+            name='percentual_cumprido',
+            field=models.IntegerField(default=0, editable=False, help_text='Média das obrigações (calculado em acoes/rollups.py)', verbose_name='Percentual Cumprido (%)'),
+        ),
+        migrations.AddField(
+            model_name='obrigacao',
+            name='percentual_cumprido',
+            field=models.IntegerField(default=0, editable=False, help_text='Média das ações, ou 100 se cumprida (calculado em acoes/rollups.py)', verbose_name='Percentual Cumprido (%)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_subunidade'),
+        ('instrumentos', '0003_percentual_cumprido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='obrigacao',
+            index=models.Index(condition=models.Q(('cumprida', False), ('status__in', ['pendente', 'em_andamento'])), fields=['data_vencimento'], name='instr_obrigacao_prazo_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_subunidade'),
+        ('instrumentos', '0004_obrigacao_prazo_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='obrigacao',
+            index=models.Index(fields=['titulo'], name='instr_obrigacao_titulo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='obrigacao',
+            index=models.Index(fields=['instrumento', 'titulo'], name='instr_obrig_instr_titulo_idx'),
+        ),
+    ]
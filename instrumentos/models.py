@@ -58,6 +58,12 @@ class Instrumento(models.Model):
         help_text='Valor do instrumento, se aplicável'
     )
     status = models.CharField('Status', max_length=15, choices=STATUS_CHOICES, default='vigente')
+    percentual_cumprido = models.IntegerField(
+        'Percentual Cumprido (%)',
+        default=0,
+        editable=False,
+        help_text='Média das obrigações (calculado em acoes/rollups.py)'
+    )
     
     # Arquivo
     arquivo = models.FileField(
@@ -154,6 +160,12 @@ class Obrigacao(models.Model):
     status = models.CharField('Status', max_length=15, choices=STATUS_CHOICES, default='pendente')
     cumprida = models.BooleanField('Cumprida', default=False)
     data_cumprimento = models.DateField('Data de Cumprimento', null=True, blank=True)
+    percentual_cumprido = models.IntegerField(
+        'Percentual Cumprido (%)',
+        default=0,
+        editable=False,
+        help_text='Média das ações, ou 100 se cumprida (calculado em acoes/rollups.py)'
+    )
     
     # Alertas
     dias_antecedencia_alerta = models.IntegerField(
@@ -171,6 +183,17 @@ class Obrigacao(models.Model):
         verbose_name = 'Obrigação'
         verbose_name_plural = 'Obrigações'
         ordering = ['data_vencimento', 'titulo']
+        indexes = [
+            # Varredura de prazos (acoes/varredura.py): só as obrigações em aberto
+            models.Index(
+                fields=['data_vencimento'],
+                condition=models.Q(status__in=['pendente', 'em_andamento'], cumprida=False),
+                name='instr_obrigacao_prazo_idx',
+            ),
+            # Autocomplete de obrigações (core/autocomplete.py): ordem por título
+            models.Index(fields=['titulo'], name='instr_obrigacao_titulo_idx'),
+            models.Index(fields=['instrumento', 'titulo'], name='instr_obrig_instr_titulo_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.instrumento.numero}"
@@ -180,11 +203,12 @@ class Obrigacao(models.Model):
         if self.recorrente:
             return False
         
-        # Verifica se todas as ações estão finalizadas
-        acoes = self.acoes.all()
-        if acoes.exists():
-            return all(acao.status == 'finalizado' for acao in acoes)
-        return False
+        # Verifica se todas as ações estão finalizadas (uma consulta de contagem)
+        contagem = self.acoes.aggregate(
+            total=models.Count('id'),
+            finalizadas=models.Count('id', filter=models.Q(status='finalizado')),
+        )
+        return bool(contagem['total']) and contagem['total'] == contagem['finalizadas']
 
 
 # Manter compatibilidade temporária
@@ -6,6 +6,7 @@ from django.urls import reverse_lazy, reverse
 from django.forms import inlineformset_factory
 from core.views import ModernListView, ModernCreateView, ModernUpdateView, ModernDeleteView
 from core.models import TipoInstrumento, Diretoria, TipoObrigacao
+from core.widgets import SelectMultiploAssincrono
 from .models import Instrumento, Obrigacao, ArquivoInstrumento
 
 
@@ -23,7 +24,7 @@ class InstrumentoForm(forms.ModelForm):
             'numero': forms.TextInput(attrs={'class': 'form-control'}),
             'tipo_instrumento': forms.Select(attrs={'class': 'form-select'}),
             'diretoria': forms.Select(attrs={'class': 'form-select'}),
-            'entidades': forms.SelectMultiple(attrs={'class': 'form-select', 'size': '5'}),
+            'entidades': SelectMultiploAssincrono('entidades', relacionados=['tipo_entidade'], attrs={'class': 'form-select'}),
             'objeto': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'nup': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ex: 12345.678901/2024-00'}),
             'data_assinatura': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -0,0 +1,212 @@
+/*
+ * Selects com busca assíncrona e paginada (core/autocomplete.py)
+ *
+ * <select name="instrumento" data-autocomplete="/api/autocomplete/instrumentos/">
+ *     <option value="">...</option>                  (placeholder, opcional)
+ *     <option value="3" selected>Já escolhido</option>
+ * </select>
+ *
+ * O select continua no formulário (oculto) e guarda o valor enviado; só as
+ * opções escolhidas ficam nele. A lista é buscada por página, conforme o
+ * usuário digita e rola.
+ *
+ * data-autocomplete-filtros='{"instrumento": "#id_instrumento"}' envia o
+ * valor de outro campo como filtro e limpa a escolha quando ele muda.
+ * Selects "multiple" mostram as escolhas como etiquetas removíveis.
+ */
+(function () {
+    'use strict';
+
+    const ATRASO_BUSCA = 250;
+
+    function escolher(select, id, texto) {
+        let opcao = Array.from(select.options).find(o => o.value === String(id));
+        if (!select.multiple) {
+            Array.from(select.options).forEach(o => {
+                if (o.value && o !== opcao) o.remove();
+            });
+        }
+        if (!opcao) {
+            opcao = new Option(texto, id);
+            select.add(opcao);
+        }
+        opcao.selected = true;
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+    }
+
+    function iniciarAutocomplete(select) {
+        if (select.dataset.autocompleteIniciado) return;
+        select.dataset.autocompleteIniciado = '1';
+
+        const url = select.dataset.autocomplete;
+        const filtros = JSON.parse(select.dataset.autocompleteFiltros || '{}');
+        const vazia = Array.from(select.options).find(o => !o.value);
+
+        const caixa = document.createElement('div');
+        caixa.className = 'autocomplete position-relative';
+
+        const etiquetas = document.createElement('div');
+        etiquetas.className = 'autocomplete-selecionados d-flex flex-wrap gap-1 mb-1';
+
+        const campo = document.createElement('input');
+        campo.type = 'search';
+        campo.autocomplete = 'off';
+        campo.className = (select.className || '').replace('form-select', '') + ' form-control';
+        campo.style.cssText = select.style.cssText;
+        campo.placeholder = select.dataset.placeholder || (vazia ? vazia.textContent.trim() : 'Buscar...');
+
+        const lista = document.createElement('div');
+        lista.className = 'dropdown-menu w-100 autocomplete-lista';
+        lista.style.maxHeight = '300px';
+        lista.style.overflowY = 'auto';
+
+        // Campo oculto não recebe a validação do navegador: ela passa para a busca
+        if (select.required) {
+            campo.required = !select.multiple;
+            select.required = false;
+        }
+
+        select.classList.add('d-none');
+        select.parentNode.insertBefore(caixa, select);
+        if (select.multiple) caixa.appendChild(etiquetas);
+        caixa.appendChild(campo);
+        caixa.appendChild(lista);
+        caixa.appendChild(select);
+
+        let termo = '';
+        let proximo = null;
+        let carregando = false;
+        let temporizador = null;
+        let requisicao = 0;
+
+        function textoEscolhido() {
+            const opcao = select.selectedOptions[0];
+            return opcao && opcao.value ? opcao.textContent.trim() : '';
+        }
+
+        function desenharEtiquetas() {
+            if (!select.multiple) {
+                campo.value = textoEscolhido();
+                return;
+            }
+            etiquetas.innerHTML = '';
+            Array.from(select.selectedOptions).filter(o => o.value).forEach(opcao => {
+                const etiqueta = document.createElement('span');
+                etiqueta.className = 'badge bg-primary d-inline-flex align-items-center';
+                etiqueta.textContent = opcao.textContent.trim();
+                const remover = document.createElement('button');
+                remover.type = 'button';
+                remover.className = 'btn-close btn-close-white ms-1';
+                remover.style.fontSize = '0.6em';
+                remover.setAttribute('aria-label', 'Remover');
+                remover.addEventListener('click', () => {
+                    opcao.remove();
+                    select.dispatchEvent(new Event('change', { bubbles: true }));
+                });
+                etiqueta.appendChild(remover);
+                etiquetas.appendChild(etiqueta);
+            });
+        }
+
+        function parametros(depois) {
+            const params = new URLSearchParams({ q: termo });
+            Object.entries(filtros).forEach(([nome, seletor]) => {
+                const origem = document.querySelector(seletor);
+                if (origem && origem.value) params.set(nome, origem.value);
+            });
+            if (depois) params.set('depois', depois);
+            return params;
+        }
+
+        async function carregar(depois) {
+            if (carregando && depois) return;
+            carregando = true;
+            const numero = ++requisicao;
+            try {
+                const resposta = await fetch(`${url}?${parametros(depois)}`, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' }
+                });
+                const dados = await resposta.json();
+                if (numero !== requisicao) return;  // resposta de uma busca antiga
+                if (!depois) lista.innerHTML = '';
+                proximo = dados.proximo || null;
+
+                (dados.resultados || []).forEach(item => {
+                    const linha = document.createElement('button');
+                    linha.type = 'button';
+                    linha.className = 'dropdown-item text-wrap';
+                    linha.textContent = item.texto;
+                    linha.addEventListener('mousedown', evento => evento.preventDefault());
+                    linha.addEventListener('click', () => {
+                        escolher(select, item.id, item.texto);
+                        if (select.multiple) campo.value = '';
+                        lista.classList.remove('show');
+                    });
+                    lista.appendChild(linha);
+                });
+                if (!lista.children.length) {
+                    lista.innerHTML = '<span class="dropdown-item-text text-muted">Nenhum resultado</span>';
+                }
+                lista.classList.add('show');
+            } catch (erro) {
+                console.error('Autocomplete:', erro);
+            } finally {
+                if (numero === requisicao) carregando = false;
+            }
+        }
+
+        campo.addEventListener('focus', () => {
+            if (!select.multiple) campo.select();
+            termo = select.multiple ? campo.value.trim() : '';
+            carregar(null);
+        });
+
+        campo.addEventListener('input', () => {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(() => {
+                termo = campo.value.trim();
+                carregar(null);
+            }, ATRASO_BUSCA);
+        });
+
+        campo.addEventListener('blur', () => {
+            lista.classList.remove('show');
+            if (!select.multiple && !campo.value.trim() && select.value) {
+                // Campo apagado: volta para a opção vazia
+                select.value = '';
+                select.dispatchEvent(new Event('change', { bubbles: true }));
+            }
+            desenharEtiquetas();
+        });
+
+        // Próxima página ao chegar perto do fim da lista
+        lista.addEventListener('scroll', () => {
+            if (proximo && lista.scrollTop + lista.clientHeight >= lista.scrollHeight - 40) {
+                carregar(proximo);
+            }
+        });
+
+        select.addEventListener('change', desenharEtiquetas);
+
+        // Campos de que este depende: a escolha deixa de valer quando eles mudam
+        Object.values(filtros).forEach(seletor => {
+            const origem = document.querySelector(seletor);
+            if (!origem) return;
+            origem.addEventListener('change', () => {
+                Array.from(select.options).forEach(o => {
+                    if (o.value) o.remove();
+                });
+                if (vazia) vazia.selected = true;
+                desenharEtiquetas();
+            });
+        });
+
+        desenharEtiquetas();
+    }
+
+    window.iniciarAutocomplete = iniciarAutocomplete;
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('select[data-autocomplete]').forEach(iniciarAutocomplete);
+    });
+})();